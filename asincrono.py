@@ -0,0 +1,79 @@
+# asincrono.py
+"""
+Versión asíncrona de los routers (DB_MODO=async).
+
+En lugar de duplicar cada router, cada endpoint síncrono que recibe
+`session` se envuelve en un endpoint `async def` que obtiene una
+AsyncSession y ejecuta la lógica original con `AsyncSession.run_sync()`.
+Así la misma lógica de negocio corre sobre el driver asíncrono (aiosqlite /
+asyncpg) sin ocupar un hilo del threadpool durante la espera de la base.
+
+La respuesta se convierte al response_model dentro de run_sync, porque fuera
+de él las cargas perezosas (lazy loads) no pueden hacer I/O.
+"""
+import inspect
+
+from fastapi import APIRouter, Depends
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database import get_async_session
+
+
+def _endpoint_async(endpoint, response_model):
+    firma = inspect.signature(endpoint)
+    adaptador = TypeAdapter(response_model) if response_model is not None else None
+
+    def ejecutar(session, kwargs):
+        resultado = endpoint(**kwargs, session=session)
+        if adaptador is not None:
+            resultado = adaptador.validate_python(resultado, from_attributes=True)
+        return resultado
+
+    async def endpoint_async(**kwargs):
+        session = kwargs.pop("session")
+        return await session.run_sync(ejecutar, kwargs)
+
+    parametros = [
+        p.replace(annotation=AsyncSession, default=Depends(get_async_session))
+        if p.name == "session"
+        else p
+        for p in firma.parameters.values()
+    ]
+    endpoint_async.__signature__ = firma.replace(parameters=parametros)
+    endpoint_async.__name__ = endpoint.__name__
+    endpoint_async.__doc__ = endpoint.__doc__
+    return endpoint_async
+
+
+def version_async(router: APIRouter) -> APIRouter:
+    """Devuelve un router equivalente cuyos endpoints usan la sesión asíncrona."""
+    nuevo = APIRouter()
+    for route in router.routes:
+        if not isinstance(route, APIRoute):
+            nuevo.routes.append(route)
+            continue
+
+        endpoint = route.endpoint
+        usa_sesion = "session" in inspect.signature(endpoint).parameters
+        if usa_sesion and not inspect.iscoroutinefunction(endpoint):
+            endpoint = _endpoint_async(endpoint, route.response_model)
+
+        nuevo.add_api_route(
+            route.path,
+            endpoint,
+            methods=list(route.methods),
+            response_model=route.response_model,
+            response_model_exclude_unset=route.response_model_exclude_unset,
+            status_code=route.status_code,
+            tags=route.tags,
+            dependencies=route.dependencies,
+            summary=route.summary,
+            description=route.description,
+            response_description=route.response_description,
+            responses=route.responses,
+            name=route.name,
+            response_class=route.response_class,
+        )
+    return nuevo
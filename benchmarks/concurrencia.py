@@ -0,0 +1,168 @@
+"""
+Benchmark de concurrencia: modo síncrono vs. asíncrono (DB_MODO).
+
+Para cada modo levanta la API con uvicorn en un proceso aparte sobre una
+base SQLite temporal, carga unos datos mínimos y lanza N clientes
+concurrentes contra las rutas indicadas durante un tiempo fijo.
+Imprime un JSON con throughput y latencias por modo.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/concurrencia.py --clientes 200 --duracion 15
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from estadisticas import resumir
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUTAS_POR_DEFECTO = [
+    "/productos/?limit=50",
+    "/operaciones/?tipo=exportacion&limit=50",
+    "/reportes/operaciones-por-estado",
+]
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def levantar_api(modo: str, base: str, puerto: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["DATABASE_URL"] = f"sqlite:///{base}"
+    env["DB_MODO"] = modo
+    env.setdefault("DB_PERFIL", "bench")
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(puerto),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=RAIZ,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def esperar_api(url: str, timeout: float = 30) -> None:
+    limite = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < limite:
+            try:
+                await client.get(url + "/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("La API no respondió a tiempo")
+
+
+async def cargar_datos(url: str) -> None:
+    async with httpx.AsyncClient(base_url=url) as client:
+        a = (await client.post("/paises/", json={"nombre": "Colombia", "codigo_iso": "CO"})).json()
+        b = (await client.post("/paises/", json={"nombre": "España", "codigo_iso": "ES"})).json()
+        cliente = (await client.post("/clientes/", json={"nombre": "Cliente", "pais_id": b["id"]})).json()
+        productos = []
+        for i in range(50):
+            productos.append(
+                (
+                    await client.post(
+                        "/productos/",
+                        json={
+                            "nombre": f"Producto {i}",
+                            "tipo": "fruta",
+                            "precio_referencia": 1 + i,
+                            "stock_disponible": 1_000_000,
+                        },
+                    )
+                ).json()
+            )
+        for i in range(200):
+            await client.post(
+                "/operaciones/con-detalles",
+                json={
+                    "tipo": "exportacion",
+                    "fecha": f"2025-{1 + i % 12:02d}-01",
+                    "cliente_id": cliente["id"],
+                    "detalles": [
+                        {"producto_id": productos[(i + j) % 50]["id"], "cantidad": 1, "precio_unitario": 2}
+                        for j in range(3)
+                    ],
+                },
+            )
+
+
+async def medir(url: str, rutas: list, clientes: int, duracion: float) -> dict:
+    latencias = []
+    errores = 0
+    fin = time.monotonic() + duracion
+    limites = httpx.Limits(max_connections=clientes, max_keepalive_connections=clientes)
+
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as client:
+
+        async def trabajador(n: int) -> None:
+            nonlocal errores
+            i = n
+            while time.monotonic() < fin:
+                ruta = rutas[i % len(rutas)]
+                i += 1
+                inicio = time.perf_counter()
+                try:
+                    resp = await client.get(ruta)
+                    if resp.status_code != 200:
+                        errores += 1
+                except httpx.HTTPError:
+                    errores += 1
+                latencias.append(time.perf_counter() - inicio)
+
+        inicio = time.monotonic()
+        await asyncio.gather(*(trabajador(n) for n in range(clientes)))
+        transcurrido = time.monotonic() - inicio
+
+    return resumir(latencias, transcurrido, errores)
+
+
+async def ejecutar_modo(modo: str, args) -> dict:
+    directorio = tempfile.mkdtemp(prefix=f"bench_{modo}_")
+    puerto = puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    proceso = levantar_api(modo, os.path.join(directorio, "bench.db"), puerto)
+    try:
+        await esperar_api(url)
+        await cargar_datos(url)
+        return await medir(url, args.rutas, args.clientes, args.duracion)
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+async def principal(args) -> None:
+    resultados = {
+        "clientes": args.clientes,
+        "duracion_s": args.duracion,
+        "rutas": args.rutas,
+        "modos": {},
+    }
+    for modo in args.modos:
+        resultados["modos"][modo] = await ejecutar_modo(modo, args)
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--duracion", type=float, default=15)
+    parser.add_argument("--modos", nargs="+", default=["sync", "async"])
+    parser.add_argument("--rutas", nargs="+", default=RUTAS_POR_DEFECTO)
+    asyncio.run(principal(parser.parse_args()))
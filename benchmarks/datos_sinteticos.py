@@ -0,0 +1,367 @@
+"""
+Generador de un dataset sintético de comercio exterior en SQLite.
+
+Crea países, puertos, categorías, medios de transporte, clientes,
+proveedores, productos, operaciones, detalles e inspecciones con una
+distribución sesgada parecida a la real: pocos productos y clientes
+concentran la mayor parte del volumen (Zipf), las fechas se cargan hacia
+los meses recientes y la mayoría de las operaciones están completadas.
+
+La generación es determinista para una misma semilla y escala, así dos
+corridas del benchmark miden exactamente los mismos datos. Al final se
+calculan costo_total y stock, se escribe el libro de movimientos de stock
+(uno por detalle, fechado con su operación, más el saldo inicial) y se
+reconstruyen las tablas de resumen.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/datos_sinteticos.py --base /tmp/bench.db --detalles 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, time as hora, timedelta, timezone
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from sqlalchemy import bindparam, create_engine, event, text, update  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from models import (  # noqa: E402
+    CategoriaProducto,
+    Cliente,
+    DetalleOperacion,
+    InspeccionCalidad,
+    MedioTransporte,
+    MovimientoStock,
+    Operacion,
+    Pais,
+    Producto,
+    Proveedor,
+    Puerto,
+)
+from resumenes import reconstruir_resumenes  # noqa: E402
+
+# País desde el que se exporta (el primero de la lista)
+PAISES = [
+    ("Colombia", "CO"), ("Estados Unidos", "US"), ("España", "ES"), ("Países Bajos", "NL"),
+    ("Alemania", "DE"), ("Reino Unido", "GB"), ("Francia", "FR"), ("Canadá", "CA"),
+    ("México", "MX"), ("Chile", "CL"), ("Perú", "PE"), ("Ecuador", "EC"),
+    ("Brasil", "BR"), ("Argentina", "AR"), ("Japón", "JP"), ("China", "CN"),
+    ("Corea del Sur", "KR"), ("Italia", "IT"), ("Bélgica", "BE"), ("Suecia", "SE"),
+    ("Rusia", "RU"), ("Emiratos Árabes Unidos", "AE"), ("Arabia Saudita", "SA"),
+    ("Panamá", "PA"), ("Costa Rica", "CR"), ("Guatemala", "GT"), ("Polonia", "PL"),
+    ("Portugal", "PT"), ("Australia", "AU"), ("India", "IN"),
+]
+
+CATEGORIAS = ["Frutas tropicales", "Cítricos", "Frutas de clima frío", "Hortalizas", "Tubérculos"]
+
+FRUTAS = [
+    "Banano", "Aguacate Hass", "Mango", "Piña", "Uchuva", "Gulupa", "Granadilla",
+    "Maracuyá", "Limón Tahití", "Naranja", "Mandarina", "Fresa", "Mora", "Papaya",
+    "Pitahaya", "Guayaba", "Lulo", "Tomate de árbol", "Feijoa", "Coco",
+]
+VERDURAS = [
+    "Papa", "Yuca", "Cebolla", "Tomate", "Zanahoria", "Ajo", "Brócoli",
+    "Lechuga", "Pimentón", "Ahuyama", "Espinaca", "Pepino", "Arveja", "Habichuela",
+]
+VARIEDADES = ["", " orgánico", " premium", " extra", " tipo exportación", " industrial"]
+
+MEDIOS = [
+    ("maritimo", "Maersk"), ("maritimo", "MSC"), ("maritimo", "CMA CGM"),
+    ("aereo", "Avianca Cargo"), ("aereo", "LATAM Cargo"),
+    ("terrestre", "Coordinadora"), ("ferroviario", None),
+]
+
+ESTADOS = (["completada", "en_transito", "pendiente", "cancelada"], [55, 20, 20, 5])
+RESULTADOS = (["Aprobado", "Rechazado", "Observado"], [85, 8, 7])
+
+# Tamaño del lote por executemany
+LOTE = 20_000
+
+
+def _pesos_zipf(n: int, s: float = 1.1) -> list:
+    """Pesos acumulados de una distribución Zipf sobre n elementos."""
+    return list(itertools.accumulate(1 / (rango ** s) for rango in range(1, n + 1)))
+
+
+def _escala(detalles: int) -> dict:
+    """Tamaño de cada tabla en función de la cantidad de detalles."""
+    return {
+        "paises": len(PAISES),
+        "productos": max(30, min(600, detalles // 2000)),
+        "clientes": max(20, detalles // 500),
+        "proveedores": max(20, detalles // 800),
+        "operaciones": max(1, detalles // 4),
+        "detalles": detalles,
+    }
+
+
+def _crear_motor(ruta: str):
+    engine = create_engine(f"sqlite:///{ruta}")
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        # Carga inicial: no hace falta durabilidad, solo velocidad
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.close()
+
+    return engine
+
+
+def generar(ruta: str, detalles: int = 200_000, semilla: int = 42, dias: int = 3 * 365) -> dict:
+    """
+    Genera la base en `ruta` (se reemplaza si existe) y devuelve la escala
+    usada junto con el tiempo que tomó.
+    """
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    rng = random.Random(semilla)
+    escala = _escala(detalles)
+    inicio = time.perf_counter()
+    hoy = date(2025, 12, 31)
+    primer_dia = hoy - timedelta(days=dias)
+
+    engine = _crear_motor(ruta)
+    SQLModel.metadata.create_all(engine)
+
+    with engine.begin() as conn:
+        # ------------------------------------------------------------------
+        # Catálogos
+        # ------------------------------------------------------------------
+        conn.execute(
+            Pais.__table__.insert(),
+            [{"id": i, "nombre": n, "codigo_iso": c} for i, (n, c) in enumerate(PAISES, start=1)],
+        )
+        conn.execute(
+            CategoriaProducto.__table__.insert(),
+            [{"id": i, "nombre": n} for i, n in enumerate(CATEGORIAS, start=1)],
+        )
+        conn.execute(
+            MedioTransporte.__table__.insert(),
+            [{"id": i, "tipo": t, "empresa": e} for i, (t, e) in enumerate(MEDIOS, start=1)],
+        )
+
+        puertos = []
+        puertos_por_pais = {}
+        for pais_id in range(1, len(PAISES) + 1):
+            # Los primeros países (más comercio) tienen más puertos
+            for j in range(1 + 4 // (1 + (pais_id - 1) // 5)):
+                puerto_id = len(puertos) + 1
+                tipo = "aeropuerto" if j == 1 else "maritimo"
+                puertos.append(
+                    {"id": puerto_id, "nombre": f"Puerto {pais_id}-{j + 1}", "tipo": tipo, "pais_id": pais_id}
+                )
+                puertos_por_pais.setdefault(pais_id, []).append(puerto_id)
+        conn.execute(Puerto.__table__.insert(), puertos)
+
+        # Los destinos y orígenes también siguen una Zipf (EE. UU. y Europa primero)
+        pesos_paises = _pesos_zipf(len(PAISES) - 1, 0.9)
+        paises_extranjeros = list(range(2, len(PAISES) + 1))
+
+        def _empresas(modelo, cantidad, prefijo):
+            filas = []
+            for i in range(1, cantidad + 1):
+                filas.append(
+                    {
+                        "id": i,
+                        "nombre": f"{prefijo} {i:05d}",
+                        "tipo": rng.choice(["mayorista", "minorista", "distribuidor"]),
+                        "email": f"{prefijo.lower()}{i}@ejemplo.com",
+                        "telefono": f"+57 300 {i:07d}",
+                        "pais_id": rng.choices(paises_extranjeros, cum_weights=pesos_paises)[0],
+                    }
+                )
+            conn.execute(modelo.__table__.insert(), filas)
+            return {fila["id"]: fila["pais_id"] for fila in filas}
+
+        pais_de_cliente = _empresas(Cliente, escala["clientes"], "Cliente")
+        pais_de_proveedor = _empresas(Proveedor, escala["proveedores"], "Proveedor")
+
+        productos = []
+        nombres = [(n, "fruta") for n in FRUTAS] + [(n, "verdura") for n in VERDURAS]
+        for i in range(escala["productos"]):
+            base, tipo = nombres[i % len(nombres)]
+            variedad = VARIEDADES[(i // len(nombres)) % len(VARIEDADES)]
+            sufijo = f" {i // (len(nombres) * len(VARIEDADES)) + 1}" if i >= len(nombres) * len(VARIEDADES) else ""
+            productos.append(
+                {
+                    "id": i + 1,
+                    "nombre": f"{base}{variedad}{sufijo}",
+                    "tipo": tipo,
+                    "unidad_medida": "kg",
+                    "precio_referencia": round(rng.uniform(0.4, 12.0), 2),
+                    "stock_disponible": 0,
+                    "categoria_id": rng.randint(1, 3) if tipo == "fruta" else rng.randint(4, 5),
+                }
+            )
+        conn.execute(Producto.__table__.insert(), productos)
+
+        # ------------------------------------------------------------------
+        # Operaciones, detalles e inspecciones (por lotes)
+        # ------------------------------------------------------------------
+        ids_productos = [p["id"] for p in productos]
+        precio = {p["id"]: p["precio_referencia"] for p in productos}
+        pesos_productos = _pesos_zipf(len(ids_productos))
+        ids_clientes = list(pais_de_cliente)
+        pesos_clientes = _pesos_zipf(len(ids_clientes))
+        ids_proveedores = list(pais_de_proveedor)
+        pesos_proveedores = _pesos_zipf(len(ids_proveedores))
+        ids_medios = list(range(1, len(MEDIOS) + 1))
+
+        movimiento = {p: 0.0 for p in ids_productos}
+        lote_operaciones, lote_detalles, lote_inspecciones, lote_movimientos = [], [], [], []
+        detalle_id = 0
+        inspeccion_id = 0
+        operacion_id = 0
+
+        def _volcar():
+            if lote_operaciones:
+                conn.execute(Operacion.__table__.insert(), lote_operaciones)
+            if lote_detalles:
+                conn.execute(DetalleOperacion.__table__.insert(), lote_detalles)
+            if lote_inspecciones:
+                conn.execute(InspeccionCalidad.__table__.insert(), lote_inspecciones)
+            if lote_movimientos:
+                conn.execute(MovimientoStock.__table__.insert(), lote_movimientos)
+            lote_operaciones.clear()
+            lote_movimientos.clear()
+            lote_detalles.clear()
+            lote_inspecciones.clear()
+
+        while detalle_id < detalles:
+            operacion_id += 1
+            exportacion = rng.random() < 0.6
+            # Triangular con moda en hoy: más volumen en los meses recientes
+            fecha = primer_dia + timedelta(days=int(rng.triangular(0, dias, dias)))
+
+            if exportacion:
+                cliente_id = rng.choices(ids_clientes, cum_weights=pesos_clientes)[0]
+                proveedor_id = None
+                origen, destino = 1, pais_de_cliente[cliente_id]
+            else:
+                proveedor_id = rng.choices(ids_proveedores, cum_weights=pesos_proveedores)[0]
+                cliente_id = None
+                origen, destino = pais_de_proveedor[proveedor_id], 1
+
+            cantidad_detalles = min(rng.randint(1, 7), detalles - detalle_id)
+            elegidos = rng.choices(ids_productos, cum_weights=pesos_productos, k=cantidad_detalles)
+            costo = 0.0
+            for producto_id in elegidos:
+                detalle_id += 1
+                cantidad = round(rng.lognormvariate(5, 1), 1)
+                precio_unitario = round(precio[producto_id] * rng.uniform(0.8, 1.25), 2)
+                costo += cantidad * precio_unitario
+                movimiento[producto_id] += -cantidad if exportacion else cantidad
+                lote_movimientos.append(
+                    {
+                        "producto_id": producto_id,
+                        "cantidad": -cantidad if exportacion else cantidad,
+                        "motivo": "detalle_creado",
+                        "registrado_en": datetime.combine(fecha, hora(12), tzinfo=timezone.utc),
+                        "operacion_id": operacion_id,
+                        "detalle_id": detalle_id,
+                    }
+                )
+                lote_detalles.append(
+                    {
+                        "id": detalle_id,
+                        "producto_id": producto_id,
+                        "operacion_id": operacion_id,
+                        "cantidad": cantidad,
+                        "precio_unitario": precio_unitario,
+                    }
+                )
+
+            lote_operaciones.append(
+                {
+                    "id": operacion_id,
+                    "tipo": "exportacion" if exportacion else "importacion",
+                    "fecha": fecha,
+                    "estado": rng.choices(*ESTADOS)[0],
+                    "costo_total": costo,
+                    "observaciones": None,
+                    "cliente_id": cliente_id,
+                    "proveedor_id": proveedor_id,
+                    "pais_origen_id": origen,
+                    "pais_destino_id": destino,
+                    "puerto_origen_id": rng.choice(puertos_por_pais[origen]),
+                    "puerto_destino_id": rng.choice(puertos_por_pais[destino]),
+                    "medio_transporte_id": rng.choice(ids_medios),
+                }
+            )
+
+            # Aproximadamente una inspección cada tres operaciones
+            if rng.random() < 1 / 3:
+                inspeccion_id += 1
+                lote_inspecciones.append(
+                    {
+                        "id": inspeccion_id,
+                        "fecha": min(hoy, fecha + timedelta(days=rng.randint(0, 10))),
+                        "resultado": rng.choices(*RESULTADOS)[0],
+                        "observaciones": None,
+                        "operacion_id": operacion_id,
+                        "producto_id": rng.choice(elegidos),
+                    }
+                )
+
+            if len(lote_detalles) >= LOTE:
+                _volcar()
+        _volcar()
+
+        # Stock final: lo importado menos lo exportado, más un inventario base
+        stock = {p: round(max(0.0, mov) + 10_000, 1) for p, mov in movimiento.items()}
+        conn.execute(
+            update(Producto.__table__)
+            .where(Producto.__table__.c.id == bindparam("pid"))
+            .values(stock_disponible=bindparam("stock")),
+            [{"pid": p, "stock": s} for p, s in stock.items()],
+        )
+        # El saldo inicial del libro es lo que falta para llegar al stock final
+        conn.execute(
+            MovimientoStock.__table__.insert(),
+            [
+                {
+                    "producto_id": p,
+                    "cantidad": stock[p] - mov,
+                    "motivo": "saldo_inicial",
+                    "registrado_en": datetime.combine(primer_dia, hora(), tzinfo=timezone.utc),
+                }
+                for p, mov in movimiento.items()
+            ],
+        )
+
+    with Session(engine) as session:
+        reconstruir_resumenes(session)
+        session.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    engine.dispose()
+
+    escala["operaciones"] = operacion_id
+    escala["inspecciones"] = inspeccion_id
+    return {
+        "escala": escala,
+        "semilla": semilla,
+        "segundos": round(time.perf_counter() - inicio, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base", required=True, help="Ruta del archivo SQLite a generar")
+    parser.add_argument("--detalles", type=int, default=200_000)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    resultado = generar(args.base, args.detalles, args.semilla)
+    print(
+        f"Dataset generado en {resultado['segundos']} s: "
+        + ", ".join(f"{tabla}={n}" for tabla, n in resultado["escala"].items())
+    )
@@ -0,0 +1,22 @@
+"""Resumen de latencias compartido por los scripts de benchmark."""
+import statistics
+
+
+def resumir(latencias: list, transcurrido: float, errores: int = 0) -> dict:
+    """Throughput y percentiles (en ms) de una lista de latencias en segundos."""
+    latencias = sorted(latencias)
+    if not latencias:
+        return {"peticiones": 0, "errores": errores}
+
+    def percentil(p: float) -> float:
+        return round(latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000, 2)
+
+    return {
+        "peticiones": len(latencias),
+        "errores": errores,
+        "throughput_rps": round(len(latencias) / transcurrido, 1),
+        "p50_ms": percentil(0.50),
+        "p95_ms": percentil(0.95),
+        "p99_ms": percentil(0.99),
+        "media_ms": round(statistics.fmean(latencias) * 1000, 2),
+    }
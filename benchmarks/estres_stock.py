@@ -0,0 +1,174 @@
+"""
+Prueba de estrés de stock: N exportadores concurrentes sobre un producto.
+
+Crea un producto con un stock inicial y una operación de exportación por
+exportador. Cada exportador agrega detalles (POST /detalles-operacion/)
+hasta que la API rechaza por falta de stock. Al final comprueba que:
+
+    stock_inicial - suma de cantidades aceptadas == stock final >= 0
+
+es decir, que no se vendió dos veces el mismo stock ni se perdieron
+actualizaciones, y que el libro de movimientos da el mismo stock final. Imprime un JSON con el resultado, throughput y latencias;
+termina con código 1 si el invariante no se cumple.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/estres_stock.py --exportadores 50 --stock 5000
+    python benchmarks/estres_stock.py --url http://127.0.0.1:8000   # API ya levantada
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+from concurrencia import esperar_api, levantar_api, puerto_libre
+from estadisticas import resumir
+
+
+async def preparar(client, args) -> tuple:
+    pais = (await client.post("/paises/", json={"nombre": "Colombia", "codigo_iso": "CO"})).json()
+    cliente = (
+        await client.post("/clientes/", json={"nombre": "Cliente estrés", "pais_id": pais["id"]})
+    ).json()
+    producto = (
+        await client.post(
+            "/productos/",
+            json={
+                "nombre": f"Producto caliente {time.time_ns()}",
+                "tipo": "fruta",
+                "precio_referencia": 2,
+                "stock_disponible": args.stock,
+            },
+        )
+    ).json()
+    operaciones = []
+    for _ in range(args.exportadores):
+        resp = await client.post(
+            "/operaciones/",
+            json={"tipo": "exportacion", "fecha": "2025-06-01", "cliente_id": cliente["id"]},
+        )
+        resp.raise_for_status()
+        operaciones.append(resp.json()["id"])
+    return producto, operaciones
+
+
+async def exportar(client, producto_id: int, operacion_id: int, cantidad: float, estado: dict) -> None:
+    """Agrega detalles a su operación hasta que se agote el stock."""
+    while True:
+        inicio = time.perf_counter()
+        try:
+            resp = await client.post(
+                "/detalles-operacion/",
+                json={
+                    "producto_id": producto_id,
+                    "operacion_id": operacion_id,
+                    "cantidad": cantidad,
+                    "precio_unitario": 2,
+                },
+            )
+        except httpx.HTTPError:
+            estado["errores"] += 1
+            continue
+        estado["latencias"].append(time.perf_counter() - inicio)
+        if resp.status_code == 200:
+            estado["aceptadas"] += 1
+            estado["cantidad_aceptada"] += cantidad
+        elif resp.status_code == 400:
+            estado["rechazadas"] += 1
+            return
+        else:
+            estado["errores"] += 1
+            if estado["errores"] > 100 * len(estado["latencias"]) + 1000:
+                return
+
+
+async def ejecutar(url: str, args) -> dict:
+    limites = httpx.Limits(max_connections=args.exportadores)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as client:
+        producto, operaciones = await preparar(client, args)
+        estado = {
+            "aceptadas": 0,
+            "rechazadas": 0,
+            "errores": 0,
+            "cantidad_aceptada": 0.0,
+            "latencias": [],
+        }
+
+        inicio = time.perf_counter()
+        await asyncio.gather(
+            *(exportar(client, producto["id"], op, args.cantidad, estado) for op in operaciones)
+        )
+        transcurrido = time.perf_counter() - inicio
+
+        final = (await client.get(f"/productos/{producto['id']}")).json()["stock_disponible"]
+        libro = (await client.get(f"/productos/{producto['id']}/stock")).json()["stock"]
+
+        # La suma de los detalles guardados también debe coincidir
+        guardado = 0.0
+        for op in operaciones:
+            after_id = None
+            while True:
+                params = {"operacion_id": op, "limit": 1000}
+                if after_id is not None:
+                    params["after_id"] = after_id
+                pagina = (await client.get("/detalles-operacion/", params=params)).json()
+                guardado += sum(d["cantidad"] for d in pagina["items"])
+                after_id = pagina["next_after_id"]
+                if after_id is None:
+                    break
+
+    esperado = args.stock - estado["cantidad_aceptada"]
+    return {
+        "exportadores": args.exportadores,
+        "stock_inicial": args.stock,
+        "cantidad_por_detalle": args.cantidad,
+        "detalles_aceptados": estado["aceptadas"],
+        "rechazos_por_stock": estado["rechazadas"],
+        "errores": estado["errores"],
+        "cantidad_aceptada": estado["cantidad_aceptada"],
+        "cantidad_en_detalles": guardado,
+        "stock_final": final,
+        "stock_segun_libro": libro,
+        "stock_esperado": esperado,
+        "invariante_ok": (
+            final >= 0
+            and abs(final - esperado) < 1e-6
+            and abs(guardado - estado["cantidad_aceptada"]) < 1e-6
+            and abs(libro - final) < 1e-6
+        ),
+        "medicion": resumir(estado["latencias"], transcurrido, estado["errores"]),
+    }
+
+
+async def principal(args) -> dict:
+    if args.url:
+        return await ejecutar(args.url, args)
+
+    directorio = tempfile.mkdtemp(prefix="estres_stock_")
+    puerto = puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    proceso = levantar_api(args.modo, os.path.join(directorio, "estres.db"), puerto)
+    try:
+        await esperar_api(url)
+        resultado = await ejecutar(url, args)
+        resultado["modo"] = args.modo
+        return resultado
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--exportadores", type=int, default=50)
+    parser.add_argument("--stock", type=float, default=5000)
+    parser.add_argument("--cantidad", type=float, default=3, help="Cantidad de cada detalle")
+    parser.add_argument("--modo", choices=["sync", "async"], default="sync")
+    parser.add_argument("--url", help="API ya levantada (por ejemplo, contra PostgreSQL)")
+    resultado = asyncio.run(principal(parser.parse_args()))
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    sys.exit(0 if resultado["invariante_ok"] else 1)
@@ -0,0 +1,134 @@
+"""
+Benchmark de serialización de listados grandes (antes / después).
+
+Para cada listado mide, sobre el dataset sintético y con --filas filas
+(por defecto 100 000, o las que tenga la tabla), el tiempo de leer las filas
+y convertirlas a los bytes JSON de la respuesta por dos caminos:
+
+    antes:   instancias del ORM (select(Modelo)) validadas con from_attributes
+             contra Pagina[Schema], como hacía FastAPI con el response_model
+    despues: paginar() (solo las columnas del schema, como tuplas, en dicts)
+             validado contra el mismo Pagina[Schema]
+
+En los dos casos el TypeAdapter se arma una vez y el JSON lo genera
+pydantic-core, igual que FastAPI.
+
+También informa el tamaño del cuerpo sin comprimir, con gzip y con brotli
+(si el paquete brotli está instalado).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/serializacion.py --detalles 200000 --filas 100000
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from datos_sinteticos import generar  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _mejor_tiempo(funcion, repeticiones: int):
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return round(mejor * 1000, 1), resultado
+
+
+def medir(engine, modelo, schema, filas: int, repeticiones: int) -> dict:
+    from pydantic import TypeAdapter
+    from sqlmodel import Session, select
+
+    from paginacion import Paginacion, paginar
+    from schemas import Pagina
+
+    adaptador = TypeAdapter(Pagina[schema])
+    pagina = Paginacion(after_id=None, limit=filas)
+
+    with Session(engine) as session:
+
+        def antes():
+            session.expunge_all()
+            items = session.exec(select(modelo).order_by(modelo.id).limit(filas)).all()
+            sobre = {"items": items, "next_after_id": None}
+            return adaptador.dump_json(adaptador.validate_python(sobre, from_attributes=True))
+
+        def despues():
+            sobre = paginar(session, select(modelo), modelo, pagina, schema)
+            return adaptador.dump_json(adaptador.validate_python(sobre))
+
+        ms_antes, cuerpo_antes = _mejor_tiempo(antes, repeticiones)
+        ms_despues, cuerpo = _mejor_tiempo(despues, repeticiones)
+
+    # Mismos items; next_after_id solo lo calcula paginar (hay más filas que la página)
+    assert json.loads(cuerpo_antes)["items"] == json.loads(cuerpo)["items"], modelo.__name__
+    return {
+        "filas": len(json.loads(cuerpo)["items"]),
+        "antes_ms": ms_antes,
+        "despues_ms": ms_despues,
+        "mejora": round(ms_antes / ms_despues, 2) if ms_despues else None,
+        "bytes": len(cuerpo),
+        "bytes_gzip": len(gzip.compress(cuerpo, compresslevel=9)),
+        "bytes_brotli": len(brotli.compress(cuerpo, quality=4)) if brotli else None,
+    }
+
+
+def principal(args) -> dict:
+    base = args.base or os.path.join(tempfile.gettempdir(), f"bench_{args.detalles}_{args.semilla}.db")
+    if args.regenerar or not os.path.exists(base):
+        dataset = generar(base, args.detalles, args.semilla)
+        print(f"Dataset generado en {dataset['segundos']} s", file=sys.stderr)
+    os.environ["DATABASE_URL"] = f"sqlite:///{base}"
+    os.environ.setdefault("DB_PERFIL", "bench")
+
+    from database import engine
+    from models import Cliente, DetalleOperacion, InspeccionCalidad, Operacion, Producto
+    from schemas import (
+        ClienteRead,
+        DetalleOperacionRead,
+        InspeccionCalidadRead,
+        OperacionRead,
+        ProductoRead,
+    )
+
+    listados = {
+        "detalles_operacion": (DetalleOperacion, DetalleOperacionRead),
+        "operaciones": (Operacion, OperacionRead),
+        "inspecciones_calidad": (InspeccionCalidad, InspeccionCalidadRead),
+        "clientes": (Cliente, ClienteRead),
+        "productos": (Producto, ProductoRead),
+    }
+    resultados = {}
+    for nombre, (modelo, schema) in listados.items():
+        resultados[nombre] = medida = medir(engine, modelo, schema, args.filas, args.repeticiones)
+        print(
+            f"{nombre:22s} {medida['filas']:>7d} filas  antes={medida['antes_ms']:8.1f} ms  "
+            f"despues={medida['despues_ms']:8.1f} ms  x{medida['mejora']}",
+            file=sys.stderr,
+        )
+    return {"base": base, "repeticiones": args.repeticiones, "listados": resultados}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base", help="Base generada a reutilizar (por defecto en el directorio temporal)")
+    parser.add_argument("--detalles", type=int, default=200_000)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--regenerar", action="store_true", help="Vuelve a generar la base aunque exista")
+    parser.add_argument("--filas", type=int, default=100_000, help="Filas por listado")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Se informa el mejor tiempo")
+    print(json.dumps(principal(parser.parse_args()), indent=2, ensure_ascii=False))
@@ -0,0 +1,149 @@
+"""
+Benchmark de subidas de archivos (supa/almacenamiento.py).
+
+Arma N UploadFile como los que entrega Starlette (el cuerpo multipart ya
+volcado a un SpooledTemporaryFile) y los guarda a la vez con guardar() sobre
+el almacenamiento local en una carpeta temporal. Mientras tanto una tarea
+mide cuánto se atrasa el event loop respecto de su intervalo (si una subida
+lo bloqueara, el atraso sería del orden de la subida entera).
+
+Informa el pico de memoria de Python durante las subidas (tracemalloc), que
+debe rondar N * TAMANO_BLOQUE y no N * tamaño del archivo, y el atraso máximo
+del loop. Después sube otra vez los mismos contenidos: deben resolverse por
+el índice de hashes, sin escribir nada nuevo en el almacenamiento. Por último
+comprueba que un archivo por encima de ALMACENAMIENTO_MAX_MB se corta con 413
+sin dejar temporales.
+
+El índice usa una base SQLite temporal.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/subidas.py --subidas 20 --mb 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+_directorio_base = tempfile.mkdtemp(prefix="subidas_db_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio_base, 'subidas.db')}"
+os.environ.setdefault("DB_PERFIL", "bench")
+
+from fastapi import HTTPException, UploadFile  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+from starlette.datastructures import Headers  # noqa: E402
+
+from database import engine  # noqa: E402
+from supa import almacenamiento  # noqa: E402
+
+
+def archivo_subido(tamano: int, nombre: str, bloque: bytes = None) -> UploadFile:
+    """
+    Un UploadFile con `tamano` bytes en disco, como queda tras parsear el
+    multipart. El contenido repite `bloque` (1 MiB al azar si no se indica).
+    """
+    contenido = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    bloque = bloque or os.urandom(1024 * 1024)
+    escritos = 0
+    while escritos < tamano:
+        escritos += contenido.write(bloque[: tamano - escritos])
+    contenido.seek(0)
+    return UploadFile(
+        contenido,
+        size=tamano,
+        filename=nombre,
+        headers=Headers({"content-type": "application/pdf"}),
+    )
+
+
+async def medir_atraso(intervalo: float, detener: asyncio.Event, atrasos: list) -> None:
+    while not detener.is_set():
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        atrasos.append(time.perf_counter() - inicio - intervalo)
+
+
+async def correr(subidas: int, tamano: int, backend, bloques: list) -> dict:
+    archivos = [archivo_subido(tamano, f"documento_{i}.pdf", b) for i, b in enumerate(bloques)]
+    detener, atrasos = asyncio.Event(), []
+    medidor = asyncio.create_task(medir_atraso(0.005, detener, atrasos))
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    guardados = await asyncio.gather(
+        *(almacenamiento.guardar(a, "inspecciones", backend) for a in archivos)
+    )
+    transcurrido = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    detener.set()
+    await medidor
+    for archivo in archivos:
+        await archivo.close()
+
+    assert all(g.bytes == tamano for g in guardados)
+    assert all(
+        os.path.getsize(os.path.join(backend.directorio, g.clave)) == tamano for g in guardados
+    )
+    return {
+        "subidas": subidas,
+        "duplicadas": sum(g.duplicado for g in guardados),
+        "mb_por_archivo": tamano / 1024 / 1024,
+        "segundos": round(transcurrido, 3),
+        "mb_por_segundo": round(subidas * tamano / 1024 / 1024 / transcurrido, 1),
+        "pico_memoria_mb": round(pico / 1024 / 1024, 2),
+        "atraso_loop_max_ms": round(max(atrasos, default=0) * 1000, 1),
+    }
+
+
+async def comprobar_limite(backend) -> dict:
+    limite = int(almacenamiento.ALMACENAMIENTO_MAX_MB * 1024 * 1024)
+    # Sin size (cliente que no lo informa): el corte lo hace la lectura en bloques
+    archivo = archivo_subido(limite + 1, "grande.jpg")
+    archivo.size = None
+    try:
+        await almacenamiento.guardar(archivo, "inspecciones", backend)
+    except HTTPException as exc:
+        codigo = exc.status_code
+    else:
+        codigo = 200
+    finally:
+        await archivo.close()
+    return {"codigo": codigo, "temporales": os.listdir(backend.directorio_temporal)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subidas", type=int, default=20)
+    parser.add_argument("--mb", type=float, default=8)
+    args = parser.parse_args()
+
+    tamano = int(args.mb * 1024 * 1024)
+    almacenamiento.ALMACENAMIENTO_MAX_MB = max(almacenamiento.ALMACENAMIENTO_MAX_MB, args.mb)
+    SQLModel.metadata.create_all(engine)
+    bloques = [os.urandom(1024 * 1024) for _ in range(args.subidas)]
+    with tempfile.TemporaryDirectory(prefix="subidas_") as directorio:
+        backend = almacenamiento.AlmacenamientoLocal(directorio)
+        nuevas = asyncio.run(correr(args.subidas, tamano, backend, bloques))
+        guardados = sorted(os.listdir(os.path.join(directorio, "inspecciones")))
+        repetidas = asyncio.run(correr(args.subidas, tamano, backend, bloques))
+        sin_cambios = sorted(os.listdir(os.path.join(directorio, "inspecciones"))) == guardados
+        limite = asyncio.run(comprobar_limite(backend))
+
+    resultado = {"nuevas": nuevas, "repetidas": repetidas, "limite": limite}
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    assert nuevas["duplicadas"] == 0 and repetidas["duplicadas"] == args.subidas, resultado
+    assert sin_cambios, "las subidas repetidas escribieron en el almacenamiento"
+    assert limite["codigo"] == 413 and not limite["temporales"], limite
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Suite de benchmarks en proceso sobre el dataset sintético.
+
+Genera (o reutiliza) una base SQLite con benchmarks/datos_sinteticos.py,
+trabaja sobre una copia para que las escrituras no alteren el original y
+monta la aplicación FastAPI en el mismo proceso (httpx + ASGITransport).
+Para cada escenario (listados, lecturas por id y filtros de todos los
+routers, todos los reportes y algunas escrituras) mide latencias p50/p95/p99
+y throughput, y emite un JSON que se puede guardar y comparar entre corridas.
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/suite.py --detalles 1000000 --salida resultados.json
+    python benchmarks/suite.py --comparar resultados.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+import httpx  # noqa: E402
+
+from datos_sinteticos import generar  # noqa: E402
+from estadisticas import resumir  # noqa: E402
+
+# Cambio relativo de p95 a partir del cual --comparar marca una regresión
+UMBRAL_REGRESION = 0.10
+
+
+def escenarios(ids: dict) -> list:
+    """
+    Lista de (nombre, método, ruta de la API, función que arma la petición).
+    La función recibe un random.Random y devuelve (url, cuerpo).
+    """
+    def azar(tabla):
+        return lambda rng: rng.randint(1, ids[tabla])
+
+    op, det, ins, prod = azar("operacion"), azar("detalleoperacion"), azar("inspeccioncalidad"), azar("producto")
+    cli, prov, pais = azar("cliente"), azar("proveedor"), azar("pais")
+
+    def get(url):
+        return lambda rng: (url(rng) if callable(url) else url, None)
+
+    def nueva_operacion(rng):
+        return "/operaciones/con-detalles", {
+            "tipo": "exportacion",
+            "fecha": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "cliente_id": cli(rng),
+            "detalles": [
+                {"producto_id": prod(rng), "cantidad": 1, "precio_unitario": 2.5}
+                for _ in range(rng.randint(1, 5))
+            ],
+        }
+
+    def nueva_inspeccion(rng):
+        return "/inspecciones-calidad/", {
+            "fecha": "2025-06-01",
+            "resultado": "Aprobado",
+            "operacion_id": op(rng),
+            "producto_id": prod(rng),
+        }
+
+    return [
+        # Catálogos
+        ("paises.listar", "GET", "/paises/", get("/paises/")),
+        ("paises.obtener", "GET", "/paises/{item_id}", get(lambda r: f"/paises/{pais(r)}")),
+        ("categorias.listar", "GET", "/categorias-producto/", get("/categorias-producto/")),
+        ("categorias.obtener", "GET", "/categorias-producto/{item_id}", get(lambda r: f"/categorias-producto/{r.randint(1, ids['categoriaproducto'])}")),
+        ("medios.listar", "GET", "/medios-transporte/", get("/medios-transporte/?tipo=maritimo")),
+        ("medios.obtener", "GET", "/medios-transporte/{item_id}", get(lambda r: f"/medios-transporte/{r.randint(1, ids['mediotransporte'])}")),
+        ("puertos.listar", "GET", "/puertos/", get(lambda r: f"/puertos/?pais_id={pais(r)}")),
+        ("puertos.obtener", "GET", "/puertos/{item_id}", get(lambda r: f"/puertos/{r.randint(1, ids['puerto'])}")),
+        # Entidades
+        ("clientes.listar", "GET", "/clientes/", get(lambda r: f"/clientes/?pais_id={pais(r)}&limit=100")),
+        ("clientes.obtener", "GET", "/clientes/{item_id}", get(lambda r: f"/clientes/{cli(r)}")),
+        ("proveedores.listar", "GET", "/proveedores/", get(lambda r: f"/proveedores/?pais_id={pais(r)}&limit=100")),
+        ("proveedores.obtener", "GET", "/proveedores/{item_id}", get(lambda r: f"/proveedores/{prov(r)}")),
+        ("productos.listar", "GET", "/productos/", get(lambda r: f"/productos/?categoria_id={r.randint(1, ids['categoriaproducto'])}")),
+        ("productos.obtener", "GET", "/productos/{item_id}", get(lambda r: f"/productos/{prod(r)}")),
+        ("productos.stock_historico", "GET", "/productos/{item_id}/stock", get(lambda r: f"/productos/{prod(r)}/stock?fecha=2025-{r.randint(1, 12):02d}-15")),
+        ("productos.verificar_stock", "GET", "/productos/stock/verificar", get("/productos/stock/verificar")),
+        # Operaciones y detalles
+        ("operaciones.listar", "GET", "/operaciones/", get("/operaciones/?limit=100")),
+        ("operaciones.paginar", "GET", "/operaciones/", get(lambda r: f"/operaciones/?after_id={op(r)}&limit=100")),
+        ("operaciones.expandir", "GET", "/operaciones/", get(lambda r: f"/operaciones/?after_id={op(r)}&limit=100&expand=cliente,proveedor,pais_origen,pais_destino,puerto_origen,puerto_destino,medio_transporte")),
+        ("operaciones.filtrar", "GET", "/operaciones/", get(lambda r: f"/operaciones/?tipo=exportacion&estado=pendiente&cliente_id={cli(r)}")),
+        ("operaciones.rango_fechas", "GET", "/operaciones/", get("/operaciones/?fecha_desde=2025-03-01&fecha_hasta=2025-03-31&limit=100")),
+        ("operaciones.exportar", "GET", "/operaciones/export", get("/operaciones/export?fecha_desde=2025-03-01&fecha_hasta=2025-03-07&incluir_nombres=true")),
+        ("operaciones.obtener", "GET", "/operaciones/{operacion_id}", get(lambda r: f"/operaciones/{op(r)}")),
+        ("operaciones.completa", "GET", "/operaciones/{operacion_id}/completa", get(lambda r: f"/operaciones/{op(r)}/completa")),
+        ("detalles.listar", "GET", "/detalles-operacion/", get(lambda r: f"/detalles-operacion/?operacion_id={op(r)}")),
+        ("detalles.por_producto", "GET", "/detalles-operacion/", get(lambda r: f"/detalles-operacion/?producto_id={prod(r)}&limit=100")),
+        ("detalles.expandir", "GET", "/detalles-operacion/", get(lambda r: f"/detalles-operacion/?operacion_id={op(r)}&expand=producto,operacion")),
+        ("detalles.exportar", "GET", "/detalles-operacion/export", get(lambda r: f"/detalles-operacion/export?formato=ndjson&producto_id={prod(r)}&fecha_desde=2025-12-01")),
+        ("detalles.obtener", "GET", "/detalles-operacion/{detalle_id}", get(lambda r: f"/detalles-operacion/{det(r)}")),
+        ("inspecciones.listar", "GET", "/inspecciones-calidad/", get(lambda r: f"/inspecciones-calidad/?operacion_id={op(r)}")),
+        ("inspecciones.obtener", "GET", "/inspecciones-calidad/{item_id}", get(lambda r: f"/inspecciones-calidad/{ins(r)}")),
+        # Reportes
+        ("reportes.operaciones_por_estado", "GET", "/reportes/operaciones-por-estado", get("/reportes/operaciones-por-estado")),
+        ("reportes.top_productos", "GET", "/reportes/top-productos-exportados", get("/reportes/top-productos-exportados?limit=10")),
+        ("reportes.ingresos_por_mes", "GET", "/reportes/ingresos-por-mes", get("/reportes/ingresos-por-mes?anio=2025")),
+        ("reportes.dashboard", "GET", "/reportes/dashboard", get("/reportes/dashboard")),
+        ("reportes.ingresos_por_periodo", "GET", "/reportes/ingresos-por-periodo", get("/reportes/ingresos-por-periodo?desde=2025-01-01&hasta=2025-07-01&periodo=semana")),
+        # Escrituras
+        ("operaciones.crear_con_detalles", "POST", "/operaciones/con-detalles", nueva_operacion),
+        ("inspecciones.crear", "POST", "/inspecciones-calidad/", nueva_inspeccion),
+    ]
+
+
+def rutas_sin_medir(app, lista: list) -> list:
+    """Rutas GET de la API (según el esquema OpenAPI) que ningún escenario ejercita."""
+    medidas = {(metodo, ruta) for _, metodo, ruta, _ in lista}
+    return sorted(
+        f"GET {ruta}"
+        for ruta, operaciones in app.openapi()["paths"].items()
+        if "get" in operaciones
+        and ruta not in ("/", "/cache/estadisticas")
+        # Estado y resultado de trabajos creados durante la corrida (búsqueda por id)
+        and not ruta.startswith("/reportes/jobs/")
+        # Archivos subidos (búsqueda por hash; la base generada no tiene subidas)
+        and not ruta.startswith("/archivos/")
+        and ("GET", ruta) not in medidas
+    )
+
+
+async def medir_escenario(client, metodo, armar, peticiones, concurrencia, semilla) -> dict:
+    rng = random.Random(semilla)
+    pendientes = [armar(rng) for _ in range(peticiones)]
+    latencias = []
+    errores = 0
+
+    async def trabajador():
+        nonlocal errores
+        while pendientes:
+            url, cuerpo = pendientes.pop()
+            inicio = time.perf_counter()
+            resp = await client.request(metodo, url, json=cuerpo)
+            latencias.append(time.perf_counter() - inicio)
+            if resp.status_code != 200:
+                errores += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return resumir(latencias, time.perf_counter() - inicio, errores)
+
+
+def contar_filas(engine) -> dict:
+    from sqlalchemy import text
+
+    tablas = [
+        "pais", "categoriaproducto", "mediotransporte", "puerto", "cliente",
+        "proveedor", "producto", "operacion", "detalleoperacion", "inspeccioncalidad",
+    ]
+    with engine.connect() as conn:
+        return {t: conn.execute(text(f"SELECT max(id) FROM {t}")).scalar() or 1 for t in tablas}
+
+
+def commit_actual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def comparar(actual: dict, anterior: dict) -> dict:
+    """Diferencia de p50/p95 y throughput respecto de una corrida anterior."""
+    cambios = {}
+    for nombre, medida in actual["escenarios"].items():
+        previa = anterior.get("escenarios", {}).get(nombre)
+        if not previa or not previa.get("peticiones") or not medida.get("peticiones"):
+            continue
+        delta = (medida["p95_ms"] - previa["p95_ms"]) / previa["p95_ms"] if previa["p95_ms"] else 0
+        cambios[nombre] = {
+            "p50_ms": [previa["p50_ms"], medida["p50_ms"]],
+            "p95_ms": [previa["p95_ms"], medida["p95_ms"]],
+            "throughput_rps": [previa["throughput_rps"], medida["throughput_rps"]],
+            "cambio_p95": round(delta, 3),
+            "regresion": delta > UMBRAL_REGRESION,
+        }
+    return cambios
+
+
+async def principal(args) -> dict:
+    base = args.base or os.path.join(tempfile.gettempdir(), f"bench_{args.detalles}_{args.semilla}.db")
+    dataset = None
+    if args.regenerar or not os.path.exists(base):
+        dataset = generar(base, args.detalles, args.semilla)
+        print(f"Dataset generado en {dataset['segundos']} s", file=sys.stderr)
+
+    # Copia de trabajo: las escrituras no modifican la base original
+    directorio = tempfile.mkdtemp(prefix="suite_")
+    copia = os.path.join(directorio, "bench.db")
+    shutil.copyfile(base, copia)
+    os.environ["DATABASE_URL"] = f"sqlite:///{copia}"
+    os.environ.setdefault("DB_PERFIL", "bench")
+
+    from database import engine, init_db
+    from main import app
+
+    init_db()
+    ids = contar_filas(engine)
+    lista = escenarios(ids)
+    if args.solo:
+        lista = [e for e in lista if any(e[0].startswith(p) for p in args.solo)]
+
+    resultados = {}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as client:
+        for n, (nombre, metodo, ruta, armar) in enumerate(lista):
+            # Calentamiento: llena caches y compila sentencias
+            await medir_escenario(client, metodo, armar, args.calentamiento, 1, n)
+            medida = await medir_escenario(
+                client, metodo, armar, args.peticiones, args.concurrencia, args.semilla + n
+            )
+            resultados[nombre] = {"metodo": metodo, "ruta": ruta, **medida}
+            print(
+                f"{nombre:38s} p50={medida['p50_ms']:8.2f} ms  p95={medida['p95_ms']:8.2f} ms  "
+                f"{medida['throughput_rps']:8.1f} rps",
+                file=sys.stderr,
+            )
+
+    shutil.rmtree(directorio, ignore_errors=True)
+    return {
+        "meta": {
+            "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "db_modo": os.getenv("DB_MODO", "sync"),
+            "db_perfil": os.environ["DB_PERFIL"],
+            "semilla": args.semilla,
+            "filas": ids,
+            "peticiones": args.peticiones,
+            "concurrencia": args.concurrencia,
+            "generacion_s": dataset["segundos"] if dataset else None,
+        },
+        "escenarios": resultados,
+        "rutas_sin_medir": rutas_sin_medir(app, lista),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base", help="Base generada a reutilizar (por defecto en el directorio temporal)")
+    parser.add_argument("--detalles", type=int, default=200_000)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--regenerar", action="store_true", help="Vuelve a generar la base aunque exista")
+    parser.add_argument("--peticiones", type=int, default=300, help="Peticiones medidas por escenario")
+    parser.add_argument("--calentamiento", type=int, default=20)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--solo", nargs="+", help="Prefijos de escenarios a medir (p. ej. reportes)")
+    parser.add_argument("--salida", help="Archivo donde guardar el JSON (por defecto stdout)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para calcular diferencias")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(principal(args))
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            resultado["comparacion"] = comparar(resultado, json.load(f))
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto)
+    else:
+        print(texto)
+    if args.comparar and any(c["regresion"] for c in resultado["comparacion"].values()):
+        sys.exit(1)
@@ -0,0 +1,101 @@
+# cache_catalogos.py
+"""
+Cache en memoria (por proceso) para los catálogos de referencia que casi
+nunca cambian: países, puertos, medios de transporte y categorías.
+
+Cada catálogo tiene su propio cache LRU con tamaño máximo y expiración (TTL).
+Los handlers de creación, edición y borrado de esos routers lo invalidan,
+y el TTL acota cuánto puede tardar en verse un cambio hecho desde otro proceso.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_TTL_SEGUNDOS = float(os.getenv("CACHE_CATALOGOS_TTL", "300"))
+CACHE_MAX_ENTRADAS = int(os.getenv("CACHE_CATALOGOS_MAX", "512"))
+
+
+class CacheCatalogo:
+    def __init__(self, nombre: str, max_entradas: int, ttl: float):
+        self.nombre = nombre
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entradas = OrderedDict()  # clave -> (expira_en, valor)
+        self._generacion = 0
+        self._lock = threading.Lock()
+
+    def buscar(self, clave):
+        """Devuelve el valor guardado o None, contando hit/miss."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return entrada[1]
+            if entrada is not None:
+                del self._entradas[clave]
+            self.misses += 1
+            return None
+
+    def guardar(self, clave, valor, generacion: int = None) -> None:
+        with self._lock:
+            # Si hubo una invalidación mientras se cargaba el valor, se descarta
+            if generacion is not None and generacion != self._generacion:
+                return
+            self._entradas[clave] = (time.monotonic() + self.ttl, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def obtener(self, clave, cargar):
+        """Lectura a través del cache: si la clave no está, llama a `cargar()`."""
+        valor = self.buscar(clave)
+        if valor is not None:
+            return valor
+        generacion = self._generacion
+        valor = cargar()
+        # No guardamos ausencias: un registro recién creado debe verse enseguida
+        if valor is not None:
+            self.guardar(clave, valor, generacion)
+        return valor
+
+    @property
+    def generacion(self) -> int:
+        return self._generacion
+
+    def invalidar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._generacion += 1
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "catalogo": self.nombre,
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl_segundos": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def cache_de(modelo) -> CacheCatalogo:
+    nombre = modelo.__tablename__
+    with _caches_lock:
+        if nombre not in _caches:
+            _caches[nombre] = CacheCatalogo(nombre, CACHE_MAX_ENTRADAS, CACHE_TTL_SEGUNDOS)
+        return _caches[nombre]
+
+
+def estadisticas() -> list:
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [c.estadisticas() for c in caches]
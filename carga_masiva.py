@@ -0,0 +1,567 @@
+# carga_masiva.py
+"""
+Carga masiva de datos (CSV / NDJSON) para todos los modelos.
+
+En lugar de pasar fila por fila por la API (un commit por fila), las filas
+se convierten, se resuelven sus claves foráneas por clave natural y se
+insertan por lotes con executemany (COPY en PostgreSQL) en una transacción
+por lote. Al final, una sola pasada basada en conjuntos ajusta el stock de
+los productos (y lo anota en el libro de movimientos) y el costo_total de
+las operaciones cargadas, y reconstruye los resúmenes de reportes.
+
+Claves naturales usadas para resolver referencias:
+    país -> codigo_iso, categoría -> nombre, medio de transporte -> empresa,
+    cliente / proveedor / puerto / producto -> nombre.
+Una columna `pais` con "CO" se convierte en `pais_id`; si el archivo ya trae
+la columna `*_id` se usa tal cual. Las operaciones en NDJSON pueden traer sus
+detalles anidados en "detalles".
+"""
+import csv
+import io
+import json
+import time
+from datetime import date
+
+from pydantic_core import PydanticUndefined
+from sqlalchemy import (
+    DateTime,
+    bindparam,
+    case,
+    cast,
+    exists,
+    func,
+    insert,
+    literal,
+    literal_column,
+    text,
+)
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session, select, update
+
+from models import (
+    CategoriaProducto,
+    Cliente,
+    DetalleOperacion,
+    InspeccionCalidad,
+    MedioTransporte,
+    MovimientoStock,
+    Operacion,
+    Pais,
+    Producto,
+    Proveedor,
+    Puerto,
+)
+import etags
+import inventario
+import resumenes
+
+LOTE_POR_DEFECTO = 5000
+
+# Errores por entidad que se guardan con detalle (el resto solo se cuenta)
+MAX_ERRORES_DETALLADOS = 200
+
+_REF_PAIS = (Pais, "codigo_iso")
+
+# Orden de carga: cada entidad solo referencia entidades anteriores.
+# referencias: columna del archivo -> (columna *_id, modelo, clave natural)
+ENTIDADES = {
+    "paises": {"modelo": Pais, "clave": "codigo_iso", "referencias": {}},
+    "categorias_producto": {"modelo": CategoriaProducto, "clave": "nombre", "referencias": {}},
+    "medios_transporte": {"modelo": MedioTransporte, "clave": "empresa", "referencias": {}},
+    "clientes": {
+        "modelo": Cliente,
+        "clave": "nombre",
+        "referencias": {"pais": ("pais_id", *_REF_PAIS)},
+    },
+    "proveedores": {
+        "modelo": Proveedor,
+        "clave": "nombre",
+        "referencias": {"pais": ("pais_id", *_REF_PAIS)},
+    },
+    "puertos": {
+        "modelo": Puerto,
+        "clave": "nombre",
+        "referencias": {"pais": ("pais_id", *_REF_PAIS)},
+    },
+    "productos": {
+        "modelo": Producto,
+        "clave": "nombre",
+        "referencias": {"categoria": ("categoria_id", CategoriaProducto, "nombre")},
+    },
+    "operaciones": {
+        "modelo": Operacion,
+        "clave": None,
+        "referencias": {
+            "cliente": ("cliente_id", Cliente, "nombre"),
+            "proveedor": ("proveedor_id", Proveedor, "nombre"),
+            "pais_origen": ("pais_origen_id", *_REF_PAIS),
+            "pais_destino": ("pais_destino_id", *_REF_PAIS),
+            "puerto_origen": ("puerto_origen_id", Puerto, "nombre"),
+            "puerto_destino": ("puerto_destino_id", Puerto, "nombre"),
+            "medio_transporte": ("medio_transporte_id", MedioTransporte, "empresa"),
+        },
+    },
+    "detalles_operacion": {
+        "modelo": DetalleOperacion,
+        "clave": None,
+        "referencias": {"producto": ("producto_id", Producto, "nombre")},
+    },
+    "inspecciones_calidad": {
+        "modelo": InspeccionCalidad,
+        "clave": None,
+        "referencias": {"producto": ("producto_id", Producto, "nombre")},
+    },
+}
+
+
+class ErrorFila(ValueError):
+    """Una fila que no se puede cargar; se informa y se sigue con la siguiente."""
+
+
+# ----------------------------------------------------
+#   LECTURA Y CONVERSIÓN DE FILAS
+# ----------------------------------------------------
+def leer_archivo(ruta: str):
+    """Genera (número de línea, dict) desde un CSV o un NDJSON."""
+    if ruta.endswith((".ndjson", ".jsonl")):
+        with open(ruta, encoding="utf-8") as f:
+            for numero, linea in enumerate(f, start=1):
+                if linea.strip():
+                    yield numero, json.loads(linea)
+    else:
+        with open(ruta, encoding="utf-8-sig", newline="") as f:
+            # La línea 1 es la cabecera
+            for numero, fila in enumerate(csv.DictReader(f), start=2):
+                yield numero, fila
+
+
+def _convertidor(tipo):
+    if tipo is date:
+        return lambda v: v if isinstance(v, date) else date.fromisoformat(v)
+    if tipo is bool:
+        return lambda v: v if isinstance(v, bool) else str(v).lower() in ("1", "true", "si", "sí")
+    if tipo is object:
+        # AutoString de SQLModel no declara python_type
+        return str
+    return tipo
+
+
+class _Esquema:
+    """Columnas, tipos y valores por defecto de un modelo para convertir filas."""
+
+    def __init__(self, modelo):
+        self.tabla = modelo.__table__
+        self.columnas = [c.name for c in self.tabla.columns]
+        self.convertidores = {
+            c.name: _convertidor(c.type.python_type) for c in self.tabla.columns
+        }
+        self.defaults = {}
+        self.requeridas = []
+        for nombre in self.columnas:
+            campo = modelo.model_fields[nombre]
+            if campo.default_factory is not None:
+                self.defaults[nombre] = campo.default_factory
+            elif campo.default is not PydanticUndefined:
+                self.defaults[nombre] = (lambda valor: lambda: valor)(campo.default)
+            elif nombre != "id":
+                self.requeridas.append(nombre)
+
+    def convertir(self, datos: dict) -> dict:
+        fila = {}
+        for nombre in self.columnas:
+            valor = datos.get(nombre)
+            if valor == "":
+                valor = None
+            if valor is None:
+                if nombre in self.requeridas:
+                    raise ErrorFila(f"Falta el campo obligatorio '{nombre}'")
+                # Ausente o vacía (celda en blanco del CSV): el valor por defecto
+                if nombre in self.defaults:
+                    valor = self.defaults[nombre]()
+            else:
+                try:
+                    valor = self.convertidores[nombre](valor)
+                except (TypeError, ValueError):
+                    raise ErrorFila(f"Valor inválido para '{nombre}': {valor!r}")
+            fila[nombre] = valor
+        if fila.get("id") is None:
+            del fila["id"]
+        return fila
+
+
+# ----------------------------------------------------
+#   RESOLUCIÓN DE CLAVES NATURALES
+# ----------------------------------------------------
+class ResolvedorClaves:
+    """
+    Mapea clave natural -> id con una consulta por modelo, cargada la primera
+    vez que se necesita y actualizada con las filas que se van insertando.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.mapas = {}
+
+    def mapa(self, modelo, campo: str) -> dict:
+        clave = (modelo.__tablename__, campo)
+        if clave not in self.mapas:
+            columna = getattr(modelo, campo)
+            filas = self.conn.execute(
+                select(columna, modelo.id).where(columna.is_not(None))
+            ).all()
+            self.mapas[clave] = {str(valor): id_ for valor, id_ in filas}
+        return self.mapas[clave]
+
+    def resolver(self, modelo, campo: str, valor) -> int:
+        id_ = self.mapa(modelo, campo).get(str(valor))
+        if id_ is None:
+            raise ErrorFila(f"No existe {modelo.__name__} con {campo}={valor!r}")
+        return id_
+
+    def registrar(self, modelo, campo: str, valor, id_: int) -> None:
+        self.mapa(modelo, campo)[str(valor)] = id_
+
+
+def _resolver_referencias(resolvedor, referencias: dict, datos: dict) -> dict:
+    datos = dict(datos)
+    for columna, (columna_id, modelo, campo) in referencias.items():
+        valor = datos.pop(columna, None)
+        if valor in (None, "") or datos.get(columna_id) not in (None, ""):
+            continue
+        datos[columna_id] = resolvedor.resolver(modelo, campo, valor)
+    return datos
+
+
+# ----------------------------------------------------
+#   ESCRITURA POR LOTES
+# ----------------------------------------------------
+def _copy_postgres(conn, tabla, filas: list) -> bool:
+    """
+    COPY ... FROM STDIN con psycopg2 o psycopg 3. Devuelve False si el
+    driver no lo soporta (el llamador usa executemany).
+    """
+    columnas = list(filas[0])
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for fila in filas:
+        escritor.writerow(fila[c] for c in columnas)
+    buffer.seek(0)
+    sentencia = f"COPY {tabla.name} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)"
+
+    crudo = conn.connection.dbapi_connection
+    cursor = crudo.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(sentencia, buffer)
+        elif hasattr(cursor, "copy"):  # psycopg 3
+            with cursor.copy(sentencia) as copia:
+                copia.write(buffer.getvalue())
+        else:
+            return False
+    finally:
+        cursor.close()
+    return True
+
+
+def _insertar(conn, tabla, filas: list, devolver: list = None) -> list:
+    """
+    Inserta las filas agrupadas por conjunto de columnas (con o sin id).
+    Con `devolver` usa RETURNING (en el orden de las filas) y devuelve esas
+    columnas; sin él, en PostgreSQL intenta COPY.
+    """
+    resultado = []
+    grupos = {}
+    for fila in filas:
+        grupos.setdefault(tuple(fila), []).append(fila)
+    for grupo in grupos.values():
+        if devolver:
+            statement = tabla.insert().returning(
+                *(tabla.c[c] for c in devolver), sort_by_parameter_order=True
+            )
+            resultado.extend(conn.execute(statement, grupo).all())
+        elif conn.dialect.name != "postgresql" or not _copy_postgres(conn, tabla, grupo):
+            conn.execute(tabla.insert(), grupo)
+    return resultado
+
+
+class ResultadoCarga:
+    def __init__(self, entidad: str):
+        self.entidad = entidad
+        self.filas = 0
+        self.insertadas = 0
+        self.actualizadas = 0
+        self.omitidas = 0
+        self.errores = []
+        self.total_errores = 0
+        self.inicio = time.perf_counter()
+        self.segundos = 0.0
+
+    def error(self, linea, mensaje: str) -> None:
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES_DETALLADOS:
+            self.errores.append({"linea": linea, "error": mensaje})
+
+    def como_dict(self) -> dict:
+        self.segundos = time.perf_counter() - self.inicio
+        return {
+            "entidad": self.entidad,
+            "filas": self.filas,
+            "insertadas": self.insertadas,
+            "actualizadas": self.actualizadas,
+            "omitidas": self.omitidas,
+            "errores": self.total_errores,
+            "detalle_errores": self.errores,
+            "segundos": round(self.segundos, 2),
+            "filas_por_segundo": round(self.filas / self.segundos, 1) if self.segundos else None,
+        }
+
+
+def _escribir_lote(conn, resolvedor, entidad: str, lote: list, existentes: str, resultado) -> None:
+    """
+    Escribe un lote ya convertido: lista de (línea, fila, detalles anidados).
+    Las filas cuya clave natural ya existe se omiten o actualizan según
+    `existentes` ("omitir" / "actualizar").
+    """
+    config = ENTIDADES[entidad]
+    modelo = config["modelo"]
+    tabla = modelo.__table__
+    clave = config["clave"]
+
+    if clave:
+        mapa = resolvedor.mapa(modelo, clave)
+        nuevas, cambios, vistas = [], [], set()
+        for linea, fila, _ in lote:
+            valor = fila.get(clave)
+            if valor is not None and (str(valor) in mapa or str(valor) in vistas):
+                if existentes == "actualizar" and str(valor) in mapa:
+                    # El stock de un producto existente solo cambia con movimientos
+                    # (ver inventario.py), no se pisa desde un archivo
+                    cambio = {
+                        k: v for k, v in fila.items() if k not in ("id", "stock_disponible")
+                    }
+                    cambios.append({**cambio, "_id": mapa[str(valor)]})
+                else:
+                    resultado.omitidas += 1
+                continue
+            if valor is not None:
+                vistas.add(str(valor))
+            nuevas.append(fila)
+
+        if cambios:
+            columnas = [c for c in cambios[0] if c != "_id"]
+            conn.execute(
+                update(tabla)
+                .where(tabla.c.id == bindparam("_id"))
+                .values({c: bindparam(c) for c in columnas}),
+                cambios,
+            )
+            resultado.actualizadas += len(cambios)
+        if nuevas:
+            for valor, id_ in _insertar(conn, tabla, nuevas, devolver=[clave, "id"]):
+                if valor is not None:
+                    resolvedor.registrar(modelo, clave, valor, id_)
+            resultado.insertadas += len(nuevas)
+        return
+
+    filas = [fila for _, fila, _ in lote]
+    if any(detalles for _, _, detalles in lote):
+        # Operaciones con detalles anidados: se necesitan los ids generados
+        ids = [id_ for (id_,) in _insertar(conn, tabla, filas, devolver=["id"])]
+        detalles = [
+            {**detalle, "operacion_id": id_}
+            for id_, (_, _, anidados) in zip(ids, lote)
+            for detalle in anidados or ()
+        ]
+        if detalles:
+            _insertar(conn, DetalleOperacion.__table__, detalles)
+    else:
+        _insertar(conn, tabla, filas)
+    resultado.insertadas += len(filas)
+
+
+def cargar_filas(
+    engine,
+    entidad: str,
+    filas,
+    lote: int = LOTE_POR_DEFECTO,
+    existentes: str = "omitir",
+    validar=None,
+) -> dict:
+    """
+    Carga un iterable de (línea, dict) en la entidad indicada. Cada lote es
+    una transacción: si falla, se informa el rango de líneas y se continúa.
+    `validar(dict) -> dict` se aplica a cada fila después de resolver las
+    referencias y puede rechazarla lanzando ErrorFila.
+    """
+    if entidad not in ENTIDADES:
+        raise ValueError(f"Entidad desconocida: {entidad}. Opciones: {', '.join(ENTIDADES)}")
+    config = ENTIDADES[entidad]
+    esquema = _Esquema(config["modelo"])
+    esquema_detalle = _Esquema(DetalleOperacion)
+    referencias_detalle = ENTIDADES["detalles_operacion"]["referencias"]
+    resultado = ResultadoCarga(entidad)
+    # Las escrituras van por Connection, sin los eventos de Session de etags.py
+    tablas = {config["modelo"].__tablename__}
+    if entidad == "operaciones":
+        tablas.add(DetalleOperacion.__tablename__)
+
+    with engine.connect() as conn:
+        resolvedor = ResolvedorClaves(conn)
+        pendientes = []
+
+        def volcar():
+            if not pendientes:
+                return
+            try:
+                with conn.begin():
+                    _escribir_lote(conn, resolvedor, entidad, pendientes, existentes, resultado)
+                    etags.incrementar_versiones(conn, tablas)
+            except DBAPIError as exc:
+                # Los ids registrados en el lote fallido ya no son válidos
+                resolvedor.mapas.clear()
+                resultado.error(
+                    f"{pendientes[0][0]}-{pendientes[-1][0]}",
+                    str(getattr(exc, "orig", exc)).splitlines()[0],
+                )
+            pendientes.clear()
+
+        for linea, datos in filas:
+            resultado.filas += 1
+            try:
+                anidados = datos.pop("detalles", None) if entidad == "operaciones" else None
+                datos = _resolver_referencias(resolvedor, config["referencias"], datos)
+                if validar is not None:
+                    datos = validar(datos)
+                fila = esquema.convertir(datos)
+                detalles = [
+                    esquema_detalle.convertir(
+                        _resolver_referencias(
+                            resolvedor, referencias_detalle, {**d, "operacion_id": 0}
+                        )
+                    )
+                    for d in anidados or ()
+                ]
+                if conn.in_transaction():
+                    conn.commit()  # cierra la transacción implícita de las búsquedas
+            except ErrorFila as exc:
+                resultado.error(linea, str(exc))
+                continue
+            pendientes.append((linea, fila, detalles))
+            if len(pendientes) >= lote:
+                volcar()
+        volcar()
+
+    if entidad == "productos":
+        # Los productos nuevos abren su libro de movimientos con el stock cargado
+        with Session(engine) as session:
+            inventario.asegurar_saldos_iniciales(session, motivo="alta_producto")
+            session.commit()
+
+    return resultado.como_dict()
+
+
+# ----------------------------------------------------
+#   PASADA FINAL: STOCK, COSTO TOTAL Y RESÚMENES
+# ----------------------------------------------------
+def ultimo_id_detalle(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.coalesce(func.max(DetalleOperacion.id), 0))).scalar()
+
+
+def _mediodia(columna, dialecto: str):
+    """
+    Expresión SQL con las 12:00 del día de la columna `fecha`: el momento con
+    que se anotan en el libro los movimientos de una operación cargada (igual
+    que en benchmarks/datos_sinteticos.py).
+    """
+    if dialecto == "postgresql":
+        return cast(columna, DateTime) + literal_column("interval '12 hours'")
+    return func.datetime(columna, literal_column("'+12 hours'"), type_=DateTime)
+
+
+def finalizar(engine, desde_detalle_id: int) -> dict:
+    """
+    Aplica los detalles cargados (id > desde_detalle_id) en una pasada:
+    ajusta el stock de cada producto (importación suma, exportación resta)
+    y lo anota en el libro de movimientos con la fecha de su operación (así
+    stock_en da bien el stock histórico), recalcula el costo_total de sus
+    operaciones y reconstruye los resúmenes.
+    """
+    nuevos = DetalleOperacion.id > desde_detalle_id
+    signo = case(
+        (Operacion.tipo == "importacion", 1),
+        (Operacion.tipo == "exportacion", -1),
+        else_=0,
+    )
+    movimiento = (
+        select(func.coalesce(func.sum(DetalleOperacion.cantidad * signo), 0.0))
+        .select_from(DetalleOperacion)
+        .join(Operacion, DetalleOperacion.operacion_id == Operacion.id)
+        .where(DetalleOperacion.producto_id == Producto.id, nuevos)
+        .scalar_subquery()
+    )
+    subtotal = (
+        select(
+            func.coalesce(
+                func.sum(DetalleOperacion.cantidad * DetalleOperacion.precio_unitario), 0.0
+            )
+        )
+        .where(DetalleOperacion.operacion_id == Operacion.id)
+        .scalar_subquery()
+    )
+
+    with Session(engine) as session:
+        dialecto = session.get_bind().dialect.name
+        session.exec(
+            insert(MovimientoStock).from_select(
+                ["producto_id", "cantidad", "motivo", "registrado_en", "operacion_id", "detalle_id"],
+                select(
+                    DetalleOperacion.producto_id,
+                    DetalleOperacion.cantidad * signo,
+                    literal("carga_masiva"),
+                    _mediodia(Operacion.fecha, dialecto),
+                    DetalleOperacion.operacion_id,
+                    DetalleOperacion.id,
+                )
+                .join(Operacion, DetalleOperacion.operacion_id == Operacion.id)
+                .where(nuevos, signo != 0)
+                .order_by(DetalleOperacion.id),
+            )
+        )
+        productos = session.exec(
+            update(Producto)
+            .where(Producto.id.in_(select(DetalleOperacion.producto_id).where(nuevos)))
+            .values(stock_disponible=Producto.stock_disponible + movimiento)
+        ).rowcount
+        operaciones = session.exec(
+            update(Operacion)
+            .where(Operacion.id.in_(select(DetalleOperacion.operacion_id).where(nuevos)))
+            .values(costo_total=subtotal)
+        ).rowcount
+        negativos = session.exec(
+            select(func.count()).where(Producto.stock_disponible < 0)
+        ).one()
+        resumenes.reconstruir_resumenes(session)
+        _ajustar_secuencias(session)
+        session.commit()
+
+    return {
+        "productos_con_stock_ajustado": productos,
+        "operaciones_con_costo_recalculado": operaciones,
+        "productos_con_stock_negativo": negativos,
+    }
+
+
+def _ajustar_secuencias(session: Session) -> None:
+    """En PostgreSQL, las filas cargadas con id explícito no avanzan la secuencia."""
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    for config in ENTIDADES.values():
+        tabla = config["modelo"].__tablename__
+        if session.exec(select(exists().select_from(config["modelo"]))).one():
+            session.connection().execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+                    f"(SELECT max(id) FROM {tabla}))"
+                )
+            )
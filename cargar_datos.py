@@ -0,0 +1,84 @@
+"""
+Carga masiva de datos históricos desde archivos CSV o NDJSON.
+
+Crea las tablas (como crear_tablas.py) y carga cada archivo en la entidad
+que indica su nombre (paises.csv, productos.csv, operaciones.ndjson, ...)
+o la indicada con archivo:entidad. Los archivos se procesan en orden de
+dependencias y al final se ajustan stock, costo_total y resúmenes.
+
+Uso:
+    python cargar_datos.py datos/paises.csv datos/productos.csv datos/operaciones.ndjson
+    python cargar_datos.py historico_2024.csv:detalles_operacion --lote 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from database import engine, init_db
+from carga_masiva import ENTIDADES, LOTE_POR_DEFECTO, cargar_filas, finalizar, leer_archivo, ultimo_id_detalle
+
+
+def entidad_de(argumento: str):
+    if ":" in argumento and argumento.rsplit(":", 1)[1] in ENTIDADES:
+        return argumento.rsplit(":", 1)
+    nombre = os.path.basename(argumento).split(".")[0]
+    if nombre not in ENTIDADES:
+        raise SystemExit(
+            f"No se reconoce la entidad de '{argumento}'. Use archivo:entidad con una de: "
+            + ", ".join(ENTIDADES)
+        )
+    return argumento, nombre
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("archivos", nargs="*", help="Archivos .csv / .ndjson (archivo[:entidad])")
+    parser.add_argument("--lote", type=int, default=LOTE_POR_DEFECTO, help="Filas por transacción")
+    parser.add_argument(
+        "--existentes",
+        choices=["omitir", "actualizar"],
+        default="omitir",
+        help="Qué hacer con catálogos cuya clave natural ya existe",
+    )
+    args = parser.parse_args()
+
+    print("Creando tablas...")
+    init_db()
+    if not args.archivos:
+        print("Tablas creadas correctamente ✔")
+        return 0
+
+    archivos = sorted(
+        (entidad_de(a) for a in args.archivos), key=lambda par: list(ENTIDADES).index(par[1])
+    )
+    desde_detalle_id = ultimo_id_detalle(engine)
+    inicio = time.perf_counter()
+    total_filas = 0
+    con_errores = False
+
+    for ruta, entidad in archivos:
+        resultado = cargar_filas(
+            engine, entidad, leer_archivo(ruta), lote=args.lote, existentes=args.existentes
+        )
+        total_filas += resultado["filas"]
+        con_errores = con_errores or resultado["errores"] > 0
+        print(
+            f"{entidad:22s} {resultado['insertadas']:>9} insertadas "
+            f"{resultado['actualizadas']:>7} actualizadas {resultado['omitidas']:>7} omitidas "
+            f"{resultado['errores']:>6} errores  {resultado['filas_por_segundo'] or 0:>10.0f} filas/s"
+        )
+        for error in resultado["detalle_errores"][:20]:
+            print(f"    {ruta}:{error['linea']}: {error['error']}")
+
+    print("Ajustando stock, costo_total y resúmenes...")
+    print(json.dumps(finalizar(engine, desde_detalle_id), ensure_ascii=False))
+
+    segundos = time.perf_counter() - inicio
+    print(f"{total_filas} filas en {segundos:.1f} s ({total_filas / segundos:.0f} filas/s) ✔")
+    return 1 if con_errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,8 @@ import os
 from sqlmodel import SQLModel, create_engine, Session
 from dotenv import load_dotenv   # <-- NUEVO
 
+from perfiles_db import obtener_perfil, opciones_motor, configurar_motor, perfil_trabajos
+
 # 1. Cargar variables de entorno desde .env
 load_dotenv()  # busca un archivo .env en la raíz del proyecto
 
@@ -15,17 +17,100 @@ if DATABASE_URL.startswith("postgresql://") and "sslmode" not in DATABASE_URL:
     separator = "&" if "?" in DATABASE_URL else "?"
     DATABASE_URL += f"{separator}sslmode=require"
 
-# 4. Crear motor de conexión
-engine = create_engine(
-    DATABASE_URL,
-    echo=True  # Muestra logs de SQL en la consola
+# 4. Crear motor de conexión según el perfil (dev / prod / bench), ver perfiles_db.py.
+#    Por defecto prod (solo consultas lentas en el log); en local, DB_PERFIL=dev
+#    registra todo el SQL
+DB_PERFIL = os.getenv("DB_PERFIL", "prod")
+perfil = obtener_perfil(DB_PERFIL)
+
+engine = create_engine(DATABASE_URL, **opciones_motor(DATABASE_URL, perfil))
+configurar_motor(engine, perfil)
+
+# 4.1 Motor de los trabajos en segundo plano (trabajos.py): las consultas de
+#     reportes y exportaciones grandes tardan más que el statement_timeout de
+#     las peticiones, así que usan sus propias conexiones con el límite
+#     statement_timeout_trabajos_ms del perfil
+engine_trabajos = create_engine(
+    DATABASE_URL, **opciones_motor(DATABASE_URL, perfil_trabajos(perfil))
 )
+configurar_motor(engine_trabajos, perfil)
 
 # 5. Dependencia para obtener la sesión
 def get_session():
     with Session(engine) as session:
         yield session
 
-# 6. Inicialización de tablas
+
+# 5.1 Modo asíncrono (opcional): DB_MODO=async
+#     Usa aiosqlite en local y asyncpg en producción. Los routers se
+#     adaptan con asincrono.version_async() al incluirlos en main.py.
+DB_MODO = os.getenv("DB_MODO", "sync")
+
+
+def _url_async(url: str) -> str:
+    if url.startswith("sqlite:///"):
+        return "sqlite+aiosqlite:///" + url[len("sqlite:///"):]
+    if url.startswith("postgresql://"):
+        # asyncpg no entiende sslmode; su equivalente es ssl
+        url = url.replace("sslmode=", "ssl=")
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _url_async(DATABASE_URL))
+
+async_engine = None
+if DB_MODO == "async":
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **opciones_motor(ASYNC_DATABASE_URL, perfil)
+    )
+    configurar_motor(async_engine.sync_engine, perfil)
+
+
+async def get_async_session():
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    async with AsyncSession(async_engine) as session:
+        yield session
+
+# 6. Inicialización de tablas e índices
 def init_db():
     SQLModel.metadata.create_all(engine)
+    asegurar_indices()
+    asegurar_libro_stock()
+    asegurar_resumenes()
+
+
+def asegurar_indices():
+    # create_all no agrega índices nuevos a tablas que ya existen,
+    # así que se crean uno por uno si faltan (sin borrar nada)
+    with engine.begin() as conn:
+        for tabla in SQLModel.metadata.sorted_tables:
+            for indice in tabla.indexes:
+                indice.create(conn, checkfirst=True)
+
+
+def asegurar_libro_stock():
+    # Los productos anteriores al libro de movimientos lo abren con su stock actual
+    import inventario
+
+    with Session(engine) as session:
+        inventario.asegurar_saldos_iniciales(session)
+        session.commit()
+
+
+def asegurar_resumenes():
+    # Las tablas de resumen nuevas (o de una base cargada a mano) arrancan
+    # reconstruidas desde operacion y detalleoperacion
+    import resumenes
+
+    with Session(engine) as session:
+        resumenes.asegurar_resumenes(session)
+        session.commit()
+
+
+# 7. Versiones por tabla para los ETags: importar etags registra los eventos
+#    de Session que las incrementan, también en los scripts que no usan la API
+import etags  # noqa: E402,F401
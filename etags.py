@@ -0,0 +1,181 @@
+# etags.py
+"""
+ETags y GET condicionales (If-None-Match -> 304 Not Modified).
+
+Cada tabla tiene un contador de versión repartido en FRAGMENTOS filas
+(VersionFragmento); la versión es su suma. Los eventos de Session anotan qué
+tablas tocó la transacción (flush del ORM y UPDATE / DELETE / INSERT
+ejecutados con session.exec) y, justo antes del commit, suman 1 en un
+fragmento al azar de cada una, en la misma transacción: la versión nueva se
+ve exactamente cuando se ven los datos nuevos. En PostgreSQL esa fila queda
+bloqueada hasta el commit; con fragmentos, dos escritores de la misma tabla
+solo se esperan si les toca el mismo (1 de FRAGMENTOS veces), en lugar de
+hacer fila siempre. Las escrituras con Connection directa (carga_masiva.py)
+llaman a incrementar_versiones ellas mismas.
+
+El ETag de un GET combina las versiones de las tablas que lee con la URL
+completa (ruta + query), así sirve tanto para listados como para una fila.
+Comprobarlo cuesta una consulta por clave primaria en versionfragmento con
+la misma sesión del endpoint (AsyncSession con DB_MODO=async, sin pasar por
+el threadpool): si el cliente ya tiene esa versión se responde 304 sin
+consultar ni serializar filas.
+"""
+import hashlib
+import random
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select, update, func
+
+from database import DB_MODO, get_async_session, get_session
+from expansion import nombres_pedidos
+from models import VersionFragmento
+
+_CLAVE_SESION = "tablas_modificadas"
+
+# Filas por tabla del contador de versión
+FRAGMENTOS = 16
+
+
+def incrementar_versiones(conn, tablas) -> None:
+    """
+    Suma 1 a la versión de cada tabla, en un fragmento al azar, con un solo
+    UPDATE (menos tiempo con el lock de escritura). Los fragmentos que
+    todavía no tienen fila se crean.
+    """
+    tablas = sorted(tablas)
+    fragmento = random.randrange(FRAGMENTOS)
+    tabla = VersionFragmento.__table__
+    filas = (tabla.c.tabla.in_(tablas), tabla.c.fragmento == fragmento)
+    actualizadas = conn.execute(
+        update(tabla).where(*filas).values(version=tabla.c.version + 1)
+    ).rowcount
+    if actualizadas == len(tablas):
+        return
+    insert_dialecto = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    existentes = set(conn.execute(select(tabla.c.tabla).where(*filas)).scalars())
+    for nombre in tablas:
+        if nombre not in existentes:
+            # Si otra transacción la creó mientras tanto, se suma igual
+            conn.execute(
+                insert_dialecto(tabla)
+                .values(tabla=nombre, fragmento=fragmento, version=1)
+                .on_conflict_do_update(
+                    index_elements=["tabla", "fragmento"],
+                    set_={"version": tabla.c.version + 1},
+                )
+            )
+
+
+def _anotar(session: Session, nombre: str) -> None:
+    if nombre != VersionFragmento.__tablename__:
+        session.info.setdefault(_CLAVE_SESION, set()).add(nombre)
+
+
+@event.listens_for(Session, "after_flush")
+def _anotar_flush(session, flush_context):
+    for objeto in (*session.new, *session.dirty, *session.deleted):
+        nombre = getattr(type(objeto), "__tablename__", None)
+        if nombre:
+            _anotar(session, nombre)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _anotar_sentencia(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        _anotar(orm_execute_state.session, orm_execute_state.statement.table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def _incrementar_al_confirmar(session):
+    session.flush()
+    tablas = session.info.pop(_CLAVE_SESION, None)
+    if tablas:
+        incrementar_versiones(session.connection(), tablas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session):
+    session.info.pop(_CLAVE_SESION, None)
+
+
+def _consulta_versiones(tablas: list):
+    return (
+        select(VersionFragmento.tabla, func.sum(VersionFragmento.version))
+        .where(VersionFragmento.tabla.in_(tablas))
+        .group_by(VersionFragmento.tabla)
+    )
+
+
+def _coincide(if_none_match: str, etag: str) -> bool:
+    # Comparación débil: se ignora el prefijo W/
+    candidatos = {c.strip().removeprefix("W/") for c in if_none_match.split(",")}
+    return "*" in candidatos or etag.removeprefix("W/") in candidatos
+
+
+def etag(*modelos, expansiones: Optional[dict] = None):
+    """
+    Dependencia para un GET que lee de `modelos`: agrega ETag y
+    Cache-Control: no-cache (el navegador guarda la respuesta y revalida),
+    y corta con 304 si If-None-Match ya coincide.
+
+        @router.get("/", dependencies=[Depends(etag(Producto))])
+
+    Con `expansiones` (ver expansion.py) también cuentan las tablas de las
+    relaciones pedidas en ?expand=, y solo esas.
+
+    El valor queda en request.state.etag: identifica la respuesta, así que
+    sirve de clave para un cache del lado del servidor (ver /reportes/dashboard).
+    """
+    propias = {m.__tablename__ for m in modelos}
+
+    def tablas_de(request: Request) -> list:
+        tablas = set(propias)
+        if expansiones:
+            for nombre in nombres_pedidos(request.query_params.get("expand")):
+                if nombre in expansiones:
+                    tablas.add(expansiones[nombre].modelo.__tablename__)
+        return sorted(tablas)
+
+    def responder(request: Request, response: Response, tablas: list, versiones: dict) -> None:
+        firma = ";".join(f"{t}={versiones.get(t, 0)}" for t in tablas)
+        # El nombre de la tabla de versiones entra en el hash: los ETags de un
+        # contador anterior no coinciden por casualidad con los de este
+        resumen = hashlib.sha1(
+            f"{VersionFragmento.__tablename__}|{firma}|{request.url.path}?{request.url.query}".encode()
+        )
+        valor = f'W/"{resumen.hexdigest()[:20]}"'
+        cabeceras = {"ETag": valor, "Cache-Control": "no-cache"}
+        request.state.etag = valor
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _coincide(if_none_match, valor):
+            raise HTTPException(status_code=304, headers=cabeceras)
+        response.headers.update(cabeceras)
+
+    # La sesión es la misma dependencia que usa el endpoint: FastAPI la
+    # resuelve una sola vez por petición, así el ETag no ocupa otra conexión
+    if DB_MODO == "async":
+        from sqlmodel.ext.asyncio.session import AsyncSession
+
+        async def verificar_etag(
+            request: Request,
+            response: Response,
+            session: AsyncSession = Depends(get_async_session),
+        ) -> None:
+            tablas = tablas_de(request)
+            versiones = dict((await session.exec(_consulta_versiones(tablas))).all())
+            responder(request, response, tablas, versiones)
+
+    else:
+
+        def verificar_etag(
+            request: Request, response: Response, session: Session = Depends(get_session)
+        ) -> None:
+            tablas = tablas_de(request)
+            versiones = dict(session.exec(_consulta_versiones(tablas)).all())
+            responder(request, response, tablas, versiones)
+
+    return verificar_etag
@@ -0,0 +1,103 @@
+# expansion.py
+"""
+Parámetro ?expand= de los listados: agrega a cada fila los registros
+relacionados que se pidan (cliente, producto, puerto_origen, ...), listos
+para mostrar, sin que el frontend tenga que bajar los catálogos completos.
+
+Se resuelve como un select-in sobre la página ya leída: una consulta por
+tabla relacionada con los ids de la página (WHERE id IN (...)), así que el
+total de consultas no depende de cuántas filas tenga la página. Dos
+relaciones a la misma tabla (pais_origen y pais_destino) comparten la consulta.
+Igual que paginar(), se leen solo las columnas del schema y como tuplas, y
+los campos del schema que no son columnas (PaisRead.region, por ejemplo) se
+agregan con su default: un registro expandido tiene la misma forma que en su
+propio endpoint.
+"""
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, Query
+from sqlalchemy import inspect
+from sqlalchemy.orm import MANYTOONE
+from sqlmodel import Session, select
+
+from paginacion import columnas_de, defaults_fuera_de_columnas
+
+
+class Relacion(NamedTuple):
+    columna: str  # clave foránea en el modelo del listado
+    modelo: type
+    schema: type
+
+
+def relaciones(modelo, **schemas) -> dict:
+    """
+    Describe las relaciones expandibles de `modelo` a partir de sus
+    Relationship (solo muchos-a-uno), con el schema de lectura de cada una:
+
+        relaciones(DetalleOperacion, producto=ProductoRead, operacion=OperacionRead)
+    """
+    mapper = inspect(modelo)
+    resultado = {}
+    for nombre, schema in schemas.items():
+        relacion = mapper.relationships[nombre]
+        if relacion.direction is not MANYTOONE:
+            raise ValueError(f"{modelo.__name__}.{nombre} no es una relación muchos-a-uno")
+        ((local, _),) = relacion.local_remote_pairs
+        resultado[nombre] = Relacion(local.key, relacion.mapper.class_, schema)
+    return resultado
+
+
+def nombres_pedidos(expand: Optional[str]) -> list:
+    """'cliente, puerto_origen,,cliente' -> ['cliente', 'puerto_origen']"""
+    if not expand:
+        return []
+    return list(dict.fromkeys(n.strip() for n in expand.split(",") if n.strip()))
+
+
+def parametro_expand(disponibles: dict):
+    """Dependencia que lee ?expand= y rechaza con 400 las relaciones que no existen."""
+    opciones = ", ".join(disponibles)
+
+    def leer_expand(
+        expand: Optional[str] = Query(
+            default=None, description=f"Relaciones a incluir, separadas por coma: {opciones}"
+        ),
+    ) -> list:
+        nombres = nombres_pedidos(expand)
+        desconocidas = [n for n in nombres if n not in disponibles]
+        if desconocidas:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No se puede expandir {', '.join(desconocidas)}. Opciones: {opciones}.",
+            )
+        return nombres
+
+    return leer_expand
+
+
+def expandir(session: Session, pagina: dict, disponibles: dict, nombres: list) -> dict:
+    """
+    Agrega a cada item de la página (dicts de paginar) las relaciones
+    `nombres`; la que no tiene valor queda en None. Modifica y devuelve la página.
+    """
+    items = pagina["items"]
+    por_modelo = {}
+    for nombre in nombres:
+        relacion = disponibles[nombre]
+        por_modelo.setdefault(relacion.modelo, []).append((nombre, relacion))
+
+    for modelo, pedidas in por_modelo.items():
+        ids = {item[relacion.columna] for _, relacion in pedidas for item in items} - {None}
+        filas = {}
+        if ids:
+            schema = pedidas[0][1].schema
+            resultado = session.execute(
+                select(*columnas_de(modelo, schema)).where(modelo.id.in_(ids))
+            )
+            claves = list(resultado.keys())
+            defaults = defaults_fuera_de_columnas(schema, claves)
+            filas = {fila.id: {**defaults, **dict(zip(claves, fila))} for fila in resultado}
+        for nombre, relacion in pedidas:
+            for item in items:
+                item[nombre] = filas.get(item[relacion.columna])
+    return pagina
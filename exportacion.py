@@ -0,0 +1,119 @@
+# exportacion.py
+"""
+Exportación en streaming (CSV / NDJSON) de consultas grandes.
+
+La respuesta se genera mientras se lee: un cursor del lado del servidor
+(stream_results) entrega filas en lotes de LOTE_EXPORTACION y cada lote se
+serializa y se envía antes de pedir el siguiente. La memoria usada no
+depende del tamaño de la exportación.
+
+El generador abre su propia conexión porque se ejecuta después de que el
+endpoint retornó (y de que la sesión de la petición se cerró).
+
+escribir_exportacion genera el mismo contenido en un archivo (lo usan los
+trabajos en segundo plano, ver trabajos.py).
+"""
+import csv
+import io
+import json
+import os
+import tempfile
+from typing import Callable, Literal, Optional
+
+from fastapi.responses import StreamingResponse
+
+from database import engine
+
+LOTE_EXPORTACION = 2000
+
+FormatoExportacion = Literal["csv", "ndjson"]
+
+TIPOS_CONTENIDO = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _lotes(statement, motor=engine):
+    with motor.connect() as conn:
+        resultado = conn.execution_options(
+            stream_results=True, yield_per=LOTE_EXPORTACION
+        ).execute(statement)
+        for lote in resultado.partitions():
+            yield lote
+
+
+def _generar_csv(lotes, columnas: list):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    for lote in lotes:
+        escritor.writerows(lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _generar_ndjson(lotes, columnas: list):
+    for lote in lotes:
+        yield "".join(
+            json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=str) + "\n"
+            for fila in lote
+        )
+
+
+def respuesta_exportacion(statement, formato: str, nombre: str) -> StreamingResponse:
+    """
+    StreamingResponse con las filas de `statement` (un select de columnas
+    etiquetadas). Las columnas del archivo son las etiquetas del select.
+    """
+    columnas = [c.name for c in statement.selected_columns]
+    generador = _generar_csv if formato == "csv" else _generar_ndjson
+    return StreamingResponse(
+        generador(_lotes(statement), columnas),
+        media_type=TIPOS_CONTENIDO[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'},
+    )
+
+
+def escribir_exportacion(
+    statement,
+    formato: str,
+    ruta: str,
+    avance: Optional[Callable[[int], None]] = None,
+    motor=engine,
+) -> int:
+    """
+    Escribe la exportación en `ruta` y devuelve cuántas filas tiene. Se
+    escribe en un archivo temporal que se renombra al terminar, así nunca
+    queda a la vista un archivo a medias. El temporal es propio de cada
+    llamada (<ruta>.<azar>.parcial), así dos ejecuciones del mismo trabajo
+    no se pisan. `avance(filas)` se llama por lote. `motor` es el engine con
+    el que se lee (los trabajos usan engine_trabajos).
+    """
+    columnas = [c.name for c in statement.selected_columns]
+    generador = _generar_csv if formato == "csv" else _generar_ndjson
+    filas = 0
+
+    def contar(lotes):
+        nonlocal filas
+        for lote in lotes:
+            yield lote
+            filas += len(lote)
+            if avance is not None:
+                avance(filas)
+
+    descriptor, parcial = tempfile.mkstemp(
+        prefix=os.path.basename(ruta) + ".", suffix=".parcial", dir=os.path.dirname(ruta) or None
+    )
+    try:
+        with open(descriptor, "w", encoding="utf-8", newline="") as archivo:
+            for fragmento in generador(contar(_lotes(statement, motor)), columnas):
+                archivo.write(fragmento)
+        os.replace(parcial, ruta)
+    except BaseException:
+        os.remove(parcial)
+        raise
+    return filas
@@ -8,12 +8,26 @@ const form = document.getElementById("categoriaForm");
 let categorias = [];
 let editandoId = null;
 
+// Pide todas las páginas del listado (limit=1000, el máximo) hasta que
+// next_after_id es null: la tabla y la búsqueda trabajan sobre el catálogo entero.
+async function pedirTodas(url) {
+    const filas = [];
+    let despues = null;
+    do {
+        const cursor = despues === null ? "" : `&after_id=${despues}`;
+        const resp = await fetch(`${url}?limit=1000${cursor}`);
+        const pagina = await resp.json();
+        filas.push(...pagina.items);
+        despues = pagina.next_after_id;
+    } while (despues !== null);
+    return filas;
+}
+
 // ===============================
 // Cargar categorías
 // ===============================
 async function cargarCategorias() {
-    const resp = await fetch(`${API_BASE}/categorias/`);
-    categorias = await resp.json();
+    categorias = await pedirTodas(`${API_BASE}/categorias/`);
     mostrarCategorias(categorias);
 }
 
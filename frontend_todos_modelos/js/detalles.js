@@ -5,10 +5,12 @@ const API_BASE = "https://proyecto-importacion-2.onrender.com/paises.html";
 
 const detallesBody = document.getElementById("detallesBody");
 const buscarInput = document.getElementById("buscar");
+const cargarMasBtn = document.getElementById("cargarMasBtn");
 const form = document.getElementById("detalleForm");
 const limpiarBtn = document.getElementById("limpiarBtn");
 
 let detalles = [];
+let siguienteId = null; // next_after_id de la última página pedida
 let editandoId = null;
 
 function avisar(msg) {
@@ -19,11 +21,24 @@ function avisar(msg) {
 // Cargar detalles
 // ===============================
 async function cargarDetalles() {
+    detalles = [];
+    siguienteId = null;
+    await cargarPagina();
+}
+
+// La API devuelve una página por vez; next_after_id es el cursor de la siguiente
+// (null cuando no hay más). "Cargar más" agrega esa página a la tabla.
+async function cargarPagina() {
     try {
-        const resp = await fetch(`${API_BASE}/detalles/`);
+        const cursor = siguienteId === null ? "" : `&after_id=${siguienteId}`;
+        const resp = await fetch(`${API_BASE}/detalles/?expand=producto${cursor}`);
         if (!resp.ok) throw new Error("Error al cargar detalles");
-        detalles = await resp.json();
-        renderDetalles(detalles);
+        const pagina = await resp.json();
+        detalles.push(...pagina.items);
+        siguienteId = pagina.next_after_id;
+        cargarMasBtn.style.display = siguienteId === null ? "none" : "";
+        // Repite la búsqueda escrita sobre las filas ya cargadas
+        buscarInput.dispatchEvent(new Event("input"));
     } catch (err) {
         console.error(err);
         avisar("No se pudieron cargar los detalles.");
@@ -50,7 +65,7 @@ function renderDetalles(lista) {
         tr.innerHTML = `
             <td>${det.id}</td>
             <td>${det.operacion_id}</td>
-            <td>${det.producto_id}</td>
+            <td>${det.producto?.nombre ?? det.producto_id}</td>
             <td>${det.cantidad}</td>
             <td>${det.precio_unitario}</td>
             <td>${subtotal.toFixed(2)}</td>
@@ -195,7 +210,7 @@ buscarInput.addEventListener("input", () => {
     const filtrados = detalles.filter((d) => {
         const idStr = String(d.id);
         const operacionStr = String(d.operacion_id ?? "");
-        const productoStr = String(d.producto_id ?? "");
+        const productoStr = String(d.producto?.nombre ?? d.producto_id ?? "").toLowerCase();
         return (
             idStr.includes(texto) ||
             operacionStr.includes(texto) ||
@@ -218,6 +233,7 @@ limpiarBtn.addEventListener("click", () => {
 // Iniciar
 // ===============================
 document.addEventListener("DOMContentLoaded", cargarDetalles);
+cargarMasBtn.addEventListener("click", cargarPagina);
 
 // Exponer funciones para los botones
 window.editarDetalle = editarDetalle;
@@ -4,10 +4,12 @@ const API_BASE = "https://proyecto-importacion-2.onrender.com/paises.html";
 
 const inspeccionesBody = document.getElementById("inspeccionesBody");
 const buscarInput = document.getElementById("buscar");
+const cargarMasBtn = document.getElementById("cargarMasBtn");
 const form = document.getElementById("inspeccionForm");
 const limpiarBtn = document.getElementById("limpiarBtn");
 
 let inspecciones = [];
+let siguienteId = null; // next_after_id de la última página pedida
 let editandoId = null;
 
 function alertar(mensaje) {
@@ -18,11 +20,24 @@ function alertar(mensaje) {
 // Cargar inspecciones
 // ===============================
 async function cargarInspecciones() {
+    inspecciones = [];
+    siguienteId = null;
+    await cargarPagina();
+}
+
+// La API devuelve una página por vez; next_after_id es el cursor de la siguiente
+// (null cuando no hay más). "Cargar más" agrega esa página a la tabla.
+async function cargarPagina() {
     try {
-        const resp = await fetch(`${API_BASE}/inspecciones/`);
+        const cursor = siguienteId === null ? "" : `&after_id=${siguienteId}`;
+        const resp = await fetch(`${API_BASE}/inspecciones/?expand=producto${cursor}`);
         if (!resp.ok) throw new Error("Error al cargar inspecciones");
-        inspecciones = await resp.json();
-        renderInspecciones(inspecciones);
+        const pagina = await resp.json();
+        inspecciones.push(...pagina.items);
+        siguienteId = pagina.next_after_id;
+        cargarMasBtn.style.display = siguienteId === null ? "none" : "";
+        // Repite la búsqueda escrita sobre las filas ya cargadas
+        buscarInput.dispatchEvent(new Event("input"));
     } catch (err) {
         console.error(err);
         alertar("No se pudieron cargar las inspecciones.");
@@ -61,7 +76,7 @@ function renderInspecciones(lista) {
                 </span>
             </td>
             <td>${ins.operacion_id}</td>
-            <td>${ins.producto_id ?? "-"}</td>
+            <td>${ins.producto?.nombre ?? "-"}</td>
             <td>${ins.observaciones ?? ""}</td>
             <td>
                 <button class="btn btn-secondary btn-sm" onclick="editarInspeccion(${ins.id})">
@@ -209,6 +224,7 @@ limpiarBtn.addEventListener("click", () => {
 // Iniciar
 // ===============================
 document.addEventListener("DOMContentLoaded", cargarInspecciones);
+cargarMasBtn.addEventListener("click", cargarPagina);
 
 // Exponer funciones al ámbito global
 window.editarInspeccion = editarInspeccion;
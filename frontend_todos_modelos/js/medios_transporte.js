@@ -11,14 +11,28 @@ const limpiarBtn = document.getElementById("limpiarBtn");
 let medios = [];
 let editandoId = null;
 
+// Pide todas las páginas del listado (limit=1000, el máximo) hasta que
+// next_after_id es null: la tabla y la búsqueda trabajan sobre el catálogo entero.
+async function pedirTodas(url) {
+    const filas = [];
+    let despues = null;
+    do {
+        const cursor = despues === null ? "" : `&after_id=${despues}`;
+        const resp = await fetch(`${url}?limit=1000${cursor}`);
+        if (!resp.ok) throw new Error("Error al cargar medios de transporte");
+        const pagina = await resp.json();
+        filas.push(...pagina.items);
+        despues = pagina.next_after_id;
+    } while (despues !== null);
+    return filas;
+}
+
 // ===============================
 // Cargar medios de transporte
 // ===============================
 async function cargarMedios() {
     try {
-        const resp = await fetch(`${API_BASE}/medios-transporte/`);
-        if (!resp.ok) throw new Error("Error al cargar medios de transporte");
-        medios = await resp.json();
+        medios = await pedirTodas(`${API_BASE}/medios-transporte/`);
         mostrarMedios(medios);
     } catch (err) {
         console.error(err);
@@ -5,10 +5,16 @@ const API_BASE = "https://proyecto-importacion-2.onrender.com/paises.html";
 
 const operacionesBody = document.getElementById("operacionesBody");
 const buscarInput = document.getElementById("buscar");
+const cargarMasBtn = document.getElementById("cargarMasBtn");
 const form = document.getElementById("operacionForm");
 const limpiarBtn = document.getElementById("limpiarBtn");
 
 let operaciones = [];
+let siguienteId = null; // next_after_id de la última página pedida
+
+// Relaciones que la API devuelve ya resueltas en cada fila (?expand=)
+const EXPANDIR =
+    "cliente,proveedor,pais_origen,pais_destino,puerto_origen,puerto_destino,medio_transporte";
 
 // ===============================
 // Utilidad para mostrar mensajes
@@ -21,11 +27,24 @@ function alerta(msg) {
 // Cargar operaciones
 // ===============================
 async function cargarOperaciones() {
+    operaciones = [];
+    siguienteId = null;
+    await cargarPagina();
+}
+
+// La API devuelve una página por vez; next_after_id es el cursor de la siguiente
+// (null cuando no hay más). "Cargar más" agrega esa página a la tabla.
+async function cargarPagina() {
     try {
-        const resp = await fetch(`${API_BASE}/operaciones/`);
+        const cursor = siguienteId === null ? "" : `&after_id=${siguienteId}`;
+        const resp = await fetch(`${API_BASE}/operaciones/?expand=${EXPANDIR}${cursor}`);
         if (!resp.ok) throw new Error("Error al cargar operaciones");
-        operaciones = await resp.json();
-        renderOperaciones(operaciones);
+        const pagina = await resp.json();
+        operaciones.push(...pagina.items);
+        siguienteId = pagina.next_after_id;
+        cargarMasBtn.style.display = siguienteId === null ? "none" : "";
+        // Repite la búsqueda escrita sobre las filas ya cargadas
+        buscarInput.dispatchEvent(new Event("input"));
     } catch (err) {
         console.error(err);
         alerta("No se pudieron cargar las operaciones.");
@@ -67,11 +86,11 @@ function renderOperaciones(lista) {
                     ${op.estado}
                 </span>
             </td>
-            <td>${op.cliente_id ?? "-"}</td>
-            <td>${op.proveedor_id ?? "-"}</td>
-            <td>${op.pais_origen_id ?? "-"} / ${op.puerto_origen_id ?? "-"}</td>
-            <td>${op.pais_destino_id ?? "-"} / ${op.puerto_destino_id ?? "-"}</td>
-            <td>${op.medio_transporte_id ?? "-"}</td>
+            <td>${op.cliente?.nombre ?? "-"}</td>
+            <td>${op.proveedor?.nombre ?? "-"}</td>
+            <td>${op.pais_origen?.nombre ?? "-"} / ${op.puerto_origen?.nombre ?? "-"}</td>
+            <td>${op.pais_destino?.nombre ?? "-"} / ${op.puerto_destino?.nombre ?? "-"}</td>
+            <td>${op.medio_transporte?.empresa ?? "-"}</td>
             <td>${op.costo_total ?? 0}</td>
             <td>
                 <button class="btn btn-danger btn-sm" onclick="eliminarOperacion(${op.id})">
@@ -192,10 +211,12 @@ buscarInput.addEventListener("input", () => {
         const idStr = String(op.id);
         const tipo = op.tipo?.toLowerCase() ?? "";
         const estado = op.estado?.toLowerCase() ?? "";
+        const contraparte = (op.cliente?.nombre ?? op.proveedor?.nombre ?? "").toLowerCase();
         return (
             idStr.includes(texto) ||
             tipo.includes(texto) ||
-            estado.includes(texto)
+            estado.includes(texto) ||
+            contraparte.includes(texto)
         );
     });
 
@@ -214,6 +235,7 @@ limpiarBtn.addEventListener("click", () => {
 // Iniciar
 // ===============================
 document.addEventListener("DOMContentLoaded", cargarOperaciones);
+cargarMasBtn.addEventListener("click", cargarPagina);
 
 // Exponer eliminar en window para usarlo en botones
 window.eliminarOperacion = eliminarOperacion;
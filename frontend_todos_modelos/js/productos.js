@@ -8,6 +8,22 @@ const searchInput = document.getElementById("searchInput");
 
 let productos = [];
 
+// Pide todas las páginas del listado (limit=1000, el máximo) hasta que
+// next_after_id es null: la tabla y la búsqueda trabajan sobre el catálogo entero.
+async function pedirTodas(url) {
+    const filas = [];
+    let despues = null;
+    do {
+        const cursor = despues === null ? "" : `&after_id=${despues}`;
+        const resp = await fetch(`${url}?limit=1000${cursor}`);
+        if (!resp.ok) throw new Error("Error al cargar productos");
+        const pagina = await resp.json();
+        filas.push(...pagina.items);
+        despues = pagina.next_after_id;
+    } while (despues !== null);
+    return filas;
+}
+
 // -------------------- UTILIDADES --------------------
 function mostrarAlerta(mensaje) {
     alert(mensaje);
@@ -16,9 +32,7 @@ function mostrarAlerta(mensaje) {
 // -------------------- CARGAR PRODUCTOS --------------------
 async function cargarProductos() {
     try {
-        const resp = await fetch(`${API_BASE}/productos/`);
-        if (!resp.ok) throw new Error("Error al cargar productos");
-        productos = await resp.json();
+        productos = await pedirTodas(`${API_BASE}/productos/`);
         renderTabla(productos);
     } catch (err) {
         console.error(err);
@@ -11,14 +11,28 @@ const limpiarBtn = document.getElementById("limpiarBtn");
 let proveedores = [];
 let editandoId = null;
 
+// Pide todas las páginas del listado (limit=1000, el máximo) hasta que
+// next_after_id es null: la tabla y la búsqueda trabajan sobre el catálogo entero.
+async function pedirTodas(url) {
+    const filas = [];
+    let despues = null;
+    do {
+        const cursor = despues === null ? "" : `&after_id=${despues}`;
+        const resp = await fetch(`${url}?limit=1000${cursor}`);
+        if (!resp.ok) throw new Error("Error al cargar proveedores");
+        const pagina = await resp.json();
+        filas.push(...pagina.items);
+        despues = pagina.next_after_id;
+    } while (despues !== null);
+    return filas;
+}
+
 // ===============================
 // Cargar proveedores
 // ===============================
 async function cargarProveedores() {
     try {
-        const resp = await fetch(`${API_BASE}/proveedores/`);
-        if (!resp.ok) throw new Error("Error al cargar proveedores");
-        proveedores = await resp.json();
+        proveedores = await pedirTodas(`${API_BASE}/proveedores/`);
         mostrarProveedores(proveedores);
     } catch (err) {
         console.error(err);
@@ -2,12 +2,9 @@
 
 const API_BASE = "https://proyecto-importacion-2.onrender.com/paises.html";
 
-// IMPORTANTE:
-// Ajusta los paths si en tu router usaste otros nombres.
-// Aquí supongo endpoints tipo:
-//   GET /reportes/top-productos
-//   GET /reportes/operaciones-por-pais
-//   GET /reportes/operaciones-por-mes
+// Todos los reportes de la página llegan en una sola petición:
+//   GET /reportes/dashboard
+// (por estado, por mes, top de productos y por país de origen/destino)
 
 const topProductosBody = document.getElementById("topProductosBody");
 const operacionesPaisBody = document.getElementById("operacionesPaisBody");
@@ -22,20 +19,26 @@ function mostrarError(mensaje) {
     alert(mensaje);
 }
 
-// ---------------- TOP PRODUCTOS ----------------
-async function cargarTopProductos() {
+// ---------------- DASHBOARD ----------------
+async function cargarDashboard() {
     try {
-        const resp = await fetch(`${API_BASE}/reportes/top-productos`);
-        if (!resp.ok) throw new Error("Error al cargar top de productos");
+        const resp = await fetch(`${API_BASE}/reportes/dashboard`);
+        if (!resp.ok) throw new Error("Error al cargar el dashboard");
         const data = await resp.json();
 
-        renderTopProductosTabla(data);
-        renderTopProductosChart(data);
+        renderTopProductosTabla(data.top_productos);
+        renderTopProductosChart(data.top_productos);
+        renderOperacionesPaisTabla(data.por_pais_destino);
+        renderOperacionesPaisChart(data.por_pais_destino);
+        renderOperacionesMesTabla(data.por_mes);
+        renderOperacionesMesChart(data.por_mes);
     } catch (err) {
-        mostrarError("No se pudieron cargar los reportes de productos.");
+        mostrarError("No se pudieron cargar los reportes.");
     }
 }
 
+// ---------------- TOP PRODUCTOS ----------------
+
 function renderTopProductosTabla(lista) {
     topProductosBody.innerHTML = "";
 
@@ -51,9 +54,9 @@ function renderTopProductosTabla(lista) {
     for (const item of lista) {
         const tr = document.createElement("tr");
         tr.innerHTML = `
-            <td>${item.producto || item.nombre_producto || "N/D"}</td>
-            <td>${item.total_cantidad ?? "-"}</td>
-            <td>${item.total_valor ?? "-"}</td>
+            <td>${item.producto || "N/D"}</td>
+            <td>${item.cantidad_exportada ?? "-"}</td>
+            <td>${item.valor_exportado?.toFixed(2) ?? "-"}</td>
         `;
         topProductosBody.appendChild(tr);
     }
@@ -64,10 +67,8 @@ function renderTopProductosChart(lista) {
 
     if (chartTopProductos) chartTopProductos.destroy();
 
-    const labels = lista.map(
-        (i) => i.producto || i.nombre_producto || "N/D"
-    );
-    const cantidades = lista.map((i) => i.total_cantidad ?? 0);
+    const labels = lista.map((i) => i.producto || "N/D");
+    const cantidades = lista.map((i) => i.cantidad_exportada ?? 0);
 
     chartTopProductos = new Chart(ctx, {
         type: "bar",
@@ -95,18 +96,6 @@ function renderTopProductosChart(lista) {
 }
 
 // ---------------- OPERACIONES POR PAÍS ----------------
-async function cargarOperacionesPorPais() {
-    try {
-        const resp = await fetch(`${API_BASE}/reportes/operaciones-por-pais`);
-        if (!resp.ok) throw new Error("Error al cargar operaciones por país");
-        const data = await resp.json();
-
-        renderOperacionesPaisTabla(data);
-        renderOperacionesPaisChart(data);
-    } catch (err) {
-        mostrarError("No se pudieron cargar los reportes por país.");
-    }
-}
 
 function renderOperacionesPaisTabla(lista) {
     operacionesPaisBody.innerHTML = "";
@@ -123,9 +112,9 @@ function renderOperacionesPaisTabla(lista) {
     for (const item of lista) {
         const tr = document.createElement("tr");
         tr.innerHTML = `
-            <td>${item.pais || item.pais_destino || "N/D"}</td>
-            <td>${item.total_operaciones ?? "-"}</td>
-            <td>${item.total_valor ?? "-"}</td>
+            <td>${item.pais || "N/D"}</td>
+            <td>${item.cantidad_operaciones ?? "-"}</td>
+            <td>${item.costo_total?.toFixed(2) ?? "-"}</td>
         `;
         operacionesPaisBody.appendChild(tr);
     }
@@ -136,8 +125,8 @@ function renderOperacionesPaisChart(lista) {
 
     if (chartOperacionesPais) chartOperacionesPais.destroy();
 
-    const labels = lista.map((i) => i.pais || i.pais_destino || "N/D");
-    const valores = lista.map((i) => i.total_operaciones ?? 0);
+    const labels = lista.map((i) => i.pais || "N/D");
+    const valores = lista.map((i) => i.cantidad_operaciones ?? 0);
 
     chartOperacionesPais = new Chart(ctx, {
         type: "pie",
@@ -160,18 +149,6 @@ function renderOperacionesPaisChart(lista) {
 }
 
 // ---------------- OPERACIONES POR MES ----------------
-async function cargarOperacionesPorMes() {
-    try {
-        const resp = await fetch(`${API_BASE}/reportes/operaciones-por-mes`);
-        if (!resp.ok) throw new Error("Error al cargar operaciones por mes");
-        const data = await resp.json();
-
-        renderOperacionesMesTabla(data);
-        renderOperacionesMesChart(data);
-    } catch (err) {
-        mostrarError("No se pudieron cargar los reportes por mes.");
-    }
-}
 
 function renderOperacionesMesTabla(lista) {
     operacionesMesBody.innerHTML = "";
@@ -188,9 +165,9 @@ function renderOperacionesMesTabla(lista) {
     for (const item of lista) {
         const tr = document.createElement("tr");
         tr.innerHTML = `
-            <td>${item.mes || item.periodo || "N/D"}</td>
-            <td>${item.total_operaciones ?? "-"}</td>
-            <td>${item.total_valor ?? "-"}</td>
+            <td>${item.anio}-${item.mes}</td>
+            <td>${item.cantidad_operaciones ?? "-"}</td>
+            <td>${item.ingresos?.toFixed(2) ?? "-"}</td>
         `;
         operacionesMesBody.appendChild(tr);
     }
@@ -201,8 +178,8 @@ function renderOperacionesMesChart(lista) {
 
     if (chartOperacionesMes) chartOperacionesMes.destroy();
 
-    const labels = lista.map((i) => i.mes || i.periodo || "N/D");
-    const valores = lista.map((i) => i.total_operaciones ?? 0);
+    const labels = lista.map((i) => `${i.anio}-${i.mes}`);
+    const valores = lista.map((i) => i.cantidad_operaciones ?? 0);
 
     chartOperacionesMes = new Chart(ctx, {
         type: "line",
@@ -232,9 +209,7 @@ function renderOperacionesMesChart(lista) {
 
 // ---------------- INICIO ----------------
 function initReportes() {
-    cargarTopProductos();
-    cargarOperacionesPorPais();
-    cargarOperacionesPorMes();
+    cargarDashboard();
 }
 
 document.addEventListener("DOMContentLoaded", initReportes);
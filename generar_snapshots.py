@@ -0,0 +1,18 @@
+from sqlmodel import Session
+
+from database import engine, init_db
+from inventario import generar_snapshots, verificar_stock
+
+# Pensado para correr periódicamente (por ejemplo, un cron diario)
+print("Generando snapshots de stock...")
+init_db()
+with Session(engine) as session:
+    creados = generar_snapshots(session)
+    session.commit()
+    verificacion = verificar_stock(session)
+print(f"Snapshots creados: {creados} ✔")
+if not verificacion["consistente"]:
+    print(
+        f"Atención: {len(verificacion['diferencias'])} productos con stock distinto "
+        "al del libro de movimientos (ver GET /productos/stock/verificar)"
+    )
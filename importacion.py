@@ -0,0 +1,91 @@
+# importacion.py
+"""
+Importación masiva de catálogos desde la API (CSV o arreglo JSON).
+
+Cada fila se valida con el schema *Create del router (los mismos que usa
+create_item), los errores se informan por fila sin abortar el resto y la
+escritura se hace por lotes con carga_masiva.cargar_filas: una transacción
+por lote y upsert por clave natural (código ISO del país, nombre del
+producto, del cliente, ...).
+"""
+import csv
+import io
+import json
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from carga_masiva import ErrorFila, cargar_filas
+from cache_catalogos import cache_de
+from database import engine
+
+LOTE_IMPORTACION = 1000
+
+
+def _leer_cuerpo(cuerpo: bytes, tipo_contenido: str) -> list:
+    """Devuelve [(número de fila, dict)] desde un CSV o un arreglo JSON."""
+    try:
+        texto = cuerpo.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El archivo debe estar en UTF-8.")
+
+    if "json" in tipo_contenido:
+        try:
+            datos = json.loads(texto)
+        except json.JSONDecodeError as exc:
+            raise HTTPException(status_code=400, detail=f"JSON inválido: {exc}")
+        if not isinstance(datos, list) or not all(isinstance(d, dict) for d in datos):
+            raise HTTPException(
+                status_code=400, detail="Se esperaba un arreglo JSON de objetos."
+            )
+        return list(enumerate(datos, start=1))
+
+    if "csv" in tipo_contenido or "text/plain" in tipo_contenido:
+        # La línea 1 es la cabecera
+        return list(enumerate(csv.DictReader(io.StringIO(texto)), start=2))
+
+    raise HTTPException(
+        status_code=415, detail="Envíe text/csv o application/json (arreglo de objetos)."
+    )
+
+
+def _validador(schema):
+    def validar(datos: dict) -> dict:
+        # En CSV una celda vacía significa "sin valor"
+        datos = {k: (None if v == "" else v) for k, v in datos.items()}
+        try:
+            return schema.model_validate(datos).model_dump()
+        except ValidationError as exc:
+            raise ErrorFila(
+                "; ".join(
+                    f"{'.'.join(str(p) for p in e['loc']) or 'fila'}: {e['msg']}"
+                    for e in exc.errors()
+                )
+            )
+
+    return validar
+
+
+async def importar_catalogo(
+    request: Request, entidad: str, schema, existentes: str = "actualizar", modelo_cache=None
+) -> dict:
+    """
+    Lee el cuerpo de la petición y lo carga en `entidad`. La escritura corre
+    en el threadpool para no bloquear el event loop. Si el catálogo está en
+    cache (`modelo_cache`), se invalida. Devuelve el resumen de carga_masiva
+    (insertadas, actualizadas, omitidas, errores por fila).
+    """
+    filas = _leer_cuerpo(await request.body(), request.headers.get("content-type", ""))
+    resultado = await run_in_threadpool(
+        cargar_filas,
+        engine,
+        entidad,
+        filas,
+        lote=LOTE_IMPORTACION,
+        existentes=existentes,
+        validar=_validador(schema),
+    )
+    if modelo_cache is not None and (resultado["insertadas"] or resultado["actualizadas"]):
+        cache_de(modelo_cache).invalidar()
+    return resultado
@@ -0,0 +1,117 @@
+# instrumentacion.py
+"""
+Instrumentación de SQL por petición (SQL_INSTRUMENTACION=1).
+
+Cuenta sentencias, tiempo total en la base y commits de cada petición HTTP
+usando eventos del motor de SQLAlchemy. El resultado se envía en la cabecera
+`Server-Timing` y en una línea de log estructurada. Si la misma sentencia se
+repite con parámetros distintos más de SQL_N_MAS_1_UMBRAL veces, la petición
+se marca como sospechosa de N+1 (típico de cargas perezosas de Relationship).
+
+Desactivada no registra ningún evento, así que no tiene costo en producción.
+"""
+import contextvars
+import json
+import logging
+import os
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger("sql.peticiones")
+
+SQL_INSTRUMENTACION = os.getenv("SQL_INSTRUMENTACION", "0") == "1"
+SQL_N_MAS_1_UMBRAL = int(os.getenv("SQL_N_MAS_1_UMBRAL", "5"))
+
+_metricas_actuales = contextvars.ContextVar("metricas_sql", default=None)
+
+
+class MetricasSQL:
+    def __init__(self):
+        self.sentencias = 0
+        self.tiempo_ms = 0.0
+        self.commits = 0
+        self.parametros = {}  # sentencia -> conjunto de parámetros distintos
+
+    def sospechas_n_mas_1(self) -> list:
+        return [
+            {"sentencia": " ".join(sentencia.split())[:200], "veces": len(distintos)}
+            for sentencia, distintos in self.parametros.items()
+            if len(distintos) > SQL_N_MAS_1_UMBRAL
+        ]
+
+
+def instrumentar_motor(engine) -> None:
+    """Registra los eventos que alimentan las métricas de la petición en curso."""
+    logger.setLevel(logging.INFO)
+    if not logger.handlers and not logging.getLogger("sql").handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _inicio(conn, cursor, statement, parameters, context, executemany):
+        if _metricas_actuales.get() is not None:
+            conn.info["inicio_metricas"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _fin(conn, cursor, statement, parameters, context, executemany):
+        metricas = _metricas_actuales.get()
+        if metricas is None or "inicio_metricas" not in conn.info:
+            return
+        metricas.sentencias += 1
+        metricas.tiempo_ms += (time.perf_counter() - conn.info.pop("inicio_metricas")) * 1000
+        metricas.parametros.setdefault(statement, set()).add(repr(parameters))
+
+    @event.listens_for(engine, "commit")
+    def _commit(conn):
+        metricas = _metricas_actuales.get()
+        if metricas is not None:
+            metricas.commits += 1
+
+
+class MiddlewareSQL:
+    """Middleware ASGI que abre las métricas al inicio de cada petición HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metricas = MetricasSQL()
+        token = _metricas_actuales.set(metricas)
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                valor = (
+                    f'db;dur={metricas.tiempo_ms:.1f};desc="{metricas.sentencias} sentencias", '
+                    f'commits;desc="{metricas.commits}"'
+                )
+                mensaje.setdefault("headers", [])
+                mensaje["headers"] = list(mensaje["headers"]) + [
+                    (b"server-timing", valor.encode())
+                ]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _metricas_actuales.reset(token)
+            sospechas = metricas.sospechas_n_mas_1()
+            registro = {
+                "metodo": scope["method"],
+                "ruta": scope["path"],
+                "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+                "sql_sentencias": metricas.sentencias,
+                "sql_tiempo_ms": round(metricas.tiempo_ms, 1),
+                "sql_commits": metricas.commits,
+            }
+            if sospechas:
+                registro["n_mas_1"] = sospechas
+                logger.warning(json.dumps(registro, ensure_ascii=False))
+            else:
+                logger.info(json.dumps(registro, ensure_ascii=False))
@@ -0,0 +1,219 @@
+# inventario.py
+"""
+Libro de movimientos de stock y snapshots periódicos por producto.
+
+Cada cambio de stock_disponible agrega una fila a MovimientoStock en la
+misma transacción que lo produce (ver mover_stock en
+routers/detalles_operacion.py). El libro no se modifica ni se borra:
+stock_disponible queda como el valor actual cacheado y se puede verificar
+contra el libro en cualquier momento.
+
+Para no sumar todo el historial en cada consulta, generar_snapshots guarda
+el saldo de cada producto que tuvo movimientos desde su último snapshot.
+El stock en un momento dado es el snapshot más cercano anterior más la cola
+de movimientos posteriores; cuanto más seguido se generen los snapshots,
+más corta es la cola (ver generar_snapshots.py para correrlo con cron).
+
+La cola de un snapshot son los movimientos con id mayor a su corte, así que
+el corte tiene que incluir todo movimiento con id menor. En PostgreSQL los
+ids salen de la secuencia antes del commit, no en orden de commit: por eso
+generar_snapshots bloquea el libro (ver _bloquear_libro) antes de leerlo.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import text
+from sqlmodel import Session, select, func, insert, exists, literal
+
+from models import Producto, MovimientoStock, SnapshotStock, ahora_utc
+
+# Diferencia máxima aceptada entre stock_disponible y el libro (redondeo de floats)
+TOLERANCIA = 1e-6
+
+
+def registrar_movimiento(
+    session: Session,
+    producto_id: int,
+    cantidad: float,
+    motivo: str,
+    operacion_id: Optional[int] = None,
+    detalle_id: Optional[int] = None,
+) -> None:
+    """Agrega un movimiento al libro. No hace commit: va con la escritura que lo produjo."""
+    session.add(
+        MovimientoStock(
+            producto_id=producto_id,
+            cantidad=cantidad,
+            motivo=motivo,
+            operacion_id=operacion_id,
+            detalle_id=detalle_id,
+        )
+    )
+
+
+def asegurar_saldos_iniciales(session: Session, motivo: str = "saldo_inicial") -> int:
+    """
+    Abre el libro de los productos que todavía no tienen movimientos con su
+    stock_disponible actual (productos previos al libro o cargados en masa).
+    Un solo INSERT ... SELECT; no hace commit. Devuelve cuántos se abrieron.
+    """
+    sin_movimientos = ~exists().where(MovimientoStock.producto_id == Producto.id)
+    statement = insert(MovimientoStock).from_select(
+        ["producto_id", "cantidad", "motivo", "registrado_en"],
+        select(
+            Producto.id,
+            Producto.stock_disponible,
+            literal(motivo),
+            literal(ahora_utc(), MovimientoStock.registrado_en.type),
+        ).where(sin_movimientos),
+    )
+    return session.exec(statement).rowcount
+
+
+def _saldos(tope: Optional[int] = None):
+    """
+    Select con el saldo según el libro de cada producto: su último snapshot
+    más la suma (y cantidad) de movimientos posteriores, hasta `tope` si se indica.
+    """
+    ultimo = (
+        select(
+            SnapshotStock.producto_id,
+            func.max(SnapshotStock.id).label("snapshot_id"),
+        )
+        .group_by(SnapshotStock.producto_id)
+        .subquery()
+    )
+    base = (
+        select(
+            Producto.id.label("producto_id"),
+            Producto.stock_disponible,
+            func.coalesce(SnapshotStock.stock, 0.0).label("stock_snapshot"),
+            func.coalesce(SnapshotStock.ultimo_movimiento_id, 0).label("desde"),
+        )
+        .outerjoin(ultimo, ultimo.c.producto_id == Producto.id)
+        .outerjoin(SnapshotStock, SnapshotStock.id == ultimo.c.snapshot_id)
+        .subquery()
+    )
+
+    condiciones = [
+        MovimientoStock.producto_id == base.c.producto_id,
+        MovimientoStock.id > base.c.desde,
+    ]
+    if tope is not None:
+        condiciones.append(MovimientoStock.id <= tope)
+    cola = select(
+        func.coalesce(func.sum(MovimientoStock.cantidad), 0.0)
+    ).where(*condiciones)
+    movimientos = select(func.count()).where(*condiciones)
+
+    return select(
+        base.c.producto_id,
+        base.c.stock_disponible,
+        (base.c.stock_snapshot + cola.scalar_subquery()).label("stock_libro"),
+        movimientos.scalar_subquery().label("movimientos"),
+    ).order_by(base.c.producto_id)
+
+
+def _bloquear_libro(session: Session) -> None:
+    """
+    En PostgreSQL, LOCK ... IN SHARE MODE espera a que confirmen las
+    transacciones que están insertando movimientos y frena las nuevas hasta
+    el commit de esta. Así, al leer max(id) ya no puede haber un movimiento
+    con id menor sin confirmar. En SQLite no hace falta: hay un solo escritor
+    a la vez y los ids se asignan en el orden en que se confirman.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.connection().execute(
+            text(f"LOCK TABLE {MovimientoStock.__tablename__} IN SHARE MODE")
+        )
+
+
+def generar_snapshots(session: Session) -> int:
+    """
+    Guarda un snapshot de cada producto con movimientos desde su último
+    snapshot. Todos quedan cortados en el mismo último movimiento, leído al
+    empezar con el libro bloqueado, así que lo que llegue después va al
+    próximo snapshot. No hace commit; las escrituras del libro esperan
+    hasta que el llamador confirme. Devuelve cuántos snapshots se crearon.
+    """
+    _bloquear_libro(session)
+    tope = session.exec(select(func.max(MovimientoStock.id))).one()
+    if tope is None:
+        return 0
+    tomado_en = ahora_utc()
+    filas = [
+        {
+            "producto_id": producto_id,
+            "tomado_en": tomado_en,
+            "stock": stock_libro,
+            "ultimo_movimiento_id": tope,
+        }
+        for producto_id, _, stock_libro, movimientos in session.exec(_saldos(tope))
+        if movimientos
+    ]
+    if filas:
+        session.exec(insert(SnapshotStock), params=filas)
+    return len(filas)
+
+
+def verificar_stock(session: Session) -> dict:
+    """Compara stock_disponible de cada producto con el saldo según el libro."""
+    diferencias = []
+    verificados = 0
+    for producto_id, stock_disponible, stock_libro, _ in session.exec(_saldos()):
+        verificados += 1
+        if abs(stock_disponible - stock_libro) > TOLERANCIA:
+            diferencias.append(
+                {
+                    "producto_id": producto_id,
+                    "stock_disponible": stock_disponible,
+                    "stock_libro": stock_libro,
+                    "diferencia": stock_disponible - stock_libro,
+                }
+            )
+    return {
+        "productos_verificados": verificados,
+        "consistente": not diferencias,
+        "diferencias": diferencias,
+    }
+
+
+def stock_en(session: Session, producto_id: int, momento: datetime) -> dict:
+    """
+    Stock del producto en `momento`: el snapshot más cercano anterior
+    más los movimientos registrados entre ese snapshot y `momento`.
+    """
+    snapshot = session.exec(
+        select(SnapshotStock)
+        .where(SnapshotStock.producto_id == producto_id)
+        .where(SnapshotStock.tomado_en <= momento)
+        .order_by(SnapshotStock.tomado_en.desc())
+        .limit(1)
+    ).first()
+    desde = snapshot.ultimo_movimiento_id if snapshot else 0
+
+    suma, movimientos = session.exec(
+        select(
+            func.coalesce(func.sum(MovimientoStock.cantidad), 0.0),
+            func.count(),
+        )
+        .where(MovimientoStock.producto_id == producto_id)
+        .where(MovimientoStock.id > desde)
+        .where(MovimientoStock.registrado_en <= momento)
+    ).one()
+
+    return {
+        "producto_id": producto_id,
+        "momento": momento,
+        "stock": (snapshot.stock if snapshot else 0.0) + suma,
+        "snapshot": (
+            {
+                "id": snapshot.id,
+                "tomado_en": snapshot.tomado_en,
+                "stock": snapshot.stock,
+            }
+            if snapshot
+            else None
+        ),
+        "movimientos_aplicados": movimientos,
+    }
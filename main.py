@@ -1,5 +1,9 @@
-from fastAPI import FastAPI
-from database import init_db
+from fastapi import FastAPI
+from fastapi.middleware.gzip import GZipMiddleware
+from database import init_db, DB_MODO, engine, async_engine
+from instrumentacion import SQL_INSTRUMENTACION, MiddlewareSQL, instrumentar_motor
+import cache_catalogos
+import trabajos
 from routers import (
     categorias_producto,
     paises,
@@ -12,6 +16,7 @@ from routers import (
     detalles_operacion,
     inspecciones_calidad,
     reportes,
+    archivos,
 )
 
 app = FastAPI(
@@ -21,25 +26,65 @@ app = FastAPI(
 )
 
 
+# Métricas de SQL por petición (Server-Timing + log), solo si se activan
+if SQL_INSTRUMENTACION:
+    instrumentar_motor(engine)
+    if async_engine is not None:
+        instrumentar_motor(async_engine.sync_engine)
+    app.add_middleware(MiddlewareSQL)
+
+
+# Compresión negociada según Accept-Encoding: brotli con gzip para los clientes
+# que no lo aceptan. brotli-asgi está en requirements.txt; sin él, solo gzip
+COMPRESION_TAMANO_MINIMO = 1024
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESION_TAMANO_MINIMO)
+else:
+    app.add_middleware(
+        BrotliMiddleware, minimum_size=COMPRESION_TAMANO_MINIMO, gzip_fallback=True
+    )
+
+
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+    # Reportes y exportaciones en segundo plano (retoma los que quedaron sin terminar)
+    trabajos.iniciar()
+
+
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    trabajos.detener()
+
+
+def incluir(router) -> None:
+    # En modo asíncrono cada router se adapta a AsyncSession (ver asincrono.py)
+    if DB_MODO == "async":
+        from asincrono import version_async
+
+        router = version_async(router)
+    app.include_router(router)
 
 
 # Routers CRUD
-app.include_router(categorias_producto.router)
-app.include_router(paises.router)
-app.include_router(clientes.router)
-app.include_router(proveedores.router)
-app.include_router(puertos.router)
-app.include_router(medios_transporte.router)
-app.include_router(productos.router)
-app.include_router(operaciones.router)
-app.include_router(detalles_operacion.router)
-app.include_router(inspecciones_calidad.router)
+incluir(categorias_producto.router)
+incluir(paises.router)
+incluir(clientes.router)
+incluir(proveedores.router)
+incluir(puertos.router)
+incluir(medios_transporte.router)
+incluir(productos.router)
+incluir(operaciones.router)
+incluir(detalles_operacion.router)
+incluir(inspecciones_calidad.router)
 
 # Routers de reportes
-app.include_router(reportes.router)
+incluir(reportes.router)
+
+# Archivos subidos (importar el router registra también el trabajo "miniaturas")
+incluir(archivos.router)
 
 
 @app.get("/")
@@ -49,3 +94,9 @@ def root():
         "docs": "/docs",
         "redoc": "/redoc",
     }
+
+
+@app.get("/cache/estadisticas")
+def cache_estadisticas():
+    """Hits, misses y tamaño del cache de catálogos de este proceso."""
+    return cache_catalogos.estadisticas()
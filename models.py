@@ -1,5 +1,6 @@
 from typing import Optional, List
-from datetime import date
+from datetime import date, datetime, timezone
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 
 
@@ -31,7 +32,7 @@ class Cliente(SQLModel, table=True):
     email: Optional[str] = None
     telefono: Optional[str] = None
 
-    pais_id: Optional[int] = Field(default=None, foreign_key="pais.id")
+    pais_id: Optional[int] = Field(default=None, foreign_key="pais.id", index=True)
     pais: Optional[Pais] = Relationship(back_populates="clientes")
 
     operaciones: List["Operacion"] = Relationship(back_populates="cliente")
@@ -45,7 +46,7 @@ class Proveedor(SQLModel, table=True):
     email: Optional[str] = None
     telefono: Optional[str] = None
 
-    pais_id: Optional[int] = Field(default=None, foreign_key="pais.id")
+    pais_id: Optional[int] = Field(default=None, foreign_key="pais.id", index=True)
     pais: Optional[Pais] = Relationship(back_populates="proveedores")
 
     operaciones: List["Operacion"] = Relationship(back_populates="proveedor")
@@ -57,7 +58,7 @@ class Puerto(SQLModel, table=True):
     nombre: str
     tipo: Optional[str] = None
 
-    pais_id: int = Field(foreign_key="pais.id")
+    pais_id: int = Field(foreign_key="pais.id", index=True)
     pais: Pais = Relationship(back_populates="puertos")
 
     operaciones_origen: List["Operacion"] = Relationship(
@@ -88,7 +89,9 @@ class Producto(SQLModel, table=True):
     precio_referencia: float
     stock_disponible: float = 0
 
-    categoria_id: Optional[int] = Field(default=None, foreign_key="categoriaproducto.id")
+    categoria_id: Optional[int] = Field(
+        default=None, foreign_key="categoriaproducto.id", index=True
+    )
     categoria: Optional[CategoriaProducto] = Relationship(back_populates="productos")
 
     detalles: List["DetalleOperacion"] = Relationship(back_populates="producto")
@@ -97,20 +100,26 @@ class Producto(SQLModel, table=True):
 # 8. OPERACIÓN
 class Operacion(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    tipo: str                        # importacion / exportacion
-    fecha: date = Field(default_factory=date.today)
-    estado: str = "pendiente"
+    tipo: str = Field(index=True)    # importacion / exportacion
+    fecha: date = Field(default_factory=date.today, index=True)
+    estado: str = Field(default="pendiente", index=True)
     costo_total: Optional[float] = None
     observaciones: Optional[str] = None
 
-    cliente_id: Optional[int] = Field(default=None, foreign_key="cliente.id")
+    cliente_id: Optional[int] = Field(default=None, foreign_key="cliente.id", index=True)
     cliente: Optional[Cliente] = Relationship(back_populates="operaciones")
 
-    proveedor_id: Optional[int] = Field(default=None, foreign_key="proveedor.id")
+    proveedor_id: Optional[int] = Field(default=None, foreign_key="proveedor.id", index=True)
     proveedor: Optional[Proveedor] = Relationship(back_populates="operaciones")
 
     pais_origen_id: Optional[int] = Field(default=None, foreign_key="pais.id")
     pais_destino_id: Optional[int] = Field(default=None, foreign_key="pais.id")
+    pais_origen: Optional[Pais] = Relationship(
+        sa_relationship_kwargs={"foreign_keys": "[Operacion.pais_origen_id]"},
+    )
+    pais_destino: Optional[Pais] = Relationship(
+        sa_relationship_kwargs={"foreign_keys": "[Operacion.pais_destino_id]"},
+    )
 
     puerto_origen_id: Optional[int] = Field(default=None, foreign_key="puerto.id")
     puerto_destino_id: Optional[int] = Field(default=None, foreign_key="puerto.id")
@@ -134,8 +143,8 @@ class Operacion(SQLModel, table=True):
 # 9. DETALLE DE OPERACIÓN
 class DetalleOperacion(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    producto_id: int = Field(foreign_key="producto.id")
-    operacion_id: int = Field(foreign_key="operacion.id")
+    producto_id: int = Field(foreign_key="producto.id", index=True)
+    operacion_id: int = Field(foreign_key="operacion.id", index=True)
 
     cantidad: float
     precio_unitario: float
@@ -151,8 +160,121 @@ class InspeccionCalidad(SQLModel, table=True):
     resultado: str
     observaciones: Optional[str] = None
 
-    operacion_id: int = Field(foreign_key="operacion.id")
+    operacion_id: int = Field(foreign_key="operacion.id", index=True)
     operacion: Operacion = Relationship(back_populates="inspecciones")
 
-    producto_id: Optional[int] = Field(default=None, foreign_key="producto.id")
+    producto_id: Optional[int] = Field(default=None, foreign_key="producto.id", index=True)
     producto: Optional[Producto] = Relationship()
+
+
+# 11. RESÚMENES PARA REPORTES
+# Se actualizan en la misma transacción que las operaciones y sus detalles
+# (ver resumenes.py), así los reportes leen O(grupos) en lugar de O(filas).
+class ResumenEstado(SQLModel, table=True):
+    estado: str = Field(primary_key=True)
+    cantidad_operaciones: int = 0
+    costo_total: float = 0
+
+
+class ResumenMes(SQLModel, table=True):
+    anio: int = Field(primary_key=True)
+    mes: int = Field(primary_key=True)
+    cantidad_operaciones: int = 0
+    costo_total: float = 0
+
+
+class ResumenProducto(SQLModel, table=True):
+    # Sin foreign key: una fila en cero no debe impedir borrar el producto
+    producto_id: int = Field(primary_key=True)
+    tipo: str = Field(primary_key=True)  # importacion / exportacion
+    cantidad: float = 0
+    valor: float = 0
+
+
+class ResumenRuta(SQLModel, table=True):
+    # Por país de origen y de destino; 0 = la operación no indica ese país
+    pais_origen_id: int = Field(primary_key=True)
+    pais_destino_id: int = Field(primary_key=True)
+    cantidad_operaciones: int = 0
+    costo_total: float = 0
+
+
+# 12. LIBRO DE MOVIMIENTOS DE STOCK
+# Solo se agregan filas (nunca se modifican ni se borran). stock_disponible del
+# producto es el valor actual cacheado; el libro permite reconstruirlo a
+# cualquier momento y verificarlo (ver inventario.py).
+def ahora_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class MovimientoStock(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_movimientostock_producto_id_id", "producto_id", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Sin foreign keys: el historial sobrevive al borrado del producto o del detalle
+    producto_id: int
+    cantidad: float                  # con signo: + entra, - sale
+    motivo: str                      # detalle_creado / detalle_modificado / ...
+    registrado_en: datetime = Field(default_factory=ahora_utc)
+    operacion_id: Optional[int] = None
+    detalle_id: Optional[int] = None
+
+
+class SnapshotStock(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_snapshotstock_producto_id_tomado_en", "producto_id", "tomado_en"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    producto_id: int
+    tomado_en: datetime = Field(default_factory=ahora_utc)
+    stock: float
+    # Incluye todos los movimientos del producto con id <= este valor
+    ultimo_movimiento_id: int
+
+
+# 13. VERSIONES POR TABLA (ETags)
+# Cada transacción que escribe en una tabla le suma 1 a uno de sus fragmentos
+# al confirmar, elegido al azar (ver etags.py): escritores concurrentes de la
+# misma tabla casi nunca esperan la misma fila. La versión es la suma.
+class VersionFragmento(SQLModel, table=True):
+    tabla: str = Field(primary_key=True)
+    fragmento: int = Field(primary_key=True)
+    version: int = 0
+
+
+# 14. TRABAJOS EN SEGUNDO PLANO (reportes y exportaciones pesadas)
+# La tabla es la cola: sobrevive a reinicios y se comparte entre workers
+# (ver trabajos.py). El resultado queda en un archivo en disco hasta expira_en.
+class TrabajoReporte(SQLModel, table=True):
+    id: str = Field(primary_key=True)  # uuid4 en hex
+    tipo: str
+    parametros: str  # JSON
+    estado: str = Field(default="pendiente", index=True)
+    progreso: float = 0  # 0 a 1
+    filas: Optional[int] = None
+    archivo: Optional[str] = None
+    tipo_contenido: Optional[str] = None
+    error: Optional[str] = None
+    # Veces que se reclamó; pasado TRABAJOS_MAX_INTENTOS sin terminar queda fallido
+    intentos: int = 0
+    # Token de la ejecución actual: solo esa puede informar avance o terminarlo
+    reclamo: Optional[str] = None
+    creado_en: datetime = Field(default_factory=ahora_utc)
+    # Latido del proceso que lo ejecuta; si se detiene, el trabajo vuelve a la cola
+    actualizado_en: datetime = Field(default_factory=ahora_utc)
+    expira_en: Optional[datetime] = None
+
+
+# 15. ARCHIVOS SUBIDOS POR CONTENIDO
+# Un archivo por sha256: si los mismos bytes se suben de nuevo se reutiliza el
+# objeto guardado sin volver a enviarlo (ver supa/almacenamiento.py).
+class ArchivoAlmacenado(SQLModel, table=True):
+    hash: str = Field(primary_key=True)  # sha256 del contenido, en hex
+    clave: str  # carpeta/nombre dentro del almacenamiento
+    bytes: int
+    tipo_contenido: Optional[str] = None
+    miniaturas: Optional[str] = None  # JSON {lado: clave}; lo completa el trabajo "miniaturas"
+    creado_en: datetime = Field(default_factory=ahora_utc)
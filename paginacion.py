@@ -0,0 +1,82 @@
+from typing import Optional
+
+from fastapi import Query
+from sqlmodel import Session
+
+LIMITE_POR_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+
+
+class Paginacion:
+    """
+    Parámetros de paginación por cursor (keyset) comunes a todos los listados.
+    `after_id` es el último id recibido en la página anterior.
+    """
+
+    def __init__(
+        self,
+        after_id: Optional[int] = Query(
+            default=None, ge=0, description="Devuelve registros con id mayor a este valor"
+        ),
+        limit: int = Query(
+            default=LIMITE_POR_DEFECTO,
+            ge=1,
+            le=LIMITE_MAXIMO,
+            description=f"Cantidad máxima de registros (máx. {LIMITE_MAXIMO})",
+        ),
+    ):
+        self.after_id = after_id
+        self.limit = limit
+
+
+def columnas_de(modelo, schema) -> list:
+    """Columnas de la tabla del modelo que aparecen en el schema de lectura."""
+    # Los campos del schema que no son columnas del modelo quedan con su default
+    return [modelo.__table__.c[c] for c in schema.model_fields if c in modelo.__table__.c]
+
+
+def defaults_fuera_de_columnas(schema, claves: list) -> dict:
+    """
+    Default de cada campo opcional del schema que no se leyó de la tabla.
+    Los listados con exclude_unset (?expand=) los omitirían si las filas no
+    los traen, y el mismo registro saldría con otra forma que en su endpoint.
+    """
+    return {
+        nombre: campo.get_default(call_default_factory=True)
+        for nombre, campo in schema.model_fields.items()
+        if nombre not in claves and not campo.is_required()
+    }
+
+
+def paginar(session: Session, statement, modelo, pagina: Paginacion, schema) -> dict:
+    """
+    Aplica el cursor sobre la clave primaria y devuelve el sobre
+    {"items": [...], "next_after_id": ...}. Se pide un registro extra
+    para saber si existe una página siguiente sin hacer un COUNT.
+
+    Solo se leen las columnas del schema de lectura y como tuplas (sin
+    construir instancias del ORM ni pasar por el identity map); los items
+    son dicts, que FastAPI valida contra el response_model y serializa
+    directo a bytes JSON en pydantic-core, sin json.dumps (así lo hace la
+    versión de FastAPI fijada en requirements.txt). También sirven tal cual
+    para guardarlos en cache.
+    """
+    statement = statement.with_only_columns(*columnas_de(modelo, schema))
+    if pagina.after_id is not None:
+        statement = statement.where(modelo.id > pagina.after_id)
+    statement = statement.order_by(modelo.id).limit(pagina.limit + 1)
+
+    # execute y no exec: exec devolvería solo la primera columna (ScalarResult)
+    resultado = session.execute(statement)
+    claves = list(resultado.keys())
+    items = [dict(zip(claves, fila)) for fila in resultado]
+    defaults = defaults_fuera_de_columnas(schema, claves)
+    if defaults:
+        items = [{**defaults, **item} for item in items]
+
+    next_after_id = None
+    if len(items) > pagina.limit:
+        items = items[: pagina.limit]
+        next_after_id = items[-1]["id"]
+
+    return {"items": items, "next_after_id": next_after_id}
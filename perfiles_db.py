@@ -0,0 +1,149 @@
+# perfiles_db.py
+"""
+Perfiles del motor de base de datos (DB_PERFIL = dev | prod | bench; por
+defecto prod, así un despliegue sin la variable no registra todo el SQL).
+
+Cada perfil fija el pool de conexiones, los timeouts de PostgreSQL (uno para
+las peticiones y otro, más amplio, para los trabajos en segundo plano), los
+PRAGMA de SQLite y cómo se registra el SQL. En lugar de echo=True (que
+escribe cada sentencia en stdout de forma síncrona) se registran solo las
+consultas lentas y, opcionalmente, una muestra aleatoria del resto.
+"""
+import logging
+import os
+import random
+import time
+
+from sqlalchemy import event
+
+logger = logging.getLogger("sql")
+
+PERFILES = {
+    # Desarrollo local (DB_PERFIL=dev): pool chico y todo el SQL en el log
+    "dev": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "statement_timeout_ms": 0,
+        "statement_timeout_trabajos_ms": 0,
+        "log_umbral_ms": 0,
+        "log_muestreo": 1.0,
+    },
+    # Render + Supabase (y el perfil por defecto): reciclar antes de que el
+    # pooler corte conexiones inactivas y cortar consultas colgadas
+    "prod": {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 10,
+        "pool_pre_ping": True,
+        "pool_recycle": 300,
+        "statement_timeout_ms": 15000,
+        # Reportes y exportaciones de trabajos.py: pueden tardar minutos
+        "statement_timeout_trabajos_ms": 600000,
+        "log_umbral_ms": 500,
+        "log_muestreo": 0.0,
+    },
+    # Benchmarks: sin log y con pool amplio para no medir la espera del pool
+    "bench": {
+        "pool_size": 20,
+        "max_overflow": 40,
+        "pool_timeout": 60,
+        "pool_pre_ping": False,
+        "pool_recycle": -1,
+        "statement_timeout_ms": 0,
+        "statement_timeout_trabajos_ms": 0,
+        "log_umbral_ms": None,
+        "log_muestreo": 0.0,
+    },
+}
+
+# PRAGMA aplicados a cada conexión SQLite nueva
+PRAGMAS_SQLITE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,  # 256 MB
+    "busy_timeout": 5000,
+}
+
+
+def obtener_perfil(nombre: str) -> dict:
+    if nombre not in PERFILES:
+        raise ValueError(
+            f"DB_PERFIL desconocido: {nombre}. Opciones: {', '.join(PERFILES)}"
+        )
+    perfil = dict(PERFILES[nombre])
+    # Permite ajustar el log sin cambiar de perfil
+    if os.getenv("SQL_LOG_UMBRAL_MS"):
+        perfil["log_umbral_ms"] = float(os.getenv("SQL_LOG_UMBRAL_MS"))
+    if os.getenv("SQL_LOG_MUESTREO"):
+        perfil["log_muestreo"] = float(os.getenv("SQL_LOG_MUESTREO"))
+    return perfil
+
+
+def perfil_trabajos(perfil: dict) -> dict:
+    """El mismo perfil con el límite por sentencia de los trabajos en segundo plano."""
+    return {**perfil, "statement_timeout_ms": perfil["statement_timeout_trabajos_ms"]}
+
+
+def opciones_motor(url: str, perfil: dict) -> dict:
+    """Argumentos para create_engine / create_async_engine según el motor."""
+    if url.startswith("sqlite") and (url.endswith("://") or ":memory:" in url):
+        # SQLite en memoria usa un pool de una sola conexión: no se configura
+        return {}
+
+    opciones = {
+        "pool_size": perfil["pool_size"],
+        "max_overflow": perfil["max_overflow"],
+        "pool_timeout": perfil["pool_timeout"],
+        "pool_pre_ping": perfil["pool_pre_ping"],
+        "pool_recycle": perfil["pool_recycle"],
+    }
+    timeout = perfil["statement_timeout_ms"]
+    if url.startswith("postgresql") and timeout:
+        if "+asyncpg" in url:
+            opciones["connect_args"] = {
+                "server_settings": {"statement_timeout": str(timeout)}
+            }
+        else:
+            opciones["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    if url.startswith("sqlite"):
+        # SQLite no necesita verificar conexiones: son archivos locales
+        opciones["pool_pre_ping"] = False
+    return opciones
+
+
+def configurar_motor(engine, perfil: dict) -> None:
+    """Registra los PRAGMA de SQLite y el log de consultas lentas/muestreadas."""
+    if engine.dialect.name == "sqlite":
+
+        @event.listens_for(engine, "connect")
+        def _pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma, valor in PRAGMAS_SQLITE.items():
+                cursor.execute(f"PRAGMA {pragma}={valor}")
+            cursor.close()
+
+    umbral_ms = perfil["log_umbral_ms"]
+    muestreo = perfil["log_muestreo"]
+    if not umbral_ms and not muestreo:
+        return
+
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _inicio(conn, cursor, statement, parameters, context, executemany):
+        conn.info["inicio_sql"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _fin(conn, cursor, statement, parameters, context, executemany):
+        duracion_ms = (time.perf_counter() - conn.info["inicio_sql"]) * 1000
+        if umbral_ms and duracion_ms >= umbral_ms:
+            logger.warning("SQL lento (%.1f ms): %s", duracion_ms, statement)
+        elif muestreo and random.random() < muestreo:
+            logger.info("SQL (%.1f ms): %s", duracion_ms, statement)
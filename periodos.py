@@ -0,0 +1,54 @@
+# periodos.py
+"""
+Agrupación de fechas por período (día, semana, mes, trimestre, año)
+que genera SQL equivalente en SQLite y en PostgreSQL.
+
+Cada período se representa por su fecha de inicio (la semana empieza el
+lunes), así los resultados son iguales en ambos motores. Los filtros de
+rango deben hacerse sobre la columna sin funciones (fecha >= desde AND
+fecha < hasta) para que puedan usar el índice.
+"""
+from sqlalchemy import Date, Integer, cast, func, literal_column
+
+PERIODOS = ("dia", "semana", "mes", "trimestre", "anio")
+
+_DATE_TRUNC_POSTGRES = {
+    "dia": "day",
+    "semana": "week",
+    "mes": "month",
+    "trimestre": "quarter",
+    "anio": "year",
+}
+
+
+def _constante(texto: str):
+    # Literal en el SQL (no parámetro) para que la expresión del SELECT y la
+    # del GROUP BY sean idénticas para el motor
+    return literal_column(f"'{texto}'")
+
+
+def inicio_de_periodo(columna, periodo: str, dialecto: str):
+    """Expresión SQL con la fecha de inicio del período al que pertenece `columna`."""
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período no soportado: {periodo}")
+
+    if dialecto == "postgresql":
+        return cast(func.date_trunc(_constante(_DATE_TRUNC_POSTGRES[periodo]), columna), Date)
+
+    # SQLite: modificadores de la función date()
+    if periodo == "dia":
+        return func.date(columna, type_=Date)
+    if periodo == "semana":
+        # 'weekday 0' avanza al domingo siguiente (o se queda si ya lo es)
+        return func.date(columna, _constante("weekday 0"), _constante("-6 days"), type_=Date)
+    if periodo == "mes":
+        return func.date(columna, _constante("start of month"), type_=Date)
+    if periodo == "trimestre":
+        mes = cast(func.strftime(_constante("%m"), columna), Integer)
+        meses_desde_inicio = func.printf(
+            _constante("-%d months"), (mes - literal_column("1")) % literal_column("3")
+        )
+        return func.date(
+            columna, _constante("start of month"), meses_desde_inicio, type_=Date
+        )
+    return func.date(columna, _constante("start of year"), type_=Date)
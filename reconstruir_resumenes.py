@@ -0,0 +1,11 @@
+from sqlmodel import Session
+
+from database import engine, init_db
+from resumenes import reconstruir_resumenes
+
+print("Reconstruyendo tablas de resumen para reportes...")
+init_db()
+with Session(engine) as session:
+    reconstruir_resumenes(session)
+    session.commit()
+print("Resúmenes reconstruidos correctamente ✔")
@@ -0,0 +1,190 @@
+# resumenes.py
+"""
+Mantenimiento de las tablas de resumen que usan los reportes.
+
+Las funciones registrar_* se llaman desde los routers de operaciones y
+detalles dentro de la misma transacción que la escritura, de modo que los
+resúmenes nunca quedan desfasados respecto de los datos. reconstruir_resumenes
+recalcula todo desde cero (backfill o corrección); init_db lo llama mediante
+asegurar_resumenes cuando las tablas de resumen están vacías y hay datos.
+"""
+from datetime import date
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select, func, delete, extract, insert, literal
+
+from models import (
+    Operacion,
+    DetalleOperacion,
+    ResumenEstado,
+    ResumenMes,
+    ResumenProducto,
+    ResumenRuta,
+)
+
+# Clave de ResumenRuta para las operaciones que no indican país de origen o destino
+SIN_PAIS = 0
+
+
+def _incrementar(session: Session, modelo, claves: dict, incrementos: dict) -> None:
+    """
+    INSERT ... ON CONFLICT DO UPDATE sumando los incrementos.
+    SQLite y PostgreSQL soportan la misma sintaxis de upsert.
+    """
+    dialecto = session.get_bind().dialect.name
+    insert_dialecto = postgresql.insert if dialecto == "postgresql" else sqlite.insert
+
+    tabla = modelo.__table__
+    statement = insert_dialecto(tabla).values(**claves, **incrementos)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(claves),
+        set_={campo: tabla.c[campo] + valor for campo, valor in incrementos.items()},
+    )
+    session.exec(statement)
+
+
+def ruta_de(operacion: Operacion) -> Tuple[Optional[int], Optional[int]]:
+    return operacion.pais_origen_id, operacion.pais_destino_id
+
+
+def _clave_ruta(ruta: Tuple[Optional[int], Optional[int]]) -> dict:
+    pais_origen_id, pais_destino_id = ruta
+    return {
+        "pais_origen_id": pais_origen_id or SIN_PAIS,
+        "pais_destino_id": pais_destino_id or SIN_PAIS,
+    }
+
+
+def registrar_operacion(
+    session: Session,
+    estado: str,
+    fecha: date,
+    cantidad: int,
+    costo: float,
+    *,
+    ruta: Tuple[Optional[int], Optional[int]],
+) -> None:
+    """
+    Suma (o resta, con cantidad=-1) una operación a los resúmenes por estado,
+    por mes y por ruta (país de origen, país de destino).
+    """
+    incrementos = {"cantidad_operaciones": cantidad, "costo_total": costo or 0.0}
+    _incrementar(session, ResumenEstado, {"estado": estado}, incrementos)
+    _incrementar(
+        session, ResumenMes, {"anio": fecha.year, "mes": fecha.month}, incrementos
+    )
+    _incrementar(session, ResumenRuta, _clave_ruta(ruta), incrementos)
+
+
+def registrar_costo(session: Session, operacion: Operacion, delta: float) -> None:
+    """Aplica un cambio del costo_total de la operación a sus resúmenes."""
+    if not delta:
+        return
+    incrementos = {"cantidad_operaciones": 0, "costo_total": delta}
+    _incrementar(session, ResumenEstado, {"estado": operacion.estado}, incrementos)
+    _incrementar(
+        session,
+        ResumenMes,
+        {"anio": operacion.fecha.year, "mes": operacion.fecha.month},
+        incrementos,
+    )
+    _incrementar(session, ResumenRuta, _clave_ruta(ruta_de(operacion)), incrementos)
+
+
+def registrar_detalle(
+    session: Session, producto_id: int, tipo: str, cantidad: float, valor: float
+) -> None:
+    """Aplica el cambio de cantidad y valor de un detalle al resumen por producto."""
+    if not cantidad and not valor:
+        return
+    _incrementar(
+        session,
+        ResumenProducto,
+        {"producto_id": producto_id, "tipo": tipo},
+        {"cantidad": cantidad, "valor": valor},
+    )
+
+
+def reconstruir_resumenes(session: Session) -> None:
+    """
+    Vacía y vuelve a calcular las tablas de resumen con consultas
+    INSERT ... SELECT agrupadas. No hace commit: lo decide quien llama.
+    """
+    for modelo in (ResumenEstado, ResumenMes, ResumenProducto, ResumenRuta):
+        session.exec(delete(modelo))
+
+    costo = func.coalesce(func.sum(Operacion.costo_total), 0.0)
+
+    session.exec(
+        insert(ResumenEstado).from_select(
+            ["estado", "cantidad_operaciones", "costo_total"],
+            select(Operacion.estado, func.count(Operacion.id), costo).group_by(
+                Operacion.estado
+            ),
+        )
+    )
+
+    anio = extract("year", Operacion.fecha)
+    mes = extract("month", Operacion.fecha)
+    session.exec(
+        insert(ResumenMes).from_select(
+            ["anio", "mes", "cantidad_operaciones", "costo_total"],
+            select(anio, mes, func.count(Operacion.id), costo).group_by(anio, mes),
+        )
+    )
+
+    origen = func.coalesce(Operacion.pais_origen_id, SIN_PAIS)
+    destino = func.coalesce(Operacion.pais_destino_id, SIN_PAIS)
+    session.exec(
+        insert(ResumenRuta).from_select(
+            ["pais_origen_id", "pais_destino_id", "cantidad_operaciones", "costo_total"],
+            select(origen, destino, func.count(Operacion.id), costo).group_by(origen, destino),
+        )
+    )
+
+    session.exec(
+        insert(ResumenProducto).from_select(
+            ["producto_id", "tipo", "cantidad", "valor"],
+            select(
+                DetalleOperacion.producto_id,
+                Operacion.tipo,
+                func.sum(DetalleOperacion.cantidad),
+                func.sum(DetalleOperacion.cantidad * DetalleOperacion.precio_unitario),
+            )
+            .join(Operacion, DetalleOperacion.operacion_id == Operacion.id)
+            .group_by(DetalleOperacion.producto_id, Operacion.tipo),
+        )
+    )
+
+
+def _vacia(session: Session, modelo) -> bool:
+    return session.exec(select(literal(1)).select_from(modelo).limit(1)).first() is None
+
+
+def asegurar_resumenes(session: Session) -> bool:
+    """
+    Reconstruye los resúmenes si a alguna tabla le faltan filas que los datos
+    sí tienen: base anterior a las tablas de resumen (create_all las crea
+    vacías) o cargada por fuera de la API. Los incrementos de registrar_*
+    se suman a lo que haya, así que sobre tablas vacías darían totales
+    equivocados. No hace commit. Devuelve si reconstruyó.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        # Varios workers arrancan a la vez: el primero reconstruye y los demás
+        # esperan su commit y ya encuentran las tablas con datos
+        tablas = ", ".join(
+            m.__tablename__ for m in (ResumenEstado, ResumenMes, ResumenProducto, ResumenRuta)
+        )
+        session.connection().execute(text(f"LOCK TABLE {tablas} IN SHARE ROW EXCLUSIVE MODE"))
+
+    # Toda operación suma en ResumenEstado, ResumenMes y ResumenRuta, y todo
+    # detalle en ResumenProducto; las filas en cero quedan, no se borran
+    faltan = (
+        not _vacia(session, Operacion)
+        and any(_vacia(session, m) for m in (ResumenEstado, ResumenMes, ResumenRuta))
+    ) or (not _vacia(session, DetalleOperacion) and _vacia(session, ResumenProducto))
+    if faltan:
+        reconstruir_resumenes(session)
+    return faltan
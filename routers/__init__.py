@@ -10,4 +10,5 @@ from . import (
     detalles_operacion,
     inspecciones_calidad,
     reportes,
+    archivos,
 )
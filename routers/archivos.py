@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+
+from database import get_session
+from etags import etag
+from models import ArchivoAlmacenado
+from schemas import ArchivoRead
+from supa.almacenamiento import almacenamiento
+from supa.miniaturas import urls_miniaturas
+
+router = APIRouter(prefix="/archivos", tags=["archivos"])
+
+
+@router.get(
+    "/{hash}",
+    response_model=ArchivoRead,
+    dependencies=[Depends(etag(ArchivoAlmacenado))],
+)
+def obtener_archivo(hash: str, session: Session = Depends(get_session)):
+    """
+    URL de un archivo subido (por su sha256) y de sus miniaturas, si es una
+    imagen. Las miniaturas aparecen cuando termina el trabajo que las genera.
+    """
+    archivo = session.get(ArchivoAlmacenado, hash)
+    if not archivo:
+        raise HTTPException(status_code=404, detail="El archivo no existe.")
+    return {
+        "hash": archivo.hash,
+        "url": almacenamiento().url(archivo.clave),
+        "bytes": archivo.bytes,
+        "tipo_contenido": archivo.tipo_contenido,
+        "miniaturas": urls_miniaturas(archivo.miniaturas),
+    }
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from typing import List
+from typing import Literal
 
 from database import get_session
+from etags import etag
+from paginacion import Paginacion, paginar
+from importacion import importar_catalogo
+from cache_catalogos import cache_de
 from models import CategoriaProducto
-from schemas import CategoriaProductoCreate, CategoriaProductoRead
+from schemas import CategoriaProductoCreate, CategoriaProductoRead, Pagina
 
 
 router = APIRouter(prefix="/categorias-producto", tags=["categorias_producto"])
@@ -16,16 +20,43 @@ def create_item(data: CategoriaProductoCreate, session: Session = Depends(get_se
     session.add(item)
     session.commit()
     session.refresh(item)
+    cache_de(CategoriaProducto).invalidar()
     return item
 
 
-@router.get("/", response_model=List[CategoriaProductoRead])
-def list_items(session: Session = Depends(get_session)):
+@router.post("/importar")
+async def importar_items(
+    request: Request, existentes: Literal["actualizar", "omitir"] = "actualizar"
+):
+    """
+    Alta masiva de categorías de producto desde un CSV (text/csv) o un arreglo JSON.
+    Cada fila se valida con CategoriaProductoCreate; las que ya existen (por nombre)
+    se actualizan u omiten según `existentes`.
+    """
+    return await importar_catalogo(request, "categorias_producto", CategoriaProductoCreate, existentes, modelo_cache=CategoriaProducto)
+
+
+@router.get(
+    "/",
+    response_model=Pagina[CategoriaProductoRead],
+    dependencies=[Depends(etag(CategoriaProducto))],
+)
+def list_items(
+    pagina: Paginacion = Depends(),
+    session: Session = Depends(get_session),
+):
     statement = select(CategoriaProducto)
-    return session.exec(statement).all()
+    clave = ("lista", pagina.after_id, pagina.limit)
+    return cache_de(CategoriaProducto).obtener(
+        clave, lambda: paginar(session, statement, CategoriaProducto, pagina, CategoriaProductoRead)
+    )
 
 
-@router.get("/{item_id}", response_model=CategoriaProductoRead)
+@router.get(
+    "/{item_id}",
+    response_model=CategoriaProductoRead,
+    dependencies=[Depends(etag(CategoriaProducto))],
+)
 def get_item(item_id: int, session: Session = Depends(get_session)):
     item = session.get(CategoriaProducto, item_id)
     if not item:
@@ -42,6 +73,7 @@ def update_item(item_id: int, data: CategoriaProductoCreate, session: Session =
         setattr(item, k, v)
     session.commit()
     session.refresh(item)
+    cache_de(CategoriaProducto).invalidar()
     return item
 
 
@@ -52,4 +84,5 @@ def delete_item(item_id: int, session: Session = Depends(get_session)):
         raise HTTPException(404, "CategoriaProducto no encontrado")
     session.delete(item)
     session.commit()
+    cache_de(CategoriaProducto).invalidar()
     return {"message": "CategoriaProducto eliminado correctamente"}
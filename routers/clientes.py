@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from typing import List
+from typing import Optional, Literal
 
 from database import get_session
+from etags import etag
+from paginacion import Paginacion, paginar
+from importacion import importar_catalogo
 from models import Cliente
-from schemas import ClienteCreate, ClienteRead
+from schemas import ClienteCreate, ClienteRead, Pagina
 
 router = APIRouter(prefix="/clientes", tags=["clientes"])
 
@@ -18,13 +21,35 @@ def create_item(data: ClienteCreate, session: Session = Depends(get_session)):
     return item
 
 
-@router.get("/", response_model=List[ClienteRead])
-def list_items(session: Session = Depends(get_session)):
+@router.post("/importar")
+async def importar_items(
+    request: Request, existentes: Literal["actualizar", "omitir"] = "actualizar"
+):
+    """
+    Alta masiva de clientes desde un CSV (text/csv) o un arreglo JSON.
+    Cada fila se valida con ClienteCreate; las que ya existen (por nombre)
+    se actualizan u omiten según `existentes`. La columna `pais` (código ISO) se
+    puede usar en lugar de pais_id.
+    """
+    return await importar_catalogo(request, "clientes", ClienteCreate, existentes)
+
+
+@router.get("/", response_model=Pagina[ClienteRead], dependencies=[Depends(etag(Cliente))])
+def list_items(
+    tipo: Optional[str] = None,
+    pais_id: Optional[int] = None,
+    pagina: Paginacion = Depends(),
+    session: Session = Depends(get_session),
+):
     statement = select(Cliente)
-    return session.exec(statement).all()
+    if tipo is not None:
+        statement = statement.where(Cliente.tipo == tipo)
+    if pais_id is not None:
+        statement = statement.where(Cliente.pais_id == pais_id)
+    return paginar(session, statement, Cliente, pagina, ClienteRead)
 
 
-@router.get("/{item_id}", response_model=ClienteRead)
+@router.get("/{item_id}", response_model=ClienteRead, dependencies=[Depends(etag(Cliente))])
 def get_item(item_id: int, session: Session = Depends(get_session)):
     item = session.get(Cliente, item_id)
     if not item:
@@ -1,22 +1,87 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
+from sqlmodel import Session, select, func, update
+from typing import Optional
+from datetime import date
 
 from database import get_session
-from models import DetalleOperacion, Producto, Operacion
-from schemas import DetalleOperacionCreate, DetalleOperacionRead
+from etags import etag
+import inventario
+import resumenes
+from paginacion import Paginacion, paginar
+from expansion import relaciones, parametro_expand, expandir
+from exportacion import FormatoExportacion, respuesta_exportacion
+from models import DetalleOperacion, Producto, Operacion, Cliente, Proveedor
+from schemas import (
+    DetalleOperacionCreate,
+    DetalleOperacionRead,
+    DetalleOperacionExpandidaRead,
+    OperacionRead,
+    ProductoRead,
+    Pagina,
+)
 
 router = APIRouter(prefix="/detalles-operacion", tags=["detalles_operacion"])
 
+EXPANSIONES = relaciones(DetalleOperacion, operacion=OperacionRead, producto=ProductoRead)
+
 
 # ----------------------------------------------------
 #   FUNCIONES AUXILIARES: STOCK + COSTO TOTAL
 # ----------------------------------------------------
+def mover_stock(
+    session: Session,
+    producto: Producto,
+    delta: float,
+    motivo: str,
+    operacion: Optional[Operacion] = None,
+    detalle: Optional[DetalleOperacion] = None,
+) -> bool:
+    """
+    Suma `delta` al stock con un UPDATE atómico en la transacción en curso.
+    Si delta es negativo, la condición `stock_disponible >= -delta` va en el
+    WHERE: dos exportaciones concurrentes no pueden vender el mismo stock y
+    no hace falta bloquear la fila antes de validar. Devuelve False si no
+    había stock suficiente (no se modificó nada).
+
+    Si el stock se movió, agrega el movimiento al libro (inventario.py) en la
+    misma transacción.
+    """
+    if not delta:
+        return True
+    statement = (
+        update(Producto)
+        .where(Producto.id == producto.id)
+        .values(stock_disponible=Producto.stock_disponible + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if delta < 0:
+        statement = statement.where(Producto.stock_disponible >= -delta)
+    movido = session.exec(statement).rowcount == 1
+    # El valor en memoria quedó desactualizado; se relee si se vuelve a usar
+    session.expire(producto, ["stock_disponible"])
+    if movido:
+        # El UPDATE hizo autoflush: la operación y el detalle ya tienen id
+        inventario.registrar_movimiento(
+            session,
+            producto.id,
+            delta,
+            motivo,
+            operacion_id=operacion.id if operacion else None,
+            detalle_id=detalle.id if detalle else None,
+        )
+    return movido
+
+
 def ajustar_stock_creacion(
-    session: Session, operacion: Operacion, producto: Producto, cantidad: float
+    session: Session,
+    operacion: Operacion,
+    producto: Producto,
+    cantidad: float,
+    detalle: Optional[DetalleOperacion] = None,
 ) -> None:
+    movimiento = {"operacion": operacion, "detalle": detalle}
     if operacion.tipo == "exportacion":
-        if cantidad > producto.stock_disponible:
+        if not mover_stock(session, producto, -cantidad, "detalle_creado", **movimiento):
             raise HTTPException(
                 status_code=400,
                 detail=(
@@ -24,12 +89,9 @@ def ajustar_stock_creacion(
                     f"{producto.nombre}. Stock disponible: {producto.stock_disponible}."
                 ),
             )
-        producto.stock_disponible -= cantidad
 
     elif operacion.tipo == "importacion":
-        producto.stock_disponible += cantidad
-
-    session.add(producto)
+        mover_stock(session, producto, cantidad, "detalle_creado", **movimiento)
 
 
 def ajustar_stock_actualizacion(
@@ -38,12 +100,14 @@ def ajustar_stock_actualizacion(
     producto: Producto,
     cantidad_anterior: float,
     cantidad_nueva: float,
+    detalle: Optional[DetalleOperacion] = None,
 ) -> None:
     diferencia = cantidad_nueva - cantidad_anterior
+    movimiento = {"operacion": operacion, "detalle": detalle}
 
     if operacion.tipo == "exportacion":
         # Si diferencia > 0, estamos exportando MÁS cantidad
-        if diferencia > 0 and diferencia > producto.stock_disponible:
+        if not mover_stock(session, producto, -diferencia, "detalle_modificado", **movimiento):
             raise HTTPException(
                 status_code=400,
                 detail=(
@@ -51,32 +115,30 @@ def ajustar_stock_actualizacion(
                     f"Stock disponible: {producto.stock_disponible}."
                 ),
             )
-        producto.stock_disponible -= diferencia
 
     elif operacion.tipo == "importacion":
         # Si diferencia > 0, entra más stock; si < 0, corregimos restando
-        producto.stock_disponible += diferencia
-
-    if producto.stock_disponible < 0:
-        # Por seguridad, nunca debería pasar
-        raise HTTPException(
-            status_code=400,
-            detail="El ajuste de stock dejaría el inventario en negativo.",
-        )
-
-    session.add(producto)
+        if not mover_stock(session, producto, diferencia, "detalle_modificado", **movimiento):
+            raise HTTPException(
+                status_code=400,
+                detail="El ajuste de stock dejaría el inventario en negativo.",
+            )
 
 
 def ajustar_stock_eliminacion(
-    session: Session, operacion: Operacion, producto: Producto, cantidad: float
+    session: Session,
+    operacion: Operacion,
+    producto: Producto,
+    cantidad: float,
+    detalle: Optional[DetalleOperacion] = None,
 ) -> None:
+    movimiento = {"operacion": operacion, "detalle": detalle}
     if operacion.tipo == "exportacion":
         # Si se elimina un detalle de exportación, devolvemos stock
-        producto.stock_disponible += cantidad
+        mover_stock(session, producto, cantidad, "detalle_eliminado", **movimiento)
     elif operacion.tipo == "importacion":
         # Si se elimina una importación, restamos ese stock
-        producto.stock_disponible -= cantidad
-        if producto.stock_disponible < 0:
+        if not mover_stock(session, producto, -cantidad, "detalle_eliminado", **movimiento):
             raise HTTPException(
                 status_code=400,
                 detail=(
@@ -84,22 +146,41 @@ def ajustar_stock_eliminacion(
                 ),
             )
 
-    session.add(producto)
 
+def ajustar_costo_total(session: Session, operacion: Operacion, delta: float) -> None:
+    """
+    Suma `delta` (subtotal nuevo - subtotal anterior) al costo_total de la
+    operación dentro de la misma transacción que escribe el detalle.
+    Se asigna una expresión SQL para que el incremento lo haga la base de
+    datos y dos escrituras concurrentes no se pisen.
+    """
+    if not delta:
+        return
+    operacion.costo_total = func.coalesce(Operacion.costo_total, 0) + delta
+    session.add(operacion)
+    resumenes.registrar_costo(session, operacion, delta)
 
-def recalcular_costo_total(session: Session, operacion_id: int) -> None:
-    detalles = session.exec(
-        select(DetalleOperacion).where(DetalleOperacion.operacion_id == operacion_id)
-    ).all()
-
-    total = sum(d.cantidad * d.precio_unitario for d in detalles)
 
-    operacion = session.get(Operacion, operacion_id)
-    if operacion:
-        operacion.costo_total = float(total) if total else 0.0
-        session.add(operacion)
-        session.commit()
-        session.refresh(operacion)
+def reconstruir_costos_totales(session: Session) -> int:
+    """
+    Recalcula el costo_total de todas las operaciones con una sola
+    sentencia UPDATE basada en conjuntos. Devuelve cuántas filas se actualizaron.
+    """
+    subtotal = (
+        select(
+            func.coalesce(
+                func.sum(DetalleOperacion.cantidad * DetalleOperacion.precio_unitario),
+                0.0,
+            )
+        )
+        .where(DetalleOperacion.operacion_id == Operacion.id)
+        .scalar_subquery()
+    )
+    result = session.exec(update(Operacion).values(costo_total=subtotal))
+    # Los resúmenes por estado/mes dependen del costo_total
+    resumenes.reconstruir_resumenes(session)
+    session.commit()
+    return result.rowcount
 
 
 # ----------------------------------------------------
@@ -121,9 +202,6 @@ def create_detalle(
             status_code=404, detail="El producto asociado no existe."
         )
 
-    # Ajustar stock según tipo (import/export)
-    ajustar_stock_creacion(session, operacion, producto, data.cantidad)
-
     detalle = DetalleOperacion(
         producto_id=data.producto_id,
         operacion_id=data.operacion_id,
@@ -131,22 +209,123 @@ def create_detalle(
         precio_unitario=data.precio_unitario,
     )
 
+    # El costo total y los resúmenes se actualizan en la misma transacción que el detalle
+    subtotal = data.cantidad * data.precio_unitario
+    ajustar_costo_total(session, operacion, subtotal)
+    resumenes.registrar_detalle(
+        session, producto.id, operacion.tipo, data.cantidad, subtotal
+    )
+
     session.add(detalle)
+
+    # Ajustar stock según tipo (import/export). Va al final, justo antes del
+    # commit, para que el lock de escritura dure lo menos posible.
+    ajustar_stock_creacion(session, operacion, producto, data.cantidad, detalle)
+
     session.commit()
     session.refresh(detalle)
 
-    # Recalcular costo total de la operación
-    recalcular_costo_total(session, data.operacion_id)
-
     return detalle
 
 
-@router.get("/", response_model=List[DetalleOperacionRead])
-def list_detalles(session: Session = Depends(get_session)):
-    return session.exec(select(DetalleOperacion)).all()
+@router.get(
+    "/",
+    response_model=Pagina[DetalleOperacionExpandidaRead],
+    response_model_exclude_unset=True,
+    dependencies=[Depends(etag(DetalleOperacion, expansiones=EXPANSIONES))],
+)
+def list_detalles(
+    operacion_id: Optional[int] = None,
+    producto_id: Optional[int] = None,
+    pagina: Paginacion = Depends(),
+    expand: list = Depends(parametro_expand(EXPANSIONES)),
+    session: Session = Depends(get_session),
+):
+    statement = select(DetalleOperacion)
+    if operacion_id is not None:
+        statement = statement.where(DetalleOperacion.operacion_id == operacion_id)
+    if producto_id is not None:
+        statement = statement.where(DetalleOperacion.producto_id == producto_id)
+    resultado = paginar(session, statement, DetalleOperacion, pagina, DetalleOperacionRead)
+    return expandir(session, resultado, EXPANSIONES, expand)
+
+
+def consulta_exportacion(
+    incluir_nombres: bool = False,
+    operacion_id: Optional[int] = None,
+    producto_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    estado: Optional[str] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+):
+    """Select de la exportación de detalles (también lo usan los trabajos de reportes)."""
+    statement = select(
+        DetalleOperacion.id,
+        DetalleOperacion.operacion_id,
+        DetalleOperacion.producto_id,
+        DetalleOperacion.cantidad,
+        DetalleOperacion.precio_unitario,
+        (DetalleOperacion.cantidad * DetalleOperacion.precio_unitario).label("subtotal"),
+        Operacion.fecha,
+        Operacion.tipo,
+        Operacion.estado,
+    ).join(Operacion, DetalleOperacion.operacion_id == Operacion.id)
+    if incluir_nombres:
+        statement = (
+            statement.add_columns(
+                Producto.nombre.label("producto_nombre"),
+                Cliente.nombre.label("cliente_nombre"),
+                Proveedor.nombre.label("proveedor_nombre"),
+            )
+            .join(Producto, DetalleOperacion.producto_id == Producto.id)
+            .outerjoin(Cliente, Operacion.cliente_id == Cliente.id)
+            .outerjoin(Proveedor, Operacion.proveedor_id == Proveedor.id)
+        )
+
+    if operacion_id is not None:
+        statement = statement.where(DetalleOperacion.operacion_id == operacion_id)
+    if producto_id is not None:
+        statement = statement.where(DetalleOperacion.producto_id == producto_id)
+    if tipo is not None:
+        statement = statement.where(Operacion.tipo == tipo)
+    if estado is not None:
+        statement = statement.where(Operacion.estado == estado)
+    if fecha_desde is not None:
+        statement = statement.where(Operacion.fecha >= fecha_desde)
+    if fecha_hasta is not None:
+        statement = statement.where(Operacion.fecha <= fecha_hasta)
+    return statement.order_by(DetalleOperacion.id)
+
+
+@router.get("/export")
+def export_detalles(
+    formato: FormatoExportacion = "csv",
+    incluir_nombres: bool = False,
+    operacion_id: Optional[int] = None,
+    producto_id: Optional[int] = None,
+    tipo: Optional[str] = None,
+    estado: Optional[str] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+):
+    """
+    Exporta los detalles junto con la fecha, tipo y estado de su operación
+    (ya unidos, sin cruzar archivos), en CSV o NDJSON y en streaming.
+    Con incluir_nombres agrega los nombres de producto, cliente y proveedor.
+    Para rangos muy grandes, mejor como trabajo: POST /reportes/jobs.
+    """
+    statement = consulta_exportacion(
+        incluir_nombres, operacion_id, producto_id, tipo, estado, fecha_desde, fecha_hasta
+    )
+    return respuesta_exportacion(statement, formato, "detalles_operacion")
 
 
-@router.get("/{detalle_id}", response_model=DetalleOperacionRead)
+@router.get(
+    "/{detalle_id}",
+    response_model=DetalleOperacionRead,
+    dependencies=[Depends(etag(DetalleOperacion))],
+)
 def get_detalle(detalle_id: int, session: Session = Depends(get_session)):
     detalle = session.get(DetalleOperacion, detalle_id)
     if not detalle:
@@ -174,24 +353,36 @@ def update_detalle(
             detail="La operación o el producto asociados al detalle no existen.",
         )
 
-    # Ajuste de stock según diferencia de cantidades
+    cantidad_anterior = detalle.cantidad
+    delta_valor = (
+        data.cantidad * data.precio_unitario - detalle.cantidad * detalle.precio_unitario
+    )
+    ajustar_costo_total(session, operacion, delta_valor)
+    resumenes.registrar_detalle(
+        session,
+        producto.id,
+        operacion.tipo,
+        data.cantidad - detalle.cantidad,
+        delta_valor,
+    )
+
+    detalle.cantidad = data.cantidad
+    detalle.precio_unitario = data.precio_unitario
+    session.add(detalle)
+
+    # Ajuste de stock según diferencia de cantidades (al final, ver create_detalle)
     ajustar_stock_actualizacion(
         session,
         operacion,
         producto,
-        cantidad_anterior=detalle.cantidad,
+        cantidad_anterior=cantidad_anterior,
         cantidad_nueva=data.cantidad,
+        detalle=detalle,
     )
 
-    detalle.cantidad = data.cantidad
-    detalle.precio_unitario = data.precio_unitario
-
-    session.add(detalle)
     session.commit()
     session.refresh(detalle)
 
-    recalcular_costo_total(session, detalle.operacion_id)
-
     return detalle
 
 
@@ -209,15 +400,16 @@ def delete_detalle(detalle_id: int, session: Session = Depends(get_session)):
             detail="La operación o el producto asociados al detalle no existen.",
         )
 
-    # Revertir impacto en stock
-    ajustar_stock_eliminacion(session, operacion, producto, detalle.cantidad)
-
-    operacion_id = detalle.operacion_id
+    # Revertir impacto en el costo total y en stock (stock al final, ver create_detalle)
+    cantidad = detalle.cantidad
+    subtotal = cantidad * detalle.precio_unitario
+    ajustar_costo_total(session, operacion, -subtotal)
+    resumenes.registrar_detalle(
+        session, producto.id, operacion.tipo, -cantidad, -subtotal
+    )
 
     session.delete(detalle)
+    ajustar_stock_eliminacion(session, operacion, producto, cantidad, detalle)
     session.commit()
 
-    # Recalcular costo total
-    recalcular_costo_total(session, operacion_id)
-
     return {"message": "Detalle eliminado correctamente."}
@@ -1,13 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
-from typing import List
+from typing import Optional
+from datetime import date
 
 from database import get_session
+from etags import etag
+from paginacion import Paginacion, paginar
+from expansion import relaciones, parametro_expand, expandir
 from models import InspeccionCalidad
-from schemas import InspeccionCalidadCreate, InspeccionCalidadRead
+from schemas import (
+    InspeccionCalidadCreate,
+    InspeccionCalidadRead,
+    InspeccionCalidadExpandidaRead,
+    OperacionRead,
+    ProductoRead,
+    Pagina,
+)
 
 router = APIRouter(prefix="/inspecciones-calidad", tags=["inspecciones_calidad"])
 
+EXPANSIONES = relaciones(InspeccionCalidad, operacion=OperacionRead, producto=ProductoRead)
+
 
 @router.post("/", response_model=InspeccionCalidadRead)
 def create_item(data: InspeccionCalidadCreate, session: Session = Depends(get_session)):
@@ -18,13 +31,42 @@ def create_item(data: InspeccionCalidadCreate, session: Session = Depends(get_se
     return item
 
 
-@router.get("/", response_model=List[InspeccionCalidadRead])
-def list_items(session: Session = Depends(get_session)):
+@router.get(
+    "/",
+    response_model=Pagina[InspeccionCalidadExpandidaRead],
+    response_model_exclude_unset=True,
+    dependencies=[Depends(etag(InspeccionCalidad, expansiones=EXPANSIONES))],
+)
+def list_items(
+    resultado: Optional[str] = None,
+    operacion_id: Optional[int] = None,
+    producto_id: Optional[int] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    pagina: Paginacion = Depends(),
+    expand: list = Depends(parametro_expand(EXPANSIONES)),
+    session: Session = Depends(get_session),
+):
     statement = select(InspeccionCalidad)
-    return session.exec(statement).all()
+    if resultado is not None:
+        statement = statement.where(InspeccionCalidad.resultado == resultado)
+    if operacion_id is not None:
+        statement = statement.where(InspeccionCalidad.operacion_id == operacion_id)
+    if producto_id is not None:
+        statement = statement.where(InspeccionCalidad.producto_id == producto_id)
+    if fecha_desde is not None:
+        statement = statement.where(InspeccionCalidad.fecha >= fecha_desde)
+    if fecha_hasta is not None:
+        statement = statement.where(InspeccionCalidad.fecha <= fecha_hasta)
+    resultado = paginar(session, statement, InspeccionCalidad, pagina, InspeccionCalidadRead)
+    return expandir(session, resultado, EXPANSIONES, expand)
 
 
-@router.get("/{item_id}", response_model=InspeccionCalidadRead)
+@router.get(
+    "/{item_id}",
+    response_model=InspeccionCalidadRead,
+    dependencies=[Depends(etag(InspeccionCalidad))],
+)
 def get_item(item_id: int, session: Session = Depends(get_session)):
     item = session.get(InspeccionCalidad, item_id)
     if not item:
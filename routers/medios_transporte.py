@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from typing import List
+from typing import Optional, Literal
 
 from database import get_session
+from etags import etag
+from paginacion import Paginacion, paginar
+from importacion import importar_catalogo
+from cache_catalogos import cache_de
 from models import MedioTransporte
-from schemas import MedioTransporteCreate, MedioTransporteRead
+from schemas import MedioTransporteCreate, MedioTransporteRead, Pagina
 
 router = APIRouter(prefix="/medios-transporte", tags=["medios_transporte"])
 
@@ -15,16 +19,46 @@ def create_item(data: MedioTransporteCreate, session: Session = Depends(get_sess
     session.add(item)
     session.commit()
     session.refresh(item)
+    cache_de(MedioTransporte).invalidar()
     return item
 
 
-@router.get("/", response_model=List[MedioTransporteRead])
-def list_items(session: Session = Depends(get_session)):
+@router.post("/importar")
+async def importar_items(
+    request: Request, existentes: Literal["actualizar", "omitir"] = "actualizar"
+):
+    """
+    Alta masiva de medios de transporte desde un CSV (text/csv) o un arreglo JSON.
+    Cada fila se valida con MedioTransporteCreate; las que ya existen (por empresa)
+    se actualizan u omiten según `existentes`.
+    """
+    return await importar_catalogo(request, "medios_transporte", MedioTransporteCreate, existentes, modelo_cache=MedioTransporte)
+
+
+@router.get(
+    "/",
+    response_model=Pagina[MedioTransporteRead],
+    dependencies=[Depends(etag(MedioTransporte))],
+)
+def list_items(
+    tipo: Optional[str] = None,
+    pagina: Paginacion = Depends(),
+    session: Session = Depends(get_session),
+):
     statement = select(MedioTransporte)
-    return session.exec(statement).all()
+    if tipo is not None:
+        statement = statement.where(MedioTransporte.tipo == tipo)
+    clave = ("lista", tipo, pagina.after_id, pagina.limit)
+    return cache_de(MedioTransporte).obtener(
+        clave, lambda: paginar(session, statement, MedioTransporte, pagina, MedioTransporteRead)
+    )
 
 
-@router.get("/{item_id}", response_model=MedioTransporteRead)
+@router.get(
+    "/{item_id}",
+    response_model=MedioTransporteRead,
+    dependencies=[Depends(etag(MedioTransporte))],
+)
 def get_item(item_id: int, session: Session = Depends(get_session)):
     item = session.get(MedioTransporte, item_id)
     if not item:
@@ -41,6 +75,7 @@ def update_item(item_id: int, data: MedioTransporteCreate, session: Session = De
         setattr(item, k, v)
     session.commit()
     session.refresh(item)
+    cache_de(MedioTransporte).invalidar()
     return item
 
 
@@ -51,4 +86,5 @@ def delete_item(item_id: int, session: Session = Depends(get_session)):
         raise HTTPException(404, "MedioTransporte no encontrado")
     session.delete(item)
     session.commit()
+    cache_de(MedioTransporte).invalidar()
     return {"message": "MedioTransporte eliminado correctamente"}
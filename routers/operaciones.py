@@ -1,17 +1,125 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlmodel import Session, select, exists, literal, union_all
+from typing import Optional
+from datetime import date
 
 from database import get_session
-from models import Operacion, Cliente, Proveedor, Puerto, Pais, DetalleOperacion
-from schemas import OperacionCreate, OperacionRead
+from etags import etag
+import resumenes
+from paginacion import Paginacion, paginar
+from expansion import relaciones, parametro_expand, expandir
+from exportacion import FormatoExportacion, respuesta_exportacion
+from cache_catalogos import cache_de
+from models import (
+    Operacion,
+    Cliente,
+    Proveedor,
+    Puerto,
+    Pais,
+    DetalleOperacion,
+    Producto,
+    MedioTransporte,
+    InspeccionCalidad,
+)
+from schemas import (
+    OperacionCreate,
+    OperacionRead,
+    OperacionConDetallesCreate,
+    OperacionConDetallesRead,
+    OperacionCompletaRead,
+    OperacionExpandidaRead,
+    ClienteRead,
+    ProveedorRead,
+    PaisRead,
+    PuertoRead,
+    MedioTransporteRead,
+    Pagina,
+)
+from routers.detalles_operacion import ajustar_stock_creacion, reconstruir_costos_totales
 
 router = APIRouter(prefix="/operaciones", tags=["operaciones"])
 
+EXPANSIONES = relaciones(
+    Operacion,
+    cliente=ClienteRead,
+    proveedor=ProveedorRead,
+    pais_origen=PaisRead,
+    pais_destino=PaisRead,
+    puerto_origen=PuertoRead,
+    puerto_destino=PuertoRead,
+    medio_transporte=MedioTransporteRead,
+)
+
 
 # ----------------------------------------------------
 #   VALIDACIONES DE RELACIONES Y REGLAS DE NEGOCIO
 # ----------------------------------------------------
+def cargar_referencias_operacion(data: OperacionCreate, session: Session) -> dict:
+    """
+    Resuelve todos los ids referenciados por la operación. Países y puertos
+    se buscan primero en el cache de catálogos; lo que falte (y siempre
+    cliente/proveedor) se consulta en una sola consulta UNION ALL.
+    Devuelve {(tabla, id): pais_id}; para los países el valor es el propio id.
+    Si un id no aparece en el diccionario, no existe.
+    """
+    referencias = {}
+    consultas = []
+    if data.cliente_id is not None:
+        consultas.append(
+            select(literal("cliente"), Cliente.id, Cliente.pais_id).where(
+                Cliente.id == data.cliente_id
+            )
+        )
+    if data.proveedor_id is not None:
+        consultas.append(
+            select(literal("proveedor"), Proveedor.id, Proveedor.pais_id).where(
+                Proveedor.id == data.proveedor_id
+            )
+        )
+
+    catalogos = {"pais": (Pais, Pais.id), "puerto": (Puerto, Puerto.pais_id)}
+    ids_por_catalogo = {
+        "pais": {i for i in (data.pais_origen_id, data.pais_destino_id) if i is not None},
+        "puerto": {
+            i for i in (data.puerto_origen_id, data.puerto_destino_id) if i is not None
+        },
+    }
+    generaciones = {}
+    for tabla, (modelo, columna_pais) in catalogos.items():
+        cache = cache_de(modelo)
+        generaciones[tabla] = cache.generacion
+        pendientes = set()
+        for id_ in ids_por_catalogo[tabla]:
+            pais_id = cache.buscar(("ref", id_))
+            if pais_id is not None:
+                referencias[(tabla, id_)] = pais_id
+            else:
+                pendientes.add(id_)
+        if pendientes:
+            consultas.append(
+                select(literal(tabla), modelo.id, columna_pais).where(
+                    modelo.id.in_(pendientes)
+                )
+            )
+
+    if not consultas:
+        return referencias
+
+    filas = session.exec(union_all(*consultas)).all()
+    for tabla, id_, pais_id in filas:
+        referencias[(tabla, id_)] = pais_id
+        if tabla in catalogos:
+            cache_de(catalogos[tabla][0]).guardar(("ref", id_), pais_id, generaciones[tabla])
+    return referencias
+
+
+def operacion_tiene_detalles(session: Session, operacion_id: int) -> bool:
+    return session.exec(
+        select(exists().where(DetalleOperacion.operacion_id == operacion_id))
+    ).one()
+
+
 def validar_relaciones_operacion(data: OperacionCreate, session: Session) -> None:
     # Reglas según tipo de operación
     if data.tipo == "exportacion" and not data.cliente_id:
@@ -26,28 +134,29 @@ def validar_relaciones_operacion(data: OperacionCreate, session: Session) -> Non
             detail="Las operaciones de importación deben tener un proveedor asociado.",
         )
 
+    referencias = cargar_referencias_operacion(data, session)
+
     # Cliente
-    cliente = None
-    if data.cliente_id is not None:
-        cliente = session.get(Cliente, data.cliente_id)
-        if not cliente:
-            raise HTTPException(
-                status_code=404,
-                detail=f"El cliente con id {data.cliente_id} no existe.",
-            )
+    if data.cliente_id is not None and ("cliente", data.cliente_id) not in referencias:
+        raise HTTPException(
+            status_code=404,
+            detail=f"El cliente con id {data.cliente_id} no existe.",
+        )
 
     # Proveedor
-    proveedor = None
-    if data.proveedor_id is not None:
-        proveedor = session.get(Proveedor, data.proveedor_id)
-        if not proveedor:
-            raise HTTPException(
-                status_code=404,
-                detail=f"El proveedor con id {data.proveedor_id} no existe.",
-            )
+    if data.proveedor_id is not None and ("proveedor", data.proveedor_id) not in referencias:
+        raise HTTPException(
+            status_code=404,
+            detail=f"El proveedor con id {data.proveedor_id} no existe.",
+        )
 
     # Cliente y proveedor no pueden ser del mismo país (si ambos existen)
-    if cliente and proveedor and cliente.pais_id == proveedor.pais_id:
+    if (
+        data.cliente_id is not None
+        and data.proveedor_id is not None
+        and referencias[("cliente", data.cliente_id)]
+        == referencias[("proveedor", data.proveedor_id)]
+    ):
         raise HTTPException(
             status_code=400,
             detail=(
@@ -58,14 +167,14 @@ def validar_relaciones_operacion(data: OperacionCreate, session: Session) -> Non
 
     # País origen / destino
     if data.pais_origen_id is not None:
-        if not session.get(Pais, data.pais_origen_id):
+        if ("pais", data.pais_origen_id) not in referencias:
             raise HTTPException(
                 status_code=404,
                 detail=f"El país de origen con id {data.pais_origen_id} no existe.",
             )
 
     if data.pais_destino_id is not None:
-        if not session.get(Pais, data.pais_destino_id):
+        if ("pais", data.pais_destino_id) not in referencias:
             raise HTTPException(
                 status_code=404,
                 detail=f"El país de destino con id {data.pais_destino_id} no existe.",
@@ -89,13 +198,12 @@ def validar_relaciones_operacion(data: OperacionCreate, session: Session) -> Non
 
     # Puerto origen
     if data.puerto_origen_id is not None and data.pais_origen_id is not None:
-        puerto_origen = session.get(Puerto, data.puerto_origen_id)
-        if not puerto_origen:
+        if ("puerto", data.puerto_origen_id) not in referencias:
             raise HTTPException(
                 status_code=404,
                 detail=f"El puerto de origen con id {data.puerto_origen_id} no existe.",
             )
-        if puerto_origen.pais_id != data.pais_origen_id:
+        if referencias[("puerto", data.puerto_origen_id)] != data.pais_origen_id:
             raise HTTPException(
                 status_code=400,
                 detail="El puerto de origen no pertenece al país de origen.",
@@ -103,13 +211,12 @@ def validar_relaciones_operacion(data: OperacionCreate, session: Session) -> Non
 
     # Puerto destino
     if data.puerto_destino_id is not None and data.pais_destino_id is not None:
-        puerto_destino = session.get(Puerto, data.puerto_destino_id)
-        if not puerto_destino:
+        if ("puerto", data.puerto_destino_id) not in referencias:
             raise HTTPException(
                 status_code=404,
                 detail=f"El puerto de destino con id {data.puerto_destino_id} no existe.",
             )
-        if puerto_destino.pais_id != data.pais_destino_id:
+        if referencias[("puerto", data.puerto_destino_id)] != data.pais_destino_id:
             raise HTTPException(
                 status_code=400,
                 detail="El puerto de destino no pertenece al país de destino.",
@@ -129,17 +236,193 @@ def create_operacion(data: OperacionCreate, session: Session = Depends(get_sessi
     operacion.costo_total = 0.0  # se actualizará con los detalles
 
     session.add(operacion)
+    resumenes.registrar_operacion(
+        session, operacion.estado, operacion.fecha, 1, 0.0, ruta=resumenes.ruta_de(operacion)
+    )
     session.commit()
     session.refresh(operacion)
     return operacion
 
 
-@router.get("/", response_model=List[OperacionRead])
-def list_operaciones(session: Session = Depends(get_session)):
-    return session.exec(select(Operacion)).all()
+@router.post("/con-detalles", response_model=OperacionConDetallesRead)
+def create_operacion_con_detalles(
+    data: OperacionConDetallesCreate, session: Session = Depends(get_session)
+):
+    """
+    Crea la operación y todos sus detalles en una sola transacción:
+    valida una vez, ajusta el stock de cada producto una sola vez
+    y calcula el costo_total en memoria.
+    """
+    validar_relaciones_operacion(data, session)
+
+    # Cargamos todos los productos referenciados en una sola consulta
+    producto_ids = {d.producto_id for d in data.detalles}
+    productos = {
+        p.id: p
+        for p in session.exec(select(Producto).where(Producto.id.in_(producto_ids))).all()
+    }
+    for producto_id in producto_ids:
+        if producto_id not in productos:
+            raise HTTPException(
+                status_code=404,
+                detail=f"El producto con id {producto_id} no existe.",
+            )
 
+    payload = data.dict(exclude={"costo_total", "detalles"})
+    operacion = Operacion(**payload)
+
+    # Si un producto aparece en varias líneas, el stock se valida con la suma
+    cantidades = {}
+    valores = {}
+    for d in data.detalles:
+        cantidades[d.producto_id] = cantidades.get(d.producto_id, 0) + d.cantidad
+        valores[d.producto_id] = (
+            valores.get(d.producto_id, 0) + d.cantidad * d.precio_unitario
+        )
+    for producto_id, cantidad in cantidades.items():
+        resumenes.registrar_detalle(
+            session, producto_id, operacion.tipo, cantidad, valores[producto_id]
+        )
 
-@router.get("/{operacion_id}", response_model=OperacionRead)
+    operacion.detalles = [
+        DetalleOperacion(
+            producto_id=d.producto_id,
+            cantidad=d.cantidad,
+            precio_unitario=d.precio_unitario,
+        )
+        for d in data.detalles
+    ]
+    operacion.costo_total = float(sum(valores.values()))
+
+    session.add(operacion)
+    resumenes.registrar_operacion(
+        session,
+        operacion.estado,
+        operacion.fecha,
+        1,
+        operacion.costo_total,
+        ruta=resumenes.ruta_de(operacion),
+    )
+
+    # El stock se mueve al final, justo antes del commit (ver create_detalle)
+    for producto_id, cantidad in cantidades.items():
+        ajustar_stock_creacion(session, operacion, productos[producto_id], cantidad)
+    session.commit()
+    session.refresh(operacion)
+    return operacion
+
+
+@router.post("/costo-total/reconstruir")
+def reconstruir_costo_total(session: Session = Depends(get_session)):
+    """
+    Tarea administrativa: recalcula el costo_total de todas las operaciones
+    a partir de sus detalles con una sola consulta.
+    """
+    actualizadas = reconstruir_costos_totales(session)
+    return {"operaciones_actualizadas": actualizadas}
+
+
+def filtrar_operaciones(
+    statement,
+    tipo: Optional[str] = None,
+    estado: Optional[str] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    cliente_id: Optional[int] = None,
+    proveedor_id: Optional[int] = None,
+):
+    """Filtros comunes del listado y de la exportación de operaciones."""
+    if tipo is not None:
+        statement = statement.where(Operacion.tipo == tipo)
+    if estado is not None:
+        statement = statement.where(Operacion.estado == estado)
+    if fecha_desde is not None:
+        statement = statement.where(Operacion.fecha >= fecha_desde)
+    if fecha_hasta is not None:
+        statement = statement.where(Operacion.fecha <= fecha_hasta)
+    if cliente_id is not None:
+        statement = statement.where(Operacion.cliente_id == cliente_id)
+    if proveedor_id is not None:
+        statement = statement.where(Operacion.proveedor_id == proveedor_id)
+    return statement
+
+
+@router.get(
+    "/",
+    response_model=Pagina[OperacionExpandidaRead],
+    response_model_exclude_unset=True,
+    dependencies=[Depends(etag(Operacion, expansiones=EXPANSIONES))],
+)
+def list_operaciones(
+    tipo: Optional[str] = None,
+    estado: Optional[str] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    cliente_id: Optional[int] = None,
+    proveedor_id: Optional[int] = None,
+    pagina: Paginacion = Depends(),
+    expand: list = Depends(parametro_expand(EXPANSIONES)),
+    session: Session = Depends(get_session),
+):
+    statement = filtrar_operaciones(
+        select(Operacion), tipo, estado, fecha_desde, fecha_hasta, cliente_id, proveedor_id
+    )
+    resultado = paginar(session, statement, Operacion, pagina, OperacionRead)
+    return expandir(session, resultado, EXPANSIONES, expand)
+
+
+def consulta_exportacion(
+    incluir_nombres: bool = False,
+    tipo: Optional[str] = None,
+    estado: Optional[str] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    cliente_id: Optional[int] = None,
+    proveedor_id: Optional[int] = None,
+):
+    """Select de la exportación de operaciones (también lo usan los trabajos de reportes)."""
+    statement = select(*Operacion.__table__.columns)
+    if incluir_nombres:
+        statement = (
+            statement.add_columns(
+                Cliente.nombre.label("cliente_nombre"),
+                Proveedor.nombre.label("proveedor_nombre"),
+            )
+            .outerjoin(Cliente, Operacion.cliente_id == Cliente.id)
+            .outerjoin(Proveedor, Operacion.proveedor_id == Proveedor.id)
+        )
+    return filtrar_operaciones(
+        statement, tipo, estado, fecha_desde, fecha_hasta, cliente_id, proveedor_id
+    ).order_by(Operacion.id)
+
+
+@router.get("/export")
+def export_operaciones(
+    formato: FormatoExportacion = "csv",
+    incluir_nombres: bool = False,
+    tipo: Optional[str] = None,
+    estado: Optional[str] = None,
+    fecha_desde: Optional[date] = None,
+    fecha_hasta: Optional[date] = None,
+    cliente_id: Optional[int] = None,
+    proveedor_id: Optional[int] = None,
+):
+    """
+    Exporta todas las operaciones que cumplen los filtros en CSV o NDJSON,
+    en streaming. Con incluir_nombres agrega los nombres de cliente y proveedor.
+    Para rangos muy grandes, mejor como trabajo: POST /reportes/jobs.
+    """
+    statement = consulta_exportacion(
+        incluir_nombres, tipo, estado, fecha_desde, fecha_hasta, cliente_id, proveedor_id
+    )
+    return respuesta_exportacion(statement, formato, "operaciones")
+
+
+@router.get(
+    "/{operacion_id}",
+    response_model=OperacionRead,
+    dependencies=[Depends(etag(Operacion))],
+)
 def get_operacion(operacion_id: int, session: Session = Depends(get_session)):
     operacion = session.get(Operacion, operacion_id)
     if not operacion:
@@ -147,6 +430,56 @@ def get_operacion(operacion_id: int, session: Session = Depends(get_session)):
     return operacion
 
 
+@router.get(
+    "/{operacion_id}/completa",
+    response_model=OperacionCompletaRead,
+    dependencies=[
+        Depends(
+            etag(
+                Operacion,
+                Cliente,
+                Proveedor,
+                Pais,
+                Puerto,
+                MedioTransporte,
+                DetalleOperacion,
+                Producto,
+                InspeccionCalidad,
+            )
+        )
+    ],
+)
+def get_operacion_completa(operacion_id: int, session: Session = Depends(get_session)):
+    """
+    La operación con cliente, proveedor, países y puertos de origen/destino,
+    medio de transporte, detalles (con su producto) e inspecciones.
+    Siempre son tres consultas: la operación con sus relaciones uno-a-uno
+    unidas (JOIN), los detalles con su producto y las inspecciones.
+    Cualquier otra relación queda bloqueada (raiseload) en lugar de cargarse
+    perezosamente una por una.
+    """
+    statement = (
+        select(Operacion)
+        .where(Operacion.id == operacion_id)
+        .options(
+            joinedload(Operacion.cliente),
+            joinedload(Operacion.proveedor),
+            joinedload(Operacion.pais_origen),
+            joinedload(Operacion.pais_destino),
+            joinedload(Operacion.puerto_origen),
+            joinedload(Operacion.puerto_destino),
+            joinedload(Operacion.medio_transporte),
+            selectinload(Operacion.detalles).joinedload(DetalleOperacion.producto),
+            selectinload(Operacion.inspecciones),
+            raiseload("*"),
+        )
+    )
+    operacion = session.exec(statement).first()
+    if not operacion:
+        raise HTTPException(status_code=404, detail="La operación no fue encontrada.")
+    return operacion
+
+
 @router.put("/{operacion_id}", response_model=OperacionRead)
 def update_operacion(
     operacion_id: int, data: OperacionCreate, session: Session = Depends(get_session)
@@ -155,11 +488,8 @@ def update_operacion(
     if not operacion:
         raise HTTPException(status_code=404, detail="La operación no fue encontrada.")
 
-    # Verificamos si ya tiene detalles
-    detalles_existentes = session.exec(
-        select(DetalleOperacion).where(DetalleOperacion.operacion_id == operacion_id)
-    ).all()
-    if detalles_existentes and data.tipo != operacion.tipo:
+    # Verificamos si ya tiene detalles (solo importa si cambia el tipo)
+    if data.tipo != operacion.tipo and operacion_tiene_detalles(session, operacion_id):
         raise HTTPException(
             status_code=400,
             detail=(
@@ -170,11 +500,34 @@ def update_operacion(
 
     validar_relaciones_operacion(data, session)
 
+    estado_anterior, fecha_anterior = operacion.estado, operacion.fecha
+    ruta_anterior = resumenes.ruta_de(operacion)
+
     # No permitimos modificar costo_total manualmente
     update_data = data.dict(exclude={"costo_total"}, exclude_unset=True)
     for field, value in update_data.items():
         setattr(operacion, field, value)
 
+    # Si cambia el estado, el mes o la ruta, la operación se mueve de grupo en los resúmenes
+    if (
+        operacion.estado != estado_anterior
+        or (operacion.fecha.year, operacion.fecha.month)
+        != (fecha_anterior.year, fecha_anterior.month)
+        or resumenes.ruta_de(operacion) != ruta_anterior
+    ):
+        costo = operacion.costo_total or 0.0
+        resumenes.registrar_operacion(
+            session, estado_anterior, fecha_anterior, -1, -costo, ruta=ruta_anterior
+        )
+        resumenes.registrar_operacion(
+            session,
+            operacion.estado,
+            operacion.fecha,
+            1,
+            costo,
+            ruta=resumenes.ruta_de(operacion),
+        )
+
     session.add(operacion)
     session.commit()
     session.refresh(operacion)
@@ -187,10 +540,7 @@ def delete_operacion(operacion_id: int, session: Session = Depends(get_session))
     if not operacion:
         raise HTTPException(status_code=404, detail="La operación no existe.")
 
-    detalles_existentes = session.exec(
-        select(DetalleOperacion).where(DetalleOperacion.operacion_id == operacion_id)
-    ).all()
-    if detalles_existentes:
+    if operacion_tiene_detalles(session, operacion_id):
         raise HTTPException(
             status_code=400,
             detail=(
@@ -199,6 +549,14 @@ def delete_operacion(operacion_id: int, session: Session = Depends(get_session))
             ),
         )
 
+    resumenes.registrar_operacion(
+        session,
+        operacion.estado,
+        operacion.fecha,
+        -1,
+        -(operacion.costo_total or 0.0),
+        ruta=resumenes.ruta_de(operacion),
+    )
     session.delete(operacion)
     session.commit()
     return {"message": "Operación eliminada correctamente."}
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from typing import List
+from typing import Literal
 
 from database import get_session
+from etags import etag
+from paginacion import Paginacion, paginar
+from importacion import importar_catalogo
+from cache_catalogos import cache_de
 from models import Pais
-from schemas import PaisCreate, PaisRead
+from schemas import PaisCreate, PaisRead, Pagina
 
 router = APIRouter(prefix="/paises", tags=["paises"])
 
@@ -15,16 +19,35 @@ def create_item(data: PaisCreate, session: Session = Depends(get_session)):
     session.add(item)
     session.commit()
     session.refresh(item)
+    cache_de(Pais).invalidar()
     return item
 
 
-@router.get("/", response_model=List[PaisRead])
-def list_items(session: Session = Depends(get_session)):
+@router.post("/importar")
+async def importar_items(
+    request: Request, existentes: Literal["actualizar", "omitir"] = "actualizar"
+):
+    """
+    Alta masiva de países desde un CSV (text/csv) o un arreglo JSON.
+    Cada fila se valida con PaisCreate; las que ya existen (por codigo_iso)
+    se actualizan u omiten según `existentes`.
+    """
+    return await importar_catalogo(request, "paises", PaisCreate, existentes, modelo_cache=Pais)
+
+
+@router.get("/", response_model=Pagina[PaisRead], dependencies=[Depends(etag(Pais))])
+def list_items(
+    pagina: Paginacion = Depends(),
+    session: Session = Depends(get_session),
+):
     statement = select(Pais)
-    return session.exec(statement).all()
+    clave = ("lista", pagina.after_id, pagina.limit)
+    return cache_de(Pais).obtener(
+        clave, lambda: paginar(session, statement, Pais, pagina, PaisRead)
+    )
 
 
-@router.get("/{item_id}", response_model=PaisRead)
+@router.get("/{item_id}", response_model=PaisRead, dependencies=[Depends(etag(Pais))])
 def get_item(item_id: int, session: Session = Depends(get_session)):
     item = session.get(Pais, item_id)
     if not item:
@@ -41,6 +64,7 @@ def update_item(item_id: int, data: PaisCreate, session: Session = Depends(get_s
         setattr(item, k, v)
     session.commit()
     session.refresh(item)
+    cache_de(Pais).invalidar()
     return item
 
 
@@ -51,4 +75,5 @@ def delete_item(item_id: int, session: Session = Depends(get_session)):
         raise HTTPException(404, "Pais no encontrado")
     session.delete(item)
     session.commit()
+    cache_de(Pais).invalidar()
     return {"message": "Pais eliminado correctamente"}
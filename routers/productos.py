@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from typing import List
+from typing import Optional, Literal
+from datetime import date, datetime, time, timedelta, timezone
 
 from database import get_session
-from models import Producto
-from schemas import ProductoCreate, ProductoRead
+from etags import etag
+import inventario
+from paginacion import Paginacion, paginar
+from importacion import importar_catalogo
+from models import Producto, ahora_utc
+from routers.detalles_operacion import mover_stock
+from schemas import ProductoCreate, ProductoRead, Pagina
 
 router = APIRouter(prefix="/productos", tags=["productos"])
 
@@ -13,18 +19,86 @@ router = APIRouter(prefix="/productos", tags=["productos"])
 def create_item(data: ProductoCreate, session: Session = Depends(get_session)):
     item = Producto(**data.dict())
     session.add(item)
+    session.flush()
+    # El stock inicial abre el libro de movimientos del producto
+    inventario.registrar_movimiento(session, item.id, item.stock_disponible, "alta_producto")
     session.commit()
     session.refresh(item)
     return item
 
 
-@router.get("/", response_model=List[ProductoRead])
-def list_items(session: Session = Depends(get_session)):
+@router.post("/importar")
+async def importar_items(
+    request: Request, existentes: Literal["actualizar", "omitir"] = "actualizar"
+):
+    """
+    Alta masiva de productos desde un CSV (text/csv) o un arreglo JSON.
+    Cada fila se valida con ProductoCreate; las que ya existen (por nombre)
+    se actualizan u omiten según `existentes`. La columna `categoria` (nombre) se
+    puede usar en lugar de categoria_id.
+    """
+    return await importar_catalogo(request, "productos", ProductoCreate, existentes)
+
+
+@router.get("/", response_model=Pagina[ProductoRead], dependencies=[Depends(etag(Producto))])
+def list_items(
+    tipo: Optional[str] = None,
+    categoria_id: Optional[int] = None,
+    pagina: Paginacion = Depends(),
+    session: Session = Depends(get_session),
+):
     statement = select(Producto)
-    return session.exec(statement).all()
+    if tipo is not None:
+        statement = statement.where(Producto.tipo == tipo)
+    if categoria_id is not None:
+        statement = statement.where(Producto.categoria_id == categoria_id)
+    return paginar(session, statement, Producto, pagina, ProductoRead)
+
+
+@router.get("/stock/verificar")
+def verificar_stock(session: Session = Depends(get_session)):
+    """Compara stock_disponible de cada producto con su libro de movimientos."""
+    return inventario.verificar_stock(session)
+
+
+@router.post("/stock/snapshots")
+def generar_snapshots(session: Session = Depends(get_session)):
+    """
+    Guarda el saldo de los productos con movimientos desde su último
+    snapshot, para que las consultas de stock histórico lean una cola corta.
+    """
+    creados = inventario.generar_snapshots(session)
+    session.commit()
+    return {"snapshots_creados": creados}
+
+
+@router.get("/{item_id}/stock")
+def stock_historico(
+    item_id: int,
+    fecha: Optional[date] = None,
+    momento: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+):
+    """
+    Stock del producto según el libro de movimientos: al cierre de `fecha`
+    (UTC), en un `momento` exacto o, sin parámetros, el actual.
+    """
+    if not session.get(Producto, item_id):
+        raise HTTPException(404, "Producto no encontrado")
+    if momento is None:
+        if fecha is not None:
+            momento = datetime.combine(
+                fecha + timedelta(days=1), time(), tzinfo=timezone.utc
+            ) - timedelta(microseconds=1)
+        else:
+            momento = ahora_utc()
+    elif momento.tzinfo is None:
+        # Sin zona horaria se toma como UTC, igual que el libro
+        momento = momento.replace(tzinfo=timezone.utc)
+    return inventario.stock_en(session, item_id, momento)
 
 
-@router.get("/{item_id}", response_model=ProductoRead)
+@router.get("/{item_id}", response_model=ProductoRead, dependencies=[Depends(etag(Producto))])
 def get_item(item_id: int, session: Session = Depends(get_session)):
     item = session.get(Producto, item_id)
     if not item:
@@ -37,8 +111,15 @@ def update_item(item_id: int, data: ProductoCreate, session: Session = Depends(g
     item = session.get(Producto, item_id)
     if not item:
         raise HTTPException(404, "Producto no encontrado")
-    for k, v in data.dict().items():
+    cambios = data.dict()
+    # El stock no se pisa: se mueve la diferencia para que quede en el libro
+    delta = cambios.pop("stock_disponible") - item.stock_disponible
+    for k, v in cambios.items():
         setattr(item, k, v)
+    if not mover_stock(session, item, delta, "ajuste_manual"):
+        raise HTTPException(
+            400, "El stock del producto cambió mientras se editaba; vuelva a intentarlo."
+        )
     session.commit()
     session.refresh(item)
     return item
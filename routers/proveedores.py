@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from typing import List
+from typing import Optional, Literal
 
 from database import get_session
+from etags import etag
+from paginacion import Paginacion, paginar
+from importacion import importar_catalogo
 from models import Proveedor
-from schemas import ProveedorCreate, ProveedorRead
+from schemas import ProveedorCreate, ProveedorRead, Pagina
 
 router = APIRouter(prefix="/proveedores", tags=["proveedores"])
 
@@ -18,13 +21,35 @@ def create_item(data: ProveedorCreate, session: Session = Depends(get_session)):
     return item
 
 
-@router.get("/", response_model=List[ProveedorRead])
-def list_items(session: Session = Depends(get_session)):
+@router.post("/importar")
+async def importar_items(
+    request: Request, existentes: Literal["actualizar", "omitir"] = "actualizar"
+):
+    """
+    Alta masiva de proveedores desde un CSV (text/csv) o un arreglo JSON.
+    Cada fila se valida con ProveedorCreate; las que ya existen (por nombre)
+    se actualizan u omiten según `existentes`. La columna `pais` (código ISO) se
+    puede usar en lugar de pais_id.
+    """
+    return await importar_catalogo(request, "proveedores", ProveedorCreate, existentes)
+
+
+@router.get("/", response_model=Pagina[ProveedorRead], dependencies=[Depends(etag(Proveedor))])
+def list_items(
+    tipo: Optional[str] = None,
+    pais_id: Optional[int] = None,
+    pagina: Paginacion = Depends(),
+    session: Session = Depends(get_session),
+):
     statement = select(Proveedor)
-    return session.exec(statement).all()
+    if tipo is not None:
+        statement = statement.where(Proveedor.tipo == tipo)
+    if pais_id is not None:
+        statement = statement.where(Proveedor.pais_id == pais_id)
+    return paginar(session, statement, Proveedor, pagina, ProveedorRead)
 
 
-@router.get("/{item_id}", response_model=ProveedorRead)
+@router.get("/{item_id}", response_model=ProveedorRead, dependencies=[Depends(etag(Proveedor))])
 def get_item(item_id: int, session: Session = Depends(get_session)):
     item = session.get(Proveedor, item_id)
     if not item:
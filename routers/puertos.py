@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from typing import List
+from typing import Optional, Literal
 
 from database import get_session
+from etags import etag
+from paginacion import Paginacion, paginar
+from importacion import importar_catalogo
+from cache_catalogos import cache_de
 from models import Puerto
-from schemas import PuertoCreate, PuertoRead
+from schemas import PuertoCreate, PuertoRead, Pagina
 
 router = APIRouter(prefix="/puertos", tags=["puertos"])
 
@@ -15,16 +19,42 @@ def create_item(data: PuertoCreate, session: Session = Depends(get_session)):
     session.add(item)
     session.commit()
     session.refresh(item)
+    cache_de(Puerto).invalidar()
     return item
 
 
-@router.get("/", response_model=List[PuertoRead])
-def list_items(session: Session = Depends(get_session)):
+@router.post("/importar")
+async def importar_items(
+    request: Request, existentes: Literal["actualizar", "omitir"] = "actualizar"
+):
+    """
+    Alta masiva de puertos desde un CSV (text/csv) o un arreglo JSON.
+    Cada fila se valida con PuertoCreate; las que ya existen (por nombre)
+    se actualizan u omiten según `existentes`. La columna `pais` (código ISO) se
+    puede usar en lugar de pais_id.
+    """
+    return await importar_catalogo(request, "puertos", PuertoCreate, existentes, modelo_cache=Puerto)
+
+
+@router.get("/", response_model=Pagina[PuertoRead], dependencies=[Depends(etag(Puerto))])
+def list_items(
+    tipo: Optional[str] = None,
+    pais_id: Optional[int] = None,
+    pagina: Paginacion = Depends(),
+    session: Session = Depends(get_session),
+):
     statement = select(Puerto)
-    return session.exec(statement).all()
+    if tipo is not None:
+        statement = statement.where(Puerto.tipo == tipo)
+    if pais_id is not None:
+        statement = statement.where(Puerto.pais_id == pais_id)
+    clave = ("lista", tipo, pais_id, pagina.after_id, pagina.limit)
+    return cache_de(Puerto).obtener(
+        clave, lambda: paginar(session, statement, Puerto, pagina, PuertoRead)
+    )
 
 
-@router.get("/{item_id}", response_model=PuertoRead)
+@router.get("/{item_id}", response_model=PuertoRead, dependencies=[Depends(etag(Puerto))])
 def get_item(item_id: int, session: Session = Depends(get_session)):
     item = session.get(Puerto, item_id)
     if not item:
@@ -41,6 +71,7 @@ def update_item(item_id: int, data: PuertoCreate, session: Session = Depends(get
         setattr(item, k, v)
     session.commit()
     session.refresh(item)
+    cache_de(Puerto).invalidar()
     return item
 
 
@@ -51,4 +82,5 @@ def delete_item(item_id: int, session: Session = Depends(get_session)):
         raise HTTPException(404, "Puerto no encontrado")
     session.delete(item)
     session.commit()
+    cache_de(Puerto).invalidar()
     return {"message": "Puerto eliminado correctamente"}
@@ -1,11 +1,48 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select, func
+import json
+import os
+import uuid
 
-from database import get_session
-from models import Operacion, DetalleOperacion, Producto, Pais
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+from sqlalchemy import Integer, String, cast, null, or_
+from sqlmodel import Session, select, func, literal, union_all
+from typing import Literal
+from datetime import date
+
+from database import engine_trabajos, get_session
+from etags import etag
+import trabajos
+from trabajos import Contexto, Resultado, tipo_de_trabajo
+from cache_catalogos import CacheCatalogo, CACHE_TTL_SEGUNDOS
+from models import (
+    Operacion,
+    Pais,
+    Producto,
+    ResumenEstado,
+    ResumenMes,
+    ResumenProducto,
+    ResumenRuta,
+    TrabajoReporte,
+)
+from schemas import (
+    TrabajoCreate,
+    TrabajoRead,
+    ExportarOperacionesParametros,
+    ExportarDetallesParametros,
+    IngresosPorPeriodoParametros,
+)
+from periodos import inicio_de_periodo
+from routers import operaciones, detalles_operacion
+import resumenes
 
 router = APIRouter(prefix="/reportes", tags=["reportes"])
 
+# Tablas que lee el dashboard: su ETag (versiones + URL) es también la clave del cache
+TABLAS_DASHBOARD = (ResumenEstado, ResumenMes, ResumenProducto, ResumenRuta, Producto, Pais)
+cache_dashboard = CacheCatalogo("dashboard", 32, CACHE_TTL_SEGUNDOS)
+
 
 @router.get("/operaciones-por-estado")
 def operaciones_por_estado(session: Session = Depends(get_session)):
@@ -14,10 +51,12 @@ def operaciones_por_estado(session: Session = Depends(get_session)):
     """
     rows = session.exec(
         select(
-            Operacion.estado,
-            func.count(Operacion.id),
-            func.coalesce(func.sum(Operacion.costo_total), 0),
-        ).group_by(Operacion.estado)
+            ResumenEstado.estado,
+            ResumenEstado.cantidad_operaciones,
+            ResumenEstado.costo_total,
+        )
+        .where(ResumenEstado.cantidad_operaciones > 0)
+        .order_by(ResumenEstado.estado)
     ).all()
 
     return [
@@ -36,15 +75,10 @@ def top_productos_exportados(limit: int = 5, session: Session = Depends(get_sess
     Reporte: top N productos por cantidad exportada.
     """
     rows = session.exec(
-        select(
-            Producto.nombre,
-            func.coalesce(func.sum(DetalleOperacion.cantidad), 0),
-        )
-        .join(DetalleOperacion, DetalleOperacion.producto_id == Producto.id)
-        .join(Operacion, DetalleOperacion.operacion_id == Operacion.id)
-        .where(Operacion.tipo == "exportacion")
-        .group_by(Producto.id)
-        .order_by(func.sum(DetalleOperacion.cantidad).desc())
+        select(Producto.nombre, ResumenProducto.cantidad)
+        .join(Producto, ResumenProducto.producto_id == Producto.id)
+        .where(ResumenProducto.tipo == "exportacion", ResumenProducto.cantidad > 0)
+        .order_by(ResumenProducto.cantidad.desc())
         .limit(limit)
     ).all()
 
@@ -57,19 +91,346 @@ def top_productos_exportados(limit: int = 5, session: Session = Depends(get_sess
 def ingresos_por_mes(anio: int, session: Session = Depends(get_session)):
     """
     Reporte: ingresos (costo_total) por mes de un año dado.
-    Solo considera operaciones con costo_total > 0.
     """
-    # Para SQLite usamos strftime; ajusta si usas otro motor.
+    rows = session.exec(
+        select(ResumenMes.mes, ResumenMes.costo_total)
+        .where(ResumenMes.anio == anio, ResumenMes.cantidad_operaciones > 0)
+        .order_by(ResumenMes.mes)
+    ).all()
+
+    return [
+        {"mes": f"{mes:02d}", "ingresos": float(total)} for mes, total in rows
+    ]
+
+
+@router.get("/ingresos-por-periodo")
+def ingresos_por_periodo(
+    desde: date,
+    hasta: date,
+    periodo: Literal["dia", "semana", "mes", "trimestre", "anio"] = "mes",
+    session: Session = Depends(get_session),
+):
+    """
+    Reporte: cantidad de operaciones e ingresos (costo_total) agrupados por
+    período en el rango [desde, hasta). Cada período se identifica por su
+    fecha de inicio.
+    """
+    if hasta <= desde:
+        raise HTTPException(
+            status_code=400, detail="La fecha 'hasta' debe ser posterior a 'desde'."
+        )
+
+    inicio = inicio_de_periodo(
+        Operacion.fecha, periodo, session.get_bind().dialect.name
+    ).label("inicio")
     rows = session.exec(
         select(
-            func.strftime("%m", Operacion.fecha),
+            inicio,
+            func.count(Operacion.id),
             func.coalesce(func.sum(Operacion.costo_total), 0),
         )
-        .where(func.strftime("%Y", Operacion.fecha) == str(anio))
-        .group_by(func.strftime("%m", Operacion.fecha))
-        .order_by(func.strftime("%m", Operacion.fecha))
+        .where(Operacion.fecha >= desde, Operacion.fecha < hasta)
+        .group_by(inicio)
+        .order_by(inicio)
     ).all()
 
     return [
-        {"mes": mes, "ingresos": float(total)} for mes, total in rows
+        {
+            "periodo": inicio_periodo,
+            "cantidad_operaciones": int(cant),
+            "ingresos": float(total),
+        }
+        for inicio_periodo, cant, total in rows
     ]
+
+
+# ----------------------------------------------------
+#   DASHBOARD (todos los agregados en una petición)
+# ----------------------------------------------------
+def consulta_dashboard(top: int):
+    """
+    Todos los agregados del dashboard en una sola sentencia UNION ALL sobre
+    las tablas de resumen (una ida y vuelta a la base). Cada fila es
+    (seccion, nombre, clave_1, clave_2, cantidad, valor). Por país de origen y
+    de destino salen de la misma lectura de resumenruta.
+    """
+    sin_texto = cast(null(), String)
+    sin_clave = cast(null(), Integer)
+
+    top_productos = (
+        select(
+            Producto.nombre,
+            ResumenProducto.producto_id,
+            ResumenProducto.cantidad,
+            ResumenProducto.valor,
+        )
+        .join(Producto, ResumenProducto.producto_id == Producto.id)
+        .where(ResumenProducto.tipo == "exportacion", ResumenProducto.cantidad > 0)
+        .order_by(ResumenProducto.cantidad.desc())
+        .limit(top)
+        .subquery()
+    )
+    rutas = ResumenRuta.cantidad_operaciones > 0
+
+    return union_all(
+        select(
+            literal("estado"),
+            ResumenEstado.estado,
+            sin_clave,
+            sin_clave,
+            ResumenEstado.cantidad_operaciones,
+            ResumenEstado.costo_total,
+        ).where(ResumenEstado.cantidad_operaciones > 0),
+        select(
+            literal("mes"),
+            sin_texto,
+            ResumenMes.anio,
+            ResumenMes.mes,
+            ResumenMes.cantidad_operaciones,
+            ResumenMes.costo_total,
+        ).where(ResumenMes.cantidad_operaciones > 0),
+        select(
+            literal("producto"),
+            top_productos.c.nombre,
+            top_productos.c.producto_id,
+            sin_clave,
+            top_productos.c.cantidad,
+            top_productos.c.valor,
+        ),
+        select(
+            literal("ruta"),
+            sin_texto,
+            ResumenRuta.pais_origen_id,
+            ResumenRuta.pais_destino_id,
+            ResumenRuta.cantidad_operaciones,
+            ResumenRuta.costo_total,
+        ).where(rutas),
+        # Solo los nombres de los países que aparecen en alguna ruta
+        select(
+            literal("pais"), Pais.nombre, Pais.id, sin_clave, literal(0), literal(0.0)
+        ).where(
+            or_(
+                Pais.id.in_(select(ResumenRuta.pais_origen_id).where(rutas)),
+                Pais.id.in_(select(ResumenRuta.pais_destino_id).where(rutas)),
+            )
+        ),
+    )
+
+
+def _por_pais(rutas: list, paises: dict, posicion: int) -> list:
+    """Suma las rutas por el país de `posicion` (0 = origen, 1 = destino)."""
+    totales = {}
+    for ruta in rutas:
+        pais_id = ruta[posicion] or None  # SIN_PAIS -> None
+        cantidad, costo = totales.get(pais_id, (0, 0.0))
+        totales[pais_id] = (cantidad + ruta[2], costo + ruta[3])
+    return sorted(
+        (
+            {
+                "pais_id": pais_id,
+                "pais": paises.get(pais_id),
+                "cantidad_operaciones": cantidad,
+                "costo_total": costo,
+            }
+            for pais_id, (cantidad, costo) in totales.items()
+        ),
+        key=lambda fila: (-fila["cantidad_operaciones"], fila["pais"] or ""),
+    )
+
+
+def calcular_dashboard(session: Session, top: int) -> dict:
+    por_estado, por_mes, productos, rutas, paises = [], [], [], [], {}
+    for seccion, nombre, clave_1, clave_2, cantidad, valor in session.exec(
+        consulta_dashboard(top)
+    ):
+        if seccion == "estado":
+            por_estado.append(
+                {
+                    "estado": nombre,
+                    "cantidad_operaciones": int(cantidad),
+                    "costo_total": float(valor),
+                }
+            )
+        elif seccion == "mes":
+            por_mes.append(
+                {
+                    "anio": clave_1,
+                    "mes": f"{clave_2:02d}",
+                    "cantidad_operaciones": int(cantidad),
+                    "ingresos": float(valor),
+                }
+            )
+        elif seccion == "producto":
+            productos.append(
+                {
+                    "producto_id": clave_1,
+                    "producto": nombre,
+                    "cantidad_exportada": float(cantidad),
+                    "valor_exportado": float(valor),
+                }
+            )
+        elif seccion == "ruta":
+            rutas.append((clave_1, clave_2, int(cantidad), float(valor)))
+        else:
+            paises[clave_1] = nombre
+
+    # UNION ALL no conserva el orden de cada parte
+    por_estado.sort(key=lambda fila: fila["estado"])
+    por_mes.sort(key=lambda fila: (fila["anio"], fila["mes"]))
+    productos.sort(key=lambda fila: -fila["cantidad_exportada"])
+    return {
+        "por_estado": por_estado,
+        "por_mes": por_mes,
+        "top_productos": productos,
+        "por_pais_origen": _por_pais(rutas, paises, 0),
+        "por_pais_destino": _por_pais(rutas, paises, 1),
+    }
+
+
+@router.get("/dashboard", dependencies=[Depends(etag(*TABLAS_DASHBOARD))])
+def dashboard(
+    request: Request,
+    top: int = Query(default=5, ge=1, le=50, description="Cantidad de productos en el top"),
+    session: Session = Depends(get_session),
+):
+    """
+    Reporte: todos los agregados de la página de reportes en una petición
+    (por estado, por mes, top de productos exportados y por país de origen y
+    de destino). Se guarda en cache con el ETag como clave: mientras no
+    cambien las tablas que lee, se sirve sin consultar la base.
+    """
+    return cache_dashboard.obtener(request.state.etag, lambda: calcular_dashboard(session, top))
+
+
+@router.post("/resumenes/reconstruir")
+def reconstruir_resumenes(session: Session = Depends(get_session)):
+    """
+    Tarea administrativa: recalcula las tablas de resumen desde
+    operaciones y detalles (por ejemplo, después de una carga masiva).
+    """
+    resumenes.reconstruir_resumenes(session)
+    session.commit()
+    return {"message": "Resúmenes reconstruidos correctamente."}
+
+
+# ----------------------------------------------------
+#   TRABAJOS EN SEGUNDO PLANO (ver trabajos.py)
+# ----------------------------------------------------
+@tipo_de_trabajo("exportar_operaciones", ExportarOperacionesParametros)
+def trabajo_exportar_operaciones(p: ExportarOperacionesParametros, contexto: Contexto) -> Resultado:
+    statement = operaciones.consulta_exportacion(
+        p.incluir_nombres,
+        p.tipo,
+        p.estado,
+        p.fecha_desde,
+        p.fecha_hasta,
+        p.cliente_id,
+        p.proveedor_id,
+    )
+    return contexto.exportar(statement, p.formato)
+
+
+@tipo_de_trabajo("exportar_detalles", ExportarDetallesParametros)
+def trabajo_exportar_detalles(p: ExportarDetallesParametros, contexto: Contexto) -> Resultado:
+    statement = detalles_operacion.consulta_exportacion(
+        p.incluir_nombres,
+        p.operacion_id,
+        p.producto_id,
+        p.tipo,
+        p.estado,
+        p.fecha_desde,
+        p.fecha_hasta,
+    )
+    return contexto.exportar(statement, p.formato)
+
+
+@tipo_de_trabajo("ingresos_por_periodo", IngresosPorPeriodoParametros)
+def trabajo_ingresos_por_periodo(p: IngresosPorPeriodoParametros, contexto: Contexto) -> Resultado:
+    with Session(engine_trabajos) as session:
+        filas = ingresos_por_periodo(p.desde, p.hasta, p.periodo, session)
+    return contexto.guardar_json(filas)
+
+
+def _trabajo_read(trabajo: TrabajoReporte) -> dict:
+    return {
+        "id": trabajo.id,
+        "tipo": trabajo.tipo,
+        "parametros": json.loads(trabajo.parametros),
+        "estado": trabajo.estado,
+        "progreso": trabajo.progreso,
+        "intentos": trabajo.intentos,
+        "filas": trabajo.filas,
+        "error": trabajo.error,
+        "creado_en": trabajo.creado_en,
+        "actualizado_en": trabajo.actualizado_en,
+        "expira_en": trabajo.expira_en,
+        "resultado_url": (
+            f"/reportes/jobs/{trabajo.id}/resultado" if trabajo.estado == "completado" else None
+        ),
+    }
+
+
+@router.post("/jobs", response_model=TrabajoRead, status_code=202)
+def crear_trabajo(data: TrabajoCreate, session: Session = Depends(get_session)):
+    """
+    Encola un reporte o exportación pesada y responde enseguida con el id.
+    El avance y el resultado se consultan con GET /reportes/jobs/{id}.
+    """
+    definicion = trabajos.TIPOS.get(data.tipo)
+    if definicion is None or not definicion.publico:
+        publicos = [nombre for nombre, tipo in trabajos.TIPOS.items() if tipo.publico]
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"El tipo de trabajo '{data.tipo}' no existe. "
+                f"Opciones: {', '.join(publicos)}."
+            ),
+        )
+    try:
+        parametros = definicion.parametros.model_validate(data.parametros)
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**e, "loc": ("body", "parametros", *e["loc"])} for e in exc.errors(include_url=False)]
+        )
+
+    trabajo = TrabajoReporte(
+        id=uuid.uuid4().hex, tipo=data.tipo, parametros=parametros.model_dump_json()
+    )
+    session.add(trabajo)
+    session.commit()
+    session.refresh(trabajo)
+    trabajos.encolar(trabajo.id)
+    return _trabajo_read(trabajo)
+
+
+def _buscar_trabajo(session: Session, trabajo_id: str) -> TrabajoReporte:
+    trabajo = session.get(TrabajoReporte, trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="El trabajo no existe o ya venció.")
+    return trabajo
+
+
+@router.get("/jobs/{trabajo_id}", response_model=TrabajoRead)
+def obtener_trabajo(trabajo_id: str, session: Session = Depends(get_session)):
+    """Estado, progreso (0 a 1) y, si terminó, la URL del resultado."""
+    return _trabajo_read(_buscar_trabajo(session, trabajo_id))
+
+
+@router.get("/jobs/{trabajo_id}/resultado")
+def resultado_trabajo(trabajo_id: str, session: Session = Depends(get_session)):
+    trabajo = _buscar_trabajo(session, trabajo_id)
+    if trabajo.estado != "completado":
+        raise HTTPException(
+            status_code=409,
+            detail=f"El trabajo no tiene resultado (estado: {trabajo.estado}).",
+        )
+    ruta = trabajos.ruta_resultado(trabajo)
+    if ruta is None:
+        raise HTTPException(
+            status_code=410, detail="El resultado del trabajo ya no está disponible."
+        )
+    return FileResponse(
+        ruta,
+        media_type=trabajo.tipo_contenido,
+        filename=f"{trabajo.tipo}{os.path.splitext(ruta)[1]}",
+    )
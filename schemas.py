@@ -1,6 +1,15 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Literal
-from datetime import date
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Optional, Literal, List, Generic, TypeVar
+from datetime import date, datetime
+
+T = TypeVar("T")
+
+
+# 0. PAGINACIÓN
+class Pagina(BaseModel, Generic[T]):
+    """Sobre común de los listados paginados por cursor"""
+    items: List[T]
+    next_after_id: Optional[int] = None
 
 
 # 1. CATEGORÍA DE PRODUCTO
@@ -17,8 +26,7 @@ class CategoriaProductoCreate(CategoriaProductoBase):
 class CategoriaProductoRead(CategoriaProductoBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # 2. PAÍS
@@ -36,8 +44,7 @@ class PaisCreate(PaisBase):
 class PaisRead(PaisBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # 3. CLIENTE
@@ -56,8 +63,7 @@ class ClienteCreate(ClienteBase):
 class ClienteRead(ClienteBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # 4. PROVEEDOR
@@ -76,8 +82,7 @@ class ProveedorCreate(ProveedorBase):
 class ProveedorRead(ProveedorBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # 5. PUERTO
@@ -94,8 +99,7 @@ class PuertoCreate(PuertoBase):
 class PuertoRead(PuertoBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # 6. MEDIO TRANSPORTE
@@ -111,8 +115,7 @@ class MedioTransporteCreate(MedioTransporteBase):
 class MedioTransporteRead(MedioTransporteBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # 7. PRODUCTO
@@ -136,8 +139,7 @@ class ProductoCreate(ProductoBase):
 class ProductoRead(ProductoBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # 8. OPERACIÓN
@@ -169,8 +171,7 @@ class OperacionCreate(OperacionBase):
 class OperacionRead(OperacionBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # 9. DETALLE OPERACIÓN
@@ -188,8 +189,25 @@ class DetalleOperacionCreate(DetalleOperacionBase):
 class DetalleOperacionRead(DetalleOperacionBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# 9.1 OPERACIÓN CON DETALLES (alta en una sola petición)
+class DetalleOperacionItem(BaseModel):
+    """Detalle anidado dentro de una operación; el operacion_id se asigna al crearla"""
+    producto_id: int
+    cantidad: float = Field(gt=0, description="Cantidad debe ser > 0")
+    precio_unitario: float = Field(gt=0, description="Precio unitario debe ser > 0")
+
+
+class OperacionConDetallesCreate(OperacionBase):
+    detalles: List[DetalleOperacionItem] = Field(
+        min_length=1, description="Debe incluir al menos un detalle"
+    )
+
+
+class OperacionConDetallesRead(OperacionRead):
+    detalles: List[DetalleOperacionRead] = []
 
 
 # 10. INSPECCIÓN CALIDAD
@@ -208,5 +226,113 @@ class InspeccionCalidadCreate(InspeccionCalidadBase):
 class InspeccionCalidadRead(InspeccionCalidadBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+# 11. OPERACIÓN COMPLETA (vista con todas sus relaciones en una petición)
+class DetalleConProductoRead(DetalleOperacionRead):
+    producto: ProductoRead
+
+
+class OperacionCompletaRead(OperacionRead):
+    cliente: Optional[ClienteRead] = None
+    proveedor: Optional[ProveedorRead] = None
+    pais_origen: Optional[PaisRead] = None
+    pais_destino: Optional[PaisRead] = None
+    puerto_origen: Optional[PuertoRead] = None
+    puerto_destino: Optional[PuertoRead] = None
+    medio_transporte: Optional[MedioTransporteRead] = None
+    detalles: List[DetalleConProductoRead] = []
+    inspecciones: List[InspeccionCalidadRead] = []
+
+
+# 12. LISTADOS CON ?expand= (las relaciones solo aparecen si se piden)
+class OperacionExpandidaRead(OperacionRead):
+    cliente: Optional[ClienteRead] = None
+    proveedor: Optional[ProveedorRead] = None
+    pais_origen: Optional[PaisRead] = None
+    pais_destino: Optional[PaisRead] = None
+    puerto_origen: Optional[PuertoRead] = None
+    puerto_destino: Optional[PuertoRead] = None
+    medio_transporte: Optional[MedioTransporteRead] = None
+
+
+class DetalleOperacionExpandidaRead(DetalleOperacionRead):
+    operacion: Optional[OperacionRead] = None
+    producto: Optional[ProductoRead] = None
+
+
+class InspeccionCalidadExpandidaRead(InspeccionCalidadRead):
+    operacion: Optional[OperacionRead] = None
+    producto: Optional[ProductoRead] = None
+
+
+# 13. TRABAJOS EN SEGUNDO PLANO (POST /reportes/jobs)
+class TrabajoCreate(BaseModel):
+    tipo: str = Field(
+        description="exportar_operaciones, exportar_detalles o ingresos_por_periodo"
+    )
+    parametros: dict = {}
+
+
+class TrabajoRead(BaseModel):
+    id: str
+    tipo: str
+    parametros: dict
+    estado: str  # pendiente / en_curso / completado / fallido
+    progreso: float
+    intentos: int = 0
+    filas: Optional[int] = None
+    error: Optional[str] = None
+    creado_en: datetime
+    actualizado_en: datetime
+    expira_en: Optional[datetime] = None
+    resultado_url: Optional[str] = None
+
+
+class ExportarOperacionesParametros(BaseModel):
+    formato: Literal["csv", "ndjson"] = "csv"
+    incluir_nombres: bool = False
+    tipo: Optional[str] = None
+    estado: Optional[str] = None
+    fecha_desde: Optional[date] = None
+    fecha_hasta: Optional[date] = None
+    cliente_id: Optional[int] = None
+    proveedor_id: Optional[int] = None
+
+
+class ExportarDetallesParametros(BaseModel):
+    formato: Literal["csv", "ndjson"] = "csv"
+    incluir_nombres: bool = False
+    operacion_id: Optional[int] = None
+    producto_id: Optional[int] = None
+    tipo: Optional[str] = None
+    estado: Optional[str] = None
+    fecha_desde: Optional[date] = None
+    fecha_hasta: Optional[date] = None
+
+
+class IngresosPorPeriodoParametros(BaseModel):
+    desde: date
+    hasta: date
+    periodo: Literal["dia", "semana", "mes", "trimestre", "anio"] = "mes"
+
+    @model_validator(mode="after")
+    def validar_rango(self):
+        if self.hasta <= self.desde:
+            raise ValueError("La fecha 'hasta' debe ser posterior a 'desde'.")
+        return self
+
+
+class MiniaturasParametros(BaseModel):
+    hash: str = Field(pattern=r"^[0-9a-f]{64}$", description="sha256 del archivo subido")
+
+
+# 14. ARCHIVOS SUBIDOS (GET /archivos/{hash})
+class ArchivoRead(BaseModel):
+    hash: str
+    url: str
+    bytes: int
+    tipo_contenido: Optional[str] = None
+    # {lado en píxeles: url}; vacío hasta que termina el trabajo "miniaturas"
+    miniaturas: dict = {}
@@ -0,0 +1,244 @@
+# supa/almacenamiento.py
+"""
+Almacenamiento de los archivos subidos (fotos de inspecciones, documentos).
+
+Dos implementaciones con la misma interfaz:
+    AlmacenamientoLocal     carpeta en disco (desarrollo y pruebas)
+    AlmacenamientoSupabase  bucket de Supabase Storage (producción)
+
+ALMACENAMIENTO elige cuál usar ("local" o "supabase"); por defecto supabase
+si está definido SUPABASE_URL y local si no.
+
+guardar() nunca tiene el archivo entero en memoria: lo copia en bloques de
+TAMANO_BLOQUE a un archivo temporal, cortando con 413 apenas se pasa de
+ALMACENAMIENTO_MAX_MB, y desde ahí lo sube el backend (el cliente de
+Supabase lo envía en streaming desde el disco). Todo lo que bloquea (disco,
+base y el cliente síncrono de Supabase) corre en el threadpool, así que una
+subida lenta no frena las demás peticiones.
+
+Los archivos se guardan por contenido: mientras se copian se calcula su
+sha256, y la tabla archivoalmacenado indexa hash -> clave. Si los mismos
+bytes ya se habían subido (la misma foto o documento otra vez) se devuelve
+el objeto existente y no se envía nada al backend. Cada imagen nueva encola
+un trabajo "miniaturas" (ver supa/miniaturas.py) que genera sus versiones
+reducidas una sola vez.
+"""
+import hashlib
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+
+import trabajos
+from database import engine
+from models import ArchivoAlmacenado, TrabajoReporte
+from schemas import MiniaturasParametros
+
+ALMACENAMIENTO_DIR = os.getenv(
+    "ALMACENAMIENTO_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archivos"),
+)
+ALMACENAMIENTO_MAX_MB = float(os.getenv("ALMACENAMIENTO_MAX_MB", "10"))
+SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "importfru")
+
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class Guardado(NamedTuple):
+    clave: str  # carpeta/nombre dentro del almacenamiento
+    url: str
+    bytes: int
+    hash: str  # sha256 del contenido
+    duplicado: bool  # ya estaba guardado: no se envió al backend
+
+
+# ----------------------------------------------------
+#   BACKENDS
+# ----------------------------------------------------
+class AlmacenamientoLocal:
+    def __init__(self, directorio: str = ALMACENAMIENTO_DIR):
+        self.directorio = directorio
+        # Temporales en el mismo disco: subir() es un rename, sin copiar
+        self.directorio_temporal = os.path.join(directorio, ".temporales")
+
+    def subir(self, origen: str, clave: str, tipo_contenido: Optional[str]) -> None:
+        destino = os.path.join(self.directorio, clave)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(origen, destino)
+
+    def url(self, clave: str) -> str:
+        return Path(self.directorio, clave).resolve().as_uri()
+
+    def leer(self, clave: str) -> bytes:
+        with open(os.path.join(self.directorio, clave), "rb") as archivo:
+            return archivo.read()
+
+
+class AlmacenamientoSupabase:
+    def __init__(self, url: str, key: str, bucket: str = SUPABASE_BUCKET):
+        self.url_base = url
+        self.key = key
+        self.bucket = bucket
+        self.directorio_temporal = None  # el del sistema
+        self._cliente = None
+
+    def _storage(self):
+        # El cliente se crea al primer uso: importar este módulo no exige credenciales
+        if self._cliente is None:
+            from supabase import create_client
+
+            self._cliente = create_client(self.url_base, self.key)
+        return self._cliente.storage.from_(self.bucket)
+
+    def subir(self, origen: str, clave: str, tipo_contenido: Optional[str]) -> None:
+        # Con un archivo abierto, httpx lo envía en bloques (multipart en streaming).
+        # upsert: dos subidas simultáneas del mismo contenido escriben la misma clave
+        with open(origen, "rb") as contenido:
+            self._storage().upload(
+                clave,
+                contenido,
+                {
+                    "content-type": tipo_contenido or "application/octet-stream",
+                    "upsert": "true",
+                },
+            )
+
+    def url(self, clave: str) -> str:
+        return f"{self.url_base}/storage/v1/object/public/{self.bucket}/{clave}"
+
+    def leer(self, clave: str) -> bytes:
+        return self._storage().download(clave)
+
+
+_almacenamiento = None
+
+
+def almacenamiento():
+    """El backend configurado con ALMACENAMIENTO (uno por proceso)."""
+    global _almacenamiento
+    if _almacenamiento is None:
+        tipo = os.getenv("ALMACENAMIENTO", "supabase" if os.getenv("SUPABASE_URL") else "local")
+        if tipo == "supabase":
+            _almacenamiento = AlmacenamientoSupabase(
+                os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"]
+            )
+        else:
+            _almacenamiento = AlmacenamientoLocal()
+    return _almacenamiento
+
+
+# ----------------------------------------------------
+#   SUBIDA EN STREAMING
+# ----------------------------------------------------
+def _demasiado_grande() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"El archivo supera el máximo permitido de {ALMACENAMIENTO_MAX_MB:g} MB.",
+    )
+
+
+def _escribir(destino, resumen, bloque: bytes) -> None:
+    resumen.update(bloque)
+    destino.write(bloque)
+
+
+async def recibir(archivo: UploadFile, directorio: Optional[str] = None) -> tuple:
+    """
+    Copia el archivo subido a un temporal en `directorio`, de a un bloque
+    por vez y respetando ALMACENAMIENTO_MAX_MB. Devuelve (ruta, bytes,
+    sha256); si algo falla, el temporal se borra.
+    """
+    limite = int(ALMACENAMIENTO_MAX_MB * 1024 * 1024)
+    if archivo.size is not None and archivo.size > limite:
+        raise _demasiado_grande()
+
+    if directorio:
+        await run_in_threadpool(os.makedirs, directorio, exist_ok=True)
+    descriptor, ruta = tempfile.mkstemp(suffix=".parcial", dir=directorio)
+    destino = os.fdopen(descriptor, "wb")
+    resumen = hashlib.sha256()
+    total = 0
+    try:
+        while bloque := await archivo.read(TAMANO_BLOQUE):
+            total += len(bloque)
+            if total > limite:
+                raise _demasiado_grande()
+            await run_in_threadpool(_escribir, destino, resumen, bloque)
+        await run_in_threadpool(destino.close)
+    except BaseException:
+        destino.close()
+        os.remove(ruta)
+        raise
+    return ruta, total, resumen.hexdigest()
+
+
+# ----------------------------------------------------
+#   ÍNDICE POR CONTENIDO
+# ----------------------------------------------------
+def buscar(hash: str) -> Optional[str]:
+    """Clave del archivo ya guardado con ese sha256, o None."""
+    with engine.connect() as conn:
+        return conn.execute(
+            select(ArchivoAlmacenado.clave).where(ArchivoAlmacenado.hash == hash)
+        ).scalar_one_or_none()
+
+
+def _registrar(hash: str, clave: str, tamano: int, tipo_contenido: Optional[str]) -> str:
+    """
+    Agrega el archivo al índice y, si es una imagen, encola sus miniaturas.
+    Si otra subida del mismo contenido lo registró antes, devuelve esa clave.
+    """
+    trabajo_id = None
+    with Session(engine) as session:
+        session.add(
+            ArchivoAlmacenado(
+                hash=hash, clave=clave, bytes=tamano, tipo_contenido=tipo_contenido
+            )
+        )
+        if (tipo_contenido or "").startswith("image/"):
+            trabajo_id = uuid.uuid4().hex
+            session.add(
+                TrabajoReporte(
+                    id=trabajo_id,
+                    tipo="miniaturas",
+                    parametros=MiniaturasParametros(hash=hash).model_dump_json(),
+                )
+            )
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            return buscar(hash)
+    if trabajo_id is not None:
+        trabajos.encolar(trabajo_id)
+    return clave
+
+
+async def guardar(archivo: UploadFile, carpeta: str, backend=None) -> Guardado:
+    """
+    Guarda el archivo subido en `carpeta`, con su sha256 como nombre. Si el
+    mismo contenido ya estaba guardado devuelve ese objeto sin subirlo.
+    """
+    backend = backend or almacenamiento()
+    temporal, tamano, hash = await recibir(archivo, backend.directorio_temporal)
+    try:
+        existente = await run_in_threadpool(buscar, hash)
+        if existente is not None:
+            return Guardado(existente, backend.url(existente), tamano, hash, True)
+
+        extension = os.path.splitext(archivo.filename or "")[1].lower()
+        clave = f"{carpeta}/{hash}{extension}"
+        await run_in_threadpool(backend.subir, temporal, clave, archivo.content_type)
+        clave = await run_in_threadpool(
+            _registrar, hash, clave, tamano, archivo.content_type
+        )
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return Guardado(clave, backend.url(clave), tamano, hash, False)
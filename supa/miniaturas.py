@@ -0,0 +1,96 @@
+# supa/miniaturas.py
+"""
+Miniaturas de las imágenes subidas (trabajo en segundo plano "miniaturas").
+
+guardar() encola este trabajo una sola vez por imagen nueva (por sha256), así
+que subir la misma foto otra vez no vuelve a generarlas. El trabajo lee la
+original del almacenamiento, genera una versión JPEG por cada lado de
+MINIATURAS_LADOS (la imagen entra en un cuadrado de ese lado, sin
+deformarse), las sube como miniaturas/<hash>_<lado>.jpg y anota las claves
+en archivoalmacenado.miniaturas. GET /archivos/{hash} devuelve sus URLs.
+
+Usa Pillow; si no está instalado el trabajo termina como fallido con ese
+motivo y la subida de la original no se ve afectada.
+"""
+import io
+import json
+import os
+import tempfile
+from typing import Optional
+
+from sqlmodel import select, update
+
+import etags
+from database import engine
+from models import ArchivoAlmacenado
+from schemas import MiniaturasParametros
+from supa.almacenamiento import almacenamiento
+from trabajos import Contexto, Resultado, tipo_de_trabajo
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+MINIATURAS_LADOS = tuple(
+    int(lado) for lado in os.getenv("MINIATURAS_LADOS", "256,1024").split(",")
+)
+MINIATURAS_CALIDAD = 85
+
+
+def generar(original: bytes, lado: int, destino: str) -> None:
+    """Escribe en `destino` la imagen reducida para entrar en lado x lado."""
+    with Image.open(io.BytesIO(original)) as imagen:
+        # Las fotos de celular guardan la rotación en EXIF
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen.thumbnail((lado, lado))
+        imagen.convert("RGB").save(destino, "JPEG", quality=MINIATURAS_CALIDAD, optimize=True)
+
+
+# Interno: lo encola guardar(), no se puede pedir por la API
+@tipo_de_trabajo("miniaturas", MiniaturasParametros, publico=False)
+def trabajo_miniaturas(p: MiniaturasParametros, contexto: Contexto) -> Resultado:
+    if Image is None:
+        raise RuntimeError("Pillow no está instalado: no se pueden generar miniaturas.")
+    with engine.connect() as conn:
+        archivo = conn.execute(
+            select(ArchivoAlmacenado.clave, ArchivoAlmacenado.miniaturas).where(
+                ArchivoAlmacenado.hash == p.hash
+            )
+        ).one()
+    if archivo.miniaturas:
+        return contexto.guardar_json(json.loads(archivo.miniaturas))
+
+    backend = almacenamiento()
+    original = backend.leer(archivo.clave)
+    if backend.directorio_temporal:
+        os.makedirs(backend.directorio_temporal, exist_ok=True)
+    claves = {}
+    for numero, lado in enumerate(MINIATURAS_LADOS, start=1):
+        descriptor, temporal = tempfile.mkstemp(suffix=".jpg", dir=backend.directorio_temporal)
+        os.close(descriptor)
+        try:
+            generar(original, lado, temporal)
+            clave = f"miniaturas/{p.hash}_{lado}.jpg"
+            backend.subir(temporal, clave, "image/jpeg")
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        claves[str(lado)] = clave
+        contexto.avance(numero / len(MINIATURAS_LADOS))
+
+    with engine.begin() as conn:
+        conn.execute(
+            update(ArchivoAlmacenado)
+            .where(ArchivoAlmacenado.hash == p.hash)
+            .values(miniaturas=json.dumps(claves))
+        )
+        # Por Connection no corren los eventos de Session: el ETag de GET /archivos
+        etags.incrementar_versiones(conn, {ArchivoAlmacenado.__tablename__})
+    return contexto.guardar_json(claves)
+
+
+def urls_miniaturas(miniaturas: Optional[str]) -> dict:
+    """{lado: url} a partir de la columna archivoalmacenado.miniaturas."""
+    backend = almacenamiento()
+    return {lado: backend.url(clave) for lado, clave in json.loads(miniaturas or "{}").items()}
@@ -1,22 +1,13 @@
-import os
-import uuid
-from supabase import create_client
 from fastapi import UploadFile
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+from supa.almacenamiento import guardar
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 async def upload_to_bucket(file: UploadFile, folder: str):
-    bucket = "importfru"
-
-    content = await file.read()
-
-    extension = os.path.splitext(file.filename)[1].lower()
-    unique_name = f"{uuid.uuid4()}{extension}"
-    file_path = f"{folder}/{unique_name}"
-
-    supabase.storage.from_(bucket).upload(file_path, content)
-
-    return f"{SUPABASE_URL}/storage/v1/object/public/{bucket}/{file_path}"
\ No newline at end of file
+    """
+    Sube el archivo al almacenamiento configurado (bucket de Supabase en
+    producción, carpeta local en desarrollo) y devuelve su URL pública.
+    Ver supa/almacenamiento.py.
+    """
+    guardado = await guardar(file, folder)
+    return guardado.url
@@ -0,0 +1,366 @@
+# trabajos.py
+"""
+Trabajos en segundo plano para reportes y exportaciones pesadas.
+
+POST /reportes/jobs guarda el trabajo en la tabla trabajoreporte, que es la
+cola, y lo pasa a un pool de hilos acotado (TRABAJOS_MAX_CONCURRENTES). La
+petición responde enseguida con el id. Antes de ejecutar un trabajo se lo
+reclama con un UPDATE condicional (pendiente -> en_curso) que le asigna un
+token de reclamo nuevo, así que aunque varios workers lo vean pendiente
+corre una sola vez. El avance y el final solo se guardan si el token sigue
+siendo el de esa ejecución: si el trabajo se devolvió a la cola mientras
+corría, lo que escriba la ejecución vieja se descarta.
+
+Cada proceso tiene un hilo vigilante que cada TRABAJOS_INTERVALO segundos:
+  - renueva el latido (actualizado_en) de los trabajos que está ejecutando,
+  - devuelve a la cola los en_curso sin latido hace más de TRABAJOS_ABANDONO
+    segundos (el worker que los tenía se reinició o murió), o los da por
+    fallidos si ya se reclamaron TRABAJOS_MAX_INTENTOS veces (un trabajo que
+    tira abajo el proceso no se reintenta para siempre), y encola los
+    pendientes,
+  - borra los trabajos vencidos, completados o fallidos (la fila y sus
+    archivos, también los temporales que haya dejado una ejecución cortada).
+
+Los resultados se escriben en TRABAJOS_DIR y duran TRABAJOS_TTL_HORAS. No
+hace falta ningún broker: alcanza con la base de datos y el disco local.
+
+Las escrituras del estado van por una conexión propia y no por Session, así
+el progreso no cambia la versión de la tabla (ETags) en cada lote. Las
+consultas de los trabajos en sí usan engine_trabajos, con su propio límite
+por sentencia (el de las peticiones cortaría justo los reportes largos).
+"""
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, NamedTuple, Optional
+
+from sqlmodel import select, update, delete
+
+from database import engine, engine_trabajos
+from exportacion import TIPOS_CONTENIDO, escribir_exportacion
+from models import TrabajoReporte, ahora_utc
+
+logger = logging.getLogger("trabajos")
+
+TRABAJOS_DIR = os.getenv(
+    "TRABAJOS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "trabajos")
+)
+TRABAJOS_MAX_CONCURRENTES = int(os.getenv("TRABAJOS_MAX_CONCURRENTES", "2"))
+TRABAJOS_TTL_HORAS = float(os.getenv("TRABAJOS_TTL_HORAS", "24"))
+TRABAJOS_INTERVALO = float(os.getenv("TRABAJOS_INTERVALO", "15"))
+TRABAJOS_ABANDONO = float(os.getenv("TRABAJOS_ABANDONO", "60"))
+TRABAJOS_MAX_INTENTOS = int(os.getenv("TRABAJOS_MAX_INTENTOS", "3"))
+
+# Como mucho una escritura de progreso por trabajo cada tantos segundos
+_INTERVALO_PROGRESO = 1.0
+
+
+# ----------------------------------------------------
+#   TIPOS DE TRABAJO
+# ----------------------------------------------------
+class Resultado(NamedTuple):
+    archivo: str
+    tipo_contenido: str
+    filas: Optional[int] = None
+
+
+class TipoTrabajo(NamedTuple):
+    parametros: type  # modelo pydantic con los parámetros
+    ejecutar: Callable  # (parametros, Contexto) -> Resultado
+    publico: bool = True  # se puede pedir con POST /reportes/jobs
+
+
+TIPOS = {}
+
+
+def tipo_de_trabajo(nombre: str, parametros: type, publico: bool = True):
+    """
+    Registra una función como tipo de trabajo:
+
+        @tipo_de_trabajo("exportar_operaciones", ExportarOperacionesParametros)
+        def exportar(parametros, contexto) -> Resultado: ...
+
+    Con publico=False solo lo encola el propio servidor (las miniaturas de
+    una subida, por ejemplo); POST /reportes/jobs lo rechaza como inexistente.
+    """
+
+    def registrar(funcion):
+        TIPOS[nombre] = TipoTrabajo(parametros, funcion, publico)
+        return funcion
+
+    return registrar
+
+
+class Contexto:
+    """Lo que recibe un trabajo en ejecución: dónde escribir y cómo informar el avance."""
+
+    def __init__(self, trabajo_id: str, reclamo: str):
+        self.trabajo_id = trabajo_id
+        self.reclamo = reclamo
+        self._ultimo_avance = 0.0
+
+    def ruta(self, extension: str) -> str:
+        return os.path.join(TRABAJOS_DIR, f"{self.trabajo_id}.{extension}")
+
+    def avance(self, progreso: Optional[float], filas: Optional[int] = None) -> None:
+        """Progreso de 0 a 1 y/o filas procesadas (None deja el valor guardado)."""
+        ahora = ahora_utc()
+        if (ahora.timestamp() - self._ultimo_avance) < _INTERVALO_PROGRESO:
+            return
+        self._ultimo_avance = ahora.timestamp()
+        valores = {"actualizado_en": ahora}
+        if progreso is not None:
+            valores["progreso"] = min(progreso, 1.0)
+        if filas is not None:
+            valores["filas"] = filas
+        with engine.begin() as conn:
+            conn.execute(
+                update(TrabajoReporte)
+                .where(
+                    TrabajoReporte.id == self.trabajo_id,
+                    TrabajoReporte.reclamo == self.reclamo,
+                    TrabajoReporte.estado == "en_curso",
+                )
+                .values(**valores)
+            )
+
+    def exportar(self, statement, formato: str) -> Resultado:
+        """
+        Escribe la exportación en disco informando las filas escritas. No se
+        cuenta el total antes (sería correr la consulta dos veces), así que
+        progreso queda en 0 hasta terminar.
+        """
+        filas = escribir_exportacion(
+            statement,
+            formato,
+            self.ruta(formato),
+            avance=lambda filas: self.avance(None, filas),
+            motor=engine_trabajos,
+        )
+        return Resultado(self.ruta(formato), TIPOS_CONTENIDO[formato], filas)
+
+    def guardar_json(self, datos) -> Resultado:
+        ruta = self.ruta("json")
+        # Temporal propio de esta ejecución, como en escribir_exportacion
+        descriptor, parcial = tempfile.mkstemp(
+            prefix=os.path.basename(ruta) + ".", suffix=".parcial", dir=TRABAJOS_DIR
+        )
+        try:
+            with open(descriptor, "w", encoding="utf-8") as archivo:
+                json.dump(datos, archivo, ensure_ascii=False, default=str)
+            os.replace(parcial, ruta)
+        except BaseException:
+            os.remove(parcial)
+            raise
+        return Resultado(ruta, "application/json", len(datos))
+
+
+# ----------------------------------------------------
+#   EJECUCIÓN
+# ----------------------------------------------------
+_pool: Optional[ThreadPoolExecutor] = None
+_en_proceso = {}  # id -> reclamo (None hasta reclamarlo) de lo encolado en este proceso
+_lock = threading.Lock()
+_detener = threading.Event()
+
+
+def encolar(trabajo_id: str) -> None:
+    """
+    Pasa el trabajo al pool de este proceso. Si el pool no está iniciado
+    (un script, por ejemplo) queda pendiente para el vigilante de la API.
+    """
+    with _lock:
+        if _pool is None or trabajo_id in _en_proceso:
+            return
+        _en_proceso[trabajo_id] = None
+        _pool.submit(_ejecutar, trabajo_id)
+
+
+def _reclamar(trabajo_id: str) -> Optional[tuple]:
+    """
+    Pasa el trabajo de pendiente a en_curso con un token de reclamo nuevo y
+    devuelve (tipo, parametros, reclamo); None si otro worker lo tomó antes.
+    """
+    reclamo = uuid.uuid4().hex
+    with engine.begin() as conn:
+        reclamado = conn.execute(
+            update(TrabajoReporte)
+            .where(TrabajoReporte.id == trabajo_id, TrabajoReporte.estado == "pendiente")
+            .values(
+                estado="en_curso",
+                progreso=0,
+                intentos=TrabajoReporte.intentos + 1,
+                reclamo=reclamo,
+                actualizado_en=ahora_utc(),
+            )
+        ).rowcount
+        if not reclamado:
+            return None
+        tipo, parametros = conn.execute(
+            select(TrabajoReporte.tipo, TrabajoReporte.parametros).where(
+                TrabajoReporte.id == trabajo_id
+            )
+        ).one()
+    with _lock:
+        _en_proceso[trabajo_id] = reclamo
+    return tipo, parametros, reclamo
+
+
+def _terminar(trabajo_id: str, reclamo: str, **valores) -> None:
+    """Cierra el trabajo (completado o fallido), salvo que ya no sea de esta ejecución."""
+    ahora = ahora_utc()
+    with engine.begin() as conn:
+        conn.execute(
+            update(TrabajoReporte)
+            .where(
+                TrabajoReporte.id == trabajo_id,
+                TrabajoReporte.reclamo == reclamo,
+                TrabajoReporte.estado == "en_curso",
+            )
+            .values(
+                actualizado_en=ahora,
+                expira_en=ahora + timedelta(hours=TRABAJOS_TTL_HORAS),
+                **valores,
+            )
+        )
+
+
+def _ejecutar(trabajo_id: str) -> None:
+    try:
+        reclamado = _reclamar(trabajo_id)
+        if reclamado is None:
+            return
+        tipo, parametros, reclamo = reclamado
+        try:
+            definicion = TIPOS[tipo]
+            resultado = definicion.ejecutar(
+                definicion.parametros.model_validate_json(parametros),
+                Contexto(trabajo_id, reclamo),
+            )
+        except Exception as exc:
+            logger.exception("El trabajo %s (%s) falló", trabajo_id, tipo)
+            _terminar(trabajo_id, reclamo, estado="fallido", error=str(exc) or type(exc).__name__)
+        else:
+            _terminar(
+                trabajo_id,
+                reclamo,
+                estado="completado",
+                progreso=1,
+                filas=resultado.filas,
+                archivo=os.path.basename(resultado.archivo),
+                tipo_contenido=resultado.tipo_contenido,
+            )
+    except Exception:
+        logger.exception("No se pudo ejecutar el trabajo %s", trabajo_id)
+    finally:
+        with _lock:
+            _en_proceso.pop(trabajo_id, None)
+
+
+def ruta_resultado(trabajo: TrabajoReporte) -> Optional[str]:
+    """Ruta del archivo de un trabajo completado, o None si ya no está en disco."""
+    if not trabajo.archivo:
+        return None
+    ruta = os.path.join(TRABAJOS_DIR, trabajo.archivo)
+    return ruta if os.path.exists(ruta) else None
+
+
+# ----------------------------------------------------
+#   VIGILANTE: LATIDOS, REENCOLADO Y LIMPIEZA
+# ----------------------------------------------------
+def revisar() -> None:
+    """Una pasada del vigilante (ver el docstring del módulo)."""
+    ahora = ahora_utc()
+    with _lock:
+        reclamos = [reclamo for reclamo in _en_proceso.values() if reclamo]
+    abandonado = (
+        TrabajoReporte.estado == "en_curso",
+        TrabajoReporte.actualizado_en < ahora - timedelta(seconds=TRABAJOS_ABANDONO),
+    )
+    with engine.begin() as conn:
+        if reclamos:
+            conn.execute(
+                update(TrabajoReporte)
+                .where(TrabajoReporte.reclamo.in_(reclamos), TrabajoReporte.estado == "en_curso")
+                .values(actualizado_en=ahora)
+            )
+        conn.execute(
+            update(TrabajoReporte)
+            .where(*abandonado, TrabajoReporte.intentos >= TRABAJOS_MAX_INTENTOS)
+            .values(
+                estado="fallido",
+                reclamo=None,
+                error=f"Se interrumpió {TRABAJOS_MAX_INTENTOS} veces sin terminar.",
+                actualizado_en=ahora,
+                expira_en=ahora + timedelta(hours=TRABAJOS_TTL_HORAS),
+            )
+        )
+        # Sin reclamo: si la ejecución anterior sigue viva, ya no puede cerrarlo
+        conn.execute(
+            update(TrabajoReporte)
+            .where(*abandonado)
+            .values(estado="pendiente", progreso=0, reclamo=None)
+        )
+        pendientes = conn.execute(
+            select(TrabajoReporte.id)
+            .where(TrabajoReporte.estado == "pendiente")
+            .order_by(TrabajoReporte.creado_en)
+        ).scalars().all()
+        vencidos = conn.execute(
+            select(TrabajoReporte.id).where(TrabajoReporte.expira_en < ahora)
+        ).scalars().all()
+        if vencidos:
+            conn.execute(delete(TrabajoReporte).where(TrabajoReporte.id.in_(vencidos)))
+
+    for trabajo_id in vencidos:
+        # El resultado (<id>.<ext>) y los temporales de ejecuciones cortadas
+        for ruta in glob.glob(os.path.join(TRABAJOS_DIR, f"{trabajo_id}.*")):
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+    for trabajo_id in pendientes:
+        encolar(trabajo_id)
+
+
+def _vigilar() -> None:
+    while True:
+        try:
+            revisar()
+        except Exception:
+            logger.exception("Falló la revisión de trabajos")
+        if _detener.wait(TRABAJOS_INTERVALO):
+            return
+
+
+def iniciar() -> None:
+    """Arranca el pool y el vigilante de este proceso (startup de la API)."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            return
+        os.makedirs(TRABAJOS_DIR, exist_ok=True)
+        _pool = ThreadPoolExecutor(
+            max_workers=TRABAJOS_MAX_CONCURRENTES, thread_name_prefix="trabajo"
+        )
+        _detener.clear()
+    threading.Thread(target=_vigilar, name="trabajos-vigilante", daemon=True).start()
+
+
+def detener() -> None:
+    """
+    Detiene el vigilante y descarta lo que estaba en cola en este proceso:
+    esos trabajos siguen pendientes en la tabla y los toma el próximo worker.
+    """
+    global _pool
+    _detener.set()
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,149 @@
+"""
+Verificación de la carga masiva (carga_masiva.py).
+
+Carga un juego de archivos CSV / NDJSON fijo en una base SQLite temporal,
+como lo haría cargar_datos.py, y comprueba:
+  - que las celdas vacías de columnas con valor por defecto toman ese valor
+    (y no rechazan el lote ni las filas que dependen de él),
+  - que la pasada final deja el stock y el costo_total esperados y el libro
+    de movimientos consistente,
+  - que los movimientos cargados quedan fechados con su operación, así el
+    stock en una fecha del historial es el de ese momento (antes y después
+    de generar un snapshot).
+Termina con código 1 si algo no coincide.
+
+Uso:
+    python verificar_carga.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+_directorio = tempfile.mkdtemp(prefix="carga_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'carga.db')}"
+os.environ.setdefault("DB_PERFIL", "bench")
+
+from sqlmodel import Session, select  # noqa: E402
+
+import inventario  # noqa: E402
+from carga_masiva import cargar_filas, finalizar, leer_archivo, ultimo_id_detalle  # noqa: E402
+from database import engine, init_db  # noqa: E402
+from models import DetalleOperacion, Operacion, Producto  # noqa: E402
+
+# Las celdas vacías de stock_disponible, unidad_medida y estado deben tomar
+# el valor por defecto del modelo (0, "kg" y "pendiente")
+ARCHIVOS = {
+    "paises.csv": "nombre,codigo_iso\nColombia,CO\nEspaña,ES\n",
+    "categorias_producto.csv": "nombre,descripcion\nFrutas,\n",
+    "clientes.csv": "nombre,pais,email\nCliente,ES,\n",
+    "proveedores.csv": "nombre,pais,email\nProveedor,CO,\n",
+    "productos.csv": (
+        "nombre,tipo,unidad_medida,precio_referencia,stock_disponible,categoria\n"
+        "Mango,fruta,,2,,Frutas\n"
+        "Papa,verdura,kg,1,5,\n"
+    ),
+    "operaciones.ndjson": (
+        '{"tipo": "importacion", "fecha": "2025-01-10", "estado": "", "proveedor": "Proveedor",'
+        ' "pais_origen": "CO", "detalles": [{"producto": "Mango", "cantidad": 100,'
+        ' "precio_unitario": 2}]}\n'
+        '{"tipo": "exportacion", "fecha": "2025-02-10", "estado": "", "cliente": "Cliente",'
+        ' "pais_destino": "ES", "detalles": [{"producto": "Mango", "cantidad": 30,'
+        ' "precio_unitario": 3}, {"producto": "Papa", "cantidad": 5, "precio_unitario": 1}]}\n'
+    ),
+}
+
+# Entidad de cada archivo, en orden de carga
+ENTIDADES = [
+    ("paises.csv", "paises"),
+    ("categorias_producto.csv", "categorias_producto"),
+    ("clientes.csv", "clientes"),
+    ("proveedores.csv", "proveedores"),
+    ("productos.csv", "productos"),
+    ("operaciones.ndjson", "operaciones"),
+]
+
+
+def cargar() -> list:
+    """Carga los archivos y devuelve los errores informados por la carga."""
+    for nombre, contenido in ARCHIVOS.items():
+        with open(os.path.join(_directorio, nombre), "w", encoding="utf-8") as archivo:
+            archivo.write(contenido)
+
+    init_db()
+    desde_detalle_id = ultimo_id_detalle(engine)
+    errores = []
+    for nombre, entidad in ENTIDADES:
+        resultado = cargar_filas(engine, entidad, leer_archivo(os.path.join(_directorio, nombre)))
+        errores += [f"{nombre}:{e['linea']}: {e['error']}" for e in resultado["detalle_errores"]]
+    finalizar(engine, desde_detalle_id)
+    return errores
+
+
+def comprobar() -> list:
+    """Diferencias entre lo cargado y lo esperado."""
+    problemas = []
+
+    def esperar(descripcion, obtenido, esperado):
+        if obtenido != esperado:
+            problemas.append(f"{descripcion}: {obtenido!r} (se esperaba {esperado!r})")
+
+    with Session(engine) as session:
+        productos = {p.nombre: p for p in session.exec(select(Producto))}
+        esperar("productos cargados", sorted(productos), ["Mango", "Papa"])
+        if "Mango" in productos:
+            esperar("unidad_medida vacía", productos["Mango"].unidad_medida, "kg")
+            # stock vacío (0) + importación de 100 - exportación de 30
+            esperar("stock de Mango", productos["Mango"].stock_disponible, 70)
+        if "Papa" in productos:
+            esperar("stock de Papa", productos["Papa"].stock_disponible, 0)
+
+        operaciones = session.exec(select(Operacion).order_by(Operacion.fecha)).all()
+        esperar("operaciones cargadas", len(operaciones), 2)
+        esperar("estado vacío", {o.estado for o in operaciones}, {"pendiente"})
+        esperar("costo_total", [o.costo_total for o in operaciones], [200, 95])
+        esperar("detalles cargados", len(session.exec(select(DetalleOperacion)).all()), 3)
+
+        verificacion = inventario.verificar_stock(session)
+        esperar("libro de movimientos consistente", verificacion["consistente"], True)
+
+        if "Mango" in productos:
+            mango = productos["Mango"].id
+            # Antes de la importación, entre las dos operaciones y hoy
+            historial = {
+                datetime(2025, 1, 1, tzinfo=timezone.utc): 0,
+                datetime(2025, 1, 31, tzinfo=timezone.utc): 100,
+                datetime.now(timezone.utc): 70,
+            }
+
+            def stock_historico(momento):
+                return inventario.stock_en(session, mango, momento)["stock"]
+
+            for momento, esperado in historial.items():
+                esperar(f"stock de Mango al {momento:%Y-%m-%d}", stock_historico(momento), esperado)
+            inventario.generar_snapshots(session)
+            session.commit()
+            for momento, esperado in historial.items():
+                esperar(
+                    f"stock de Mango al {momento:%Y-%m-%d} con snapshot",
+                    stock_historico(momento),
+                    esperado,
+                )
+    return problemas
+
+
+def main() -> int:
+    errores = cargar()
+    for error in errores:
+        print(error)
+    problemas = comprobar()
+    for problema in problemas:
+        print(problema)
+    if errores or problemas:
+        return 1
+    print("Carga masiva, pasada final y stock histórico como se esperaba ✔")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
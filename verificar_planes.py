@@ -0,0 +1,311 @@
+"""
+Verificación de planes de consulta (regresión de índices).
+
+Levanta la API en proceso contra una base SQLite temporal, recorre los
+routers y reportes con un escenario fijo, captura cada sentencia SQL que
+se ejecuta y obtiene su EXPLAIN QUERY PLAN. Termina con código 1 si alguna
+consulta sobre una tabla caliente hace un recorrido completo (SCAN) sin
+índice, o si una vista con carga anticipada ejecuta más (o menos) sentencias
+de las esperadas.
+
+Uso:
+    python verificar_planes.py
+"""
+import os
+import re
+import sys
+import tempfile
+
+_directorio = tempfile.mkdtemp(prefix="planes_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'planes.db')}"
+os.environ.setdefault("DB_PERFIL", "bench")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from database import engine  # noqa: E402
+from main import app  # noqa: E402
+
+# Tablas que crecen con el uso; un SCAN sobre ellas es una regresión
+TABLAS_CALIENTES = {
+    "operacion",
+    "detalleoperacion",
+    "inspeccioncalidad",
+    "producto",
+    "cliente",
+    "proveedor",
+    "puerto",
+    "movimientostock",
+    "snapshotstock",
+}
+
+# Sentencias que recorren tablas completas a propósito (reconstrucciones)
+PERMITIDAS = (
+    "INSERT INTO resumen",
+    "UPDATE operacion SET costo_total=(SELECT",
+)
+
+# Sentencias exactas por petición en las vistas con carga anticipada: deben
+# ser fijas, sin importar cuántos detalles o inspecciones tenga la operación
+SENTENCIAS_POR_PETICION = {
+    # versión para el ETag + operación con JOINs + detalles con producto + inspecciones
+    "/operaciones/{operacion_id}/completa": 4,
+    # versión + página + una consulta por tabla expandida, sin importar las filas
+    "/operaciones/?proveedor_id={proveedor_id}&expand=proveedor": 3,
+    "/detalles-operacion/?operacion_id={operacion_id}&expand=producto,operacion": 4,
+    "/inspecciones-calidad/?operacion_id={operacion_id}&expand=operacion": 3,
+    # versión para el ETag + un UNION ALL sobre los resúmenes (sin cache: hubo escrituras)
+    "/reportes/dashboard": 2,
+}
+
+sentencias = {}
+conteos = {}  # url -> (ejecutadas, esperadas)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _capturar(conn, cursor, statement, parameters, context, executemany):
+    texto = statement.lstrip().upper()
+    if not texto.startswith(("SELECT", "UPDATE", "DELETE", "INSERT INTO RESUMEN", "WITH")):
+        return
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    sentencias.setdefault(statement, parameters)
+
+
+def contar_sentencias(client: TestClient, url: str) -> int:
+    ejecutadas = []
+
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        ejecutadas.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _contar)
+    try:
+        resp = client.get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", _contar)
+    assert resp.status_code == 200, (url, resp.status_code, resp.text)
+    return len(ejecutadas)
+
+
+def escenario(client: TestClient) -> None:
+    """Recorre todos los endpoints con datos mínimos."""
+    def post(url, body):
+        resp = client.post(url, json=body)
+        assert resp.status_code == 200, (url, resp.status_code, resp.text)
+        return resp.json()
+
+    pais_a = post("/paises/", {"nombre": "Colombia", "codigo_iso": "CO"})
+    pais_b = post("/paises/", {"nombre": "España", "codigo_iso": "ES"})
+    categoria = post("/categorias-producto/", {"nombre": "Frutas"})
+    cliente = post("/clientes/", {"nombre": "Cliente", "pais_id": pais_b["id"]})
+    proveedor = post("/proveedores/", {"nombre": "Proveedor", "pais_id": pais_a["id"]})
+    puerto_a = post("/puertos/", {"nombre": "Cartagena", "pais_id": pais_a["id"]})
+    puerto_b = post("/puertos/", {"nombre": "Valencia", "pais_id": pais_b["id"]})
+    medio = post("/medios-transporte/", {"tipo": "maritimo"})
+    producto = post(
+        "/productos/",
+        {
+            "nombre": "Mango",
+            "tipo": "fruta",
+            "precio_referencia": 2,
+            "stock_disponible": 0,
+            "categoria_id": categoria["id"],
+        },
+    )
+
+    importacion = post(
+        "/operaciones/",
+        {
+            "tipo": "importacion",
+            "fecha": "2025-01-15",
+            "proveedor_id": proveedor["id"],
+            "cliente_id": cliente["id"],
+            "pais_origen_id": pais_a["id"],
+            "pais_destino_id": pais_b["id"],
+            "puerto_origen_id": puerto_a["id"],
+            "puerto_destino_id": puerto_b["id"],
+            "medio_transporte_id": medio["id"],
+        },
+    )
+    detalle = post(
+        "/detalles-operacion/",
+        {
+            "producto_id": producto["id"],
+            "operacion_id": importacion["id"],
+            "cantidad": 100,
+            "precio_unitario": 2,
+        },
+    )
+    client.put(
+        f"/detalles-operacion/{detalle['id']}",
+        json={
+            "producto_id": producto["id"],
+            "operacion_id": importacion["id"],
+            "cantidad": 120,
+            "precio_unitario": 2,
+        },
+    )
+    exportacion = post(
+        "/operaciones/con-detalles",
+        {
+            "tipo": "exportacion",
+            "fecha": "2025-02-10",
+            "cliente_id": cliente["id"],
+            "detalles": [
+                {"producto_id": producto["id"], "cantidad": 10, "precio_unitario": 3}
+            ],
+        },
+    )
+    client.put(
+        f"/operaciones/{exportacion['id']}",
+        json={
+            "tipo": "importacion",
+            "fecha": "2025-03-10",
+            "cliente_id": cliente["id"],
+            "proveedor_id": proveedor["id"],
+        },
+    )
+    post(
+        "/inspecciones-calidad/",
+        {
+            "fecha": "2025-01-20",
+            "resultado": "aprobado",
+            "operacion_id": importacion["id"],
+            "producto_id": producto["id"],
+        },
+    )
+    vacia = post(
+        "/operaciones/",
+        {"tipo": "importacion", "fecha": "2025-04-01", "proveedor_id": proveedor["id"]},
+    )
+    client.delete(f"/operaciones/{vacia['id']}")
+    trabajo = client.post(
+        "/reportes/jobs",
+        json={
+            "tipo": "ingresos_por_periodo",
+            "parametros": {"desde": "2025-01-01", "hasta": "2026-01-01", "periodo": "mes"},
+        },
+    )
+    assert trabajo.status_code == 202, trabajo.text
+
+    consultas = [
+        "/paises/",
+        "/paises/?after_id=1&limit=1",
+        "/categorias-producto/",
+        "/medios-transporte/?tipo=maritimo",
+        f"/clientes/?pais_id={pais_b['id']}",
+        f"/proveedores/?pais_id={pais_a['id']}",
+        f"/puertos/?pais_id={pais_a['id']}",
+        f"/productos/?categoria_id={categoria['id']}",
+        f"/productos/{producto['id']}/stock",
+        f"/productos/{producto['id']}/stock?fecha=2025-01-31",
+        "/operaciones/?tipo=exportacion",
+        "/operaciones/?estado=pendiente",
+        "/operaciones/?fecha_desde=2025-01-01&fecha_hasta=2025-12-31",
+        f"/operaciones/?cliente_id={cliente['id']}",
+        f"/operaciones/?proveedor_id={proveedor['id']}",
+        "/operaciones/?expand=cliente,proveedor,pais_origen,pais_destino,puerto_origen,"
+        "puerto_destino,medio_transporte",
+        f"/operaciones/{importacion['id']}",
+        f"/operaciones/{importacion['id']}/completa",
+        "/operaciones/export?fecha_desde=2025-01-01&fecha_hasta=2025-01-31&incluir_nombres=true",
+        f"/operaciones/export?formato=ndjson&cliente_id={cliente['id']}",
+        f"/detalles-operacion/?operacion_id={importacion['id']}",
+        f"/detalles-operacion/?producto_id={producto['id']}",
+        f"/detalles-operacion/?producto_id={producto['id']}&expand=producto,operacion",
+        f"/detalles-operacion/{detalle['id']}",
+        "/detalles-operacion/export?fecha_desde=2025-01-01&fecha_hasta=2025-01-31&incluir_nombres=true",
+        f"/detalles-operacion/export?formato=ndjson&producto_id={producto['id']}",
+        f"/inspecciones-calidad/?operacion_id={importacion['id']}",
+        f"/inspecciones-calidad/?producto_id={producto['id']}",
+        f"/inspecciones-calidad/?producto_id={producto['id']}&expand=operacion,producto",
+        "/reportes/operaciones-por-estado",
+        "/reportes/top-productos-exportados",
+        "/reportes/ingresos-por-mes?anio=2025",
+        "/reportes/ingresos-por-periodo?desde=2025-01-01&hasta=2026-01-01&periodo=mes",
+        "/reportes/dashboard?top=3",
+        f"/reportes/jobs/{trabajo.json()['id']}",
+    ]
+    for url in consultas:
+        resp = client.get(url)
+        assert resp.status_code == 200, (url, resp.status_code, resp.text)
+
+    # Un segundo detalle e inspección no deben agregar sentencias
+    post(
+        "/detalles-operacion/",
+        {
+            "producto_id": producto["id"],
+            "operacion_id": importacion["id"],
+            "cantidad": 5,
+            "precio_unitario": 2,
+        },
+    )
+    post(
+        "/inspecciones-calidad/",
+        {"fecha": "2025-01-21", "resultado": "rechazado", "operacion_id": importacion["id"]},
+    )
+    for plantilla, esperadas in SENTENCIAS_POR_PETICION.items():
+        url = plantilla.format(operacion_id=importacion["id"], proveedor_id=proveedor["id"])
+        conteos[url] = (contar_sentencias(client, url), esperadas)
+
+    client.post("/operaciones/costo-total/reconstruir")
+    client.post("/reportes/resumenes/reconstruir")
+
+
+def _scan_aceptable(statement: str) -> bool:
+    """
+    Un SCAN es aceptable en la primera página de un listado sin filtros:
+    recorre la clave primaria en orden y se detiene en el LIMIT.
+    """
+    if " LIMIT " not in statement:
+        return False
+    where = re.search(r"\bWHERE\b(.*?)(\bORDER BY\b|\bLIMIT\b)", statement, re.S)
+    return where is None
+
+
+def revisar_planes() -> list:
+    problemas = []
+    with engine.connect() as conn:
+        for statement, parameters in sentencias.items():
+            if statement.lstrip().startswith(PERMITIDAS):
+                continue
+            plan = conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, tuple(parameters or ())
+            ).all()
+            for fila in plan:
+                detalle = fila[-1]
+                m = re.match(r"SCAN (\w+)", detalle)
+                if not m or m.group(1) not in TABLAS_CALIENTES:
+                    continue
+                if "USING" in detalle or _scan_aceptable(statement):
+                    continue
+                problemas.append((statement, detalle))
+    return problemas
+
+
+def main() -> int:
+    with TestClient(app) as client:
+        escenario(client)
+
+    problemas = revisar_planes()
+    distintos = {url: c for url, c in conteos.items() if c[0] != c[1]}
+    for url, (ejecutadas, esperadas) in distintos.items():
+        print(f"{url}: {ejecutadas} sentencias (se esperaban {esperadas})")
+    print(f"Sentencias analizadas: {len(sentencias)}")
+    if not problemas:
+        print("Ninguna ruta caliente recorre tablas completas ✔")
+        if distintos:
+            return 1
+        print(f"Sentencias por petición como se esperaba en {len(conteos)} vistas ✔")
+        return 0
+
+    print(f"Se encontraron {len(problemas)} recorridos completos:")
+    for statement, detalle in problemas:
+        print("-" * 60)
+        print(" ".join(statement.split()))
+        print(f"  -> {detalle}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())